@@ -0,0 +1,100 @@
+# benchmarks/bench_asset_import.py
+"""
+Compare bulk asset import throughput: the previous per-row create/commit loop
+against utils.bulk.bulk_utils.import_assets.
+
+Usage (from MATER_BE/):
+    python -m benchmarks.bench_asset_import
+    python -m benchmarks.bench_asset_import --rows 50000 --legacy-rows 5000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models.base import Base
+from models.main import drop_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service  # noqa: F401 (registers the table)
+from models.serviceattachment import ServiceAttachment  # noqa: F401
+from models.appsettings import AppSettings  # noqa: F401
+from models.note import Note  # noqa: F401
+from models.cost import Cost  # noqa: F401
+from models.mfa import MFA  # noqa: F401
+from models.otp import OTP  # noqa: F401
+from utils.bulk.bulk_utils import import_assets
+
+
+def build_csv(rows):
+    rng = random.Random(8)
+    formats = ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]
+    lines = ["name,description,asset_sn,acquired_date"]
+    for n in range(rows):
+        acquired = date(2015, 1, 1) + timedelta(days=rng.randint(0, 3000))
+        lines.append(f"asset {n},imported asset,SN{n:07d},{acquired.strftime(rng.choice(formats))}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def legacy_import(session, user_id, data):
+    # The per-row loop previously run by /assets/upload_assets and create_asset
+    reader = csv.DictReader(io.StringIO(data.decode("UTF8"), newline=None))
+    for row in reader:
+        acquired_date = None
+        for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
+            try:
+                acquired_date = datetime.strptime(row.get("acquired_date"), fmt).date()
+                break
+            except ValueError:
+                continue
+        asset = Asset(
+            name=row["name"], asset_sn=row["asset_sn"], description=row["description"],
+            acquired_date=acquired_date, user_id=user_id, asset_status="Ready",
+        )
+        session.add(asset)
+        session.commit()
+        session.query(Asset).filter_by(id=asset.id).first()
+
+
+def fresh_session():
+    path = os.path.join(tempfile.mkdtemp(prefix="mater-bench-"), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session = Session(engine)
+    session.add(User(id="bench", username="bench", password="x", email="bench@example.com"))
+    session.commit()
+    return engine, session
+
+
+def run(label, rows, importer):
+    data = build_csv(rows)
+    engine, session = fresh_session()
+    started = time.perf_counter()
+    importer(session, data)
+    elapsed = time.perf_counter() - started
+    imported = session.query(Asset).count()
+    session.close()
+    drop_db(engine)
+    print(f"{label:<10}{rows:>10}{elapsed:>12.2f}{imported / elapsed:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000, help="The old loop is slow; keep this smaller")
+    args = parser.parse_args()
+
+    print(f"{'importer':<10}{'rows':>10}{'seconds':>12}{'rows/s':>14}")
+    run("legacy", args.legacy_rows, lambda session, data: legacy_import(session, "bench", data))
+    run("bulk", args.rows, lambda session, data: import_assets(session, "bench", io.BytesIO(data)))
+
+
+if __name__ == "__main__":
+    main()
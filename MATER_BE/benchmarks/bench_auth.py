@@ -0,0 +1,89 @@
+# benchmarks/bench_auth.py
+"""
+Measure authentication overhead per request: decoding the JWT and querying the
+user on every call (the previous retrieve_username_jwt/check_admin) against the
+verified-token and role cache.
+
+Usage (from MATER_BE/):
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_auth --requests 50000 --users 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import jwt
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from models.base import Base
+from models.main import init_db
+from models.user import User
+from utils.jwt.jwt_utils import token_cache, retrieve_username_jwt, check_admin
+
+SECRET = "bench-secret-key-with-at-least-32-bytes"
+
+
+def legacy_check_admin(session, token):
+    # What every admin route did before: decode, then load the user
+    user_id = jwt.decode(token, SECRET, algorithms=["HS256"])["id"]
+    user = session.query(User).filter_by(id=user_id).first()
+    return user is not None and user.is_admin
+
+
+def build_app(users):
+    folder = tempfile.mkdtemp(prefix="mater-bench-")
+    app = Flask(__name__, instance_path=folder)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(folder, 'bench.db')}"
+    app.config["CURRENT_SECRET_KEY"] = SECRET
+    db = SQLAlchemy(model_class=Base)
+    db.init_app(app)
+    app.config["current_db"] = db
+    with app.app_context():
+        init_db(db.engine)
+        db.session.add_all([
+            User(id=f"user-{n}", username=f"user-{n}", password="x", email=f"user-{n}@example.com", is_admin=n % 10 == 0)
+            for n in range(users)
+        ])
+        db.session.commit()
+    tokens = [jwt.encode({"id": f"user-{n}"}, SECRET, algorithm="HS256") for n in range(users)]
+    return app, db, tokens
+
+
+def timed(app, tokens, requests, auth):
+    rng = random.Random(10)
+    picks = [rng.choice(tokens) for _ in range(requests)]
+    started = time.perf_counter()
+    for token in picks:
+        # A fresh request context, as each HTTP request gets one
+        with app.test_request_context(json={"jwt": token}):
+            auth(token)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    app, db, tokens = build_app(args.users)
+    token_cache.configure(4096, 300)
+
+    cases = {
+        "decode (legacy)": lambda token: jwt.decode(token, SECRET, algorithms=["HS256"]),
+        "decode (cached)": retrieve_username_jwt,
+        "admin (legacy)": lambda token: legacy_check_admin(db.session, token),
+        "admin (cached)": lambda token: check_admin({"jwt": token}),
+    }
+    print(f"{'case':<20}{'us/request':>12}")
+    for label, auth in cases.items():
+        token_cache.clear()
+        print(f"{label:<20}{timed(app, tokens, args.requests, auth):>12.1f}")
+    print(f"cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
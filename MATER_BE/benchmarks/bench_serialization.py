@@ -0,0 +1,108 @@
+# benchmarks/bench_serialization.py
+"""
+Compare the cost of serving a service list per 10k rows: loading ORM entities,
+building dicts by hand and encoding with Flask's stdlib provider (previous
+/services/service_all) against selecting columns as row tuples, the model
+serializer and the orjson provider.
+
+Reports process CPU time and the peak memory allocated (tracemalloc) while
+serving, per 10k rows.
+
+Usage (from MATER_BE/):
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --rows 100000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from utils.query.query_utils import user_services, user_service_rows, SERVICE_ROW_FIELDS
+from utils.serialization.serialization_utils import ORJSONProvider, ISODateJSONProvider, orjson
+
+
+def populate(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"id": "bench", "username": "bench", "password": "x", "email": "b@x"}])
+        connection.execute(insert(Asset), [{"id": n + 1, "name": f"asset {n}", "user_id": "bench"} for n in range(100)])
+        connection.execute(insert(Service), [
+            {"asset_id": n % 100 + 1, "user_id": "bench", "service_type": "Oil Change",
+             "service_date": date(2020, 1, 1) + timedelta(days=n % 1500), "service_status": "Pending"}
+            for n in range(rows)
+        ])
+
+
+def legacy(session, provider):
+    services = user_services(session, "bench").all()
+    services_data = [{
+        'id': service.id,
+        'asset_name': service.asset.name if service.asset else "Unknown",
+        'service_type': service.service_type,
+        'service_date': service.service_date.isoformat(),
+        'service_status': service.service_status,
+    } for service in services]
+    return provider.dumps({'services': services_data})
+
+
+def projected(session, provider):
+    rows = user_service_rows(session, "bench").all()
+    return provider.dumps({'services': Service.serialize_rows(rows, SERVICE_ROW_FIELDS)})
+
+
+def measure(engine, serve, provider, repeat):
+    # Tracing slows Python down, so CPU time and memory come from separate runs
+    cpu, peak = [], []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            started = time.process_time()
+            serve(session, provider)
+            cpu.append(time.process_time() - started)
+        with Session(engine) as session:
+            tracemalloc.start()
+            serve(session, provider)
+            peak.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return statistics.median(cpu), statistics.median(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mater-bench-'), 'bench.db')}")
+    init_db(engine)
+    populate(engine, args.rows)
+
+    app = Flask(__name__)
+    cases = [
+        ("entities + stdlib", legacy, DefaultJSONProvider(app)),
+        ("rows + stdlib", projected, ISODateJSONProvider(app)),
+    ]
+    if orjson is not None:
+        cases.append(("rows + orjson", projected, ORJSONProvider(app)))
+    else:
+        print("orjson is not installed; skipping the orjson case")
+
+    per = args.rows / 10_000
+    print(f"{'case':<20}{'cpu ms/10k':>14}{'peak KiB/10k':>16}")
+    for label, serve, provider in cases:
+        cpu, peak = measure(engine, serve, provider, args.repeat)
+        print(f"{label:<20}{cpu * 1000 / per:>14.1f}{peak / 1024 / per:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_sqlite_profile.py
+"""
+Compare concurrent read/write throughput on a SQLite file with and without the
+production profile (WAL + tuned pragmas + single writer lane).
+
+Usage (from MATER_BE/):
+    python -m benchmarks.bench_sqlite_profile
+    python -m benchmarks.bench_sqlite_profile --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+from common.base import BaseConfig
+from models.base import Base, apply_sqlite_profile
+from models.main import drop_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment  # noqa: F401 (registers the table)
+from models.appsettings import AppSettings  # noqa: F401
+from models.note import Note  # noqa: F401
+from models.cost import Cost  # noqa: F401
+from models.mfa import MFA  # noqa: F401
+from models.otp import OTP  # noqa: F401
+
+
+def build_engine(path, profile):
+    # pysqlite waits 5s on a locked database by default; keep that for the baseline
+    engine = create_engine(f"sqlite:///{path}", **{**BaseConfig.DATABASE_POOL, "max_overflow": 64})
+    if profile:
+        apply_sqlite_profile(engine, BaseConfig.SQLITE_PRAGMAS)
+    return engine
+
+
+def seed(engine, services):
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"id": "bench", "username": "bench", "password": "x", "email": "b@x"}])
+        connection.execute(insert(Asset), [{"id": 1, "name": "asset", "user_id": "bench"}])
+        connection.execute(insert(Service), [
+            {"asset_id": 1, "user_id": "bench", "service_type": "Oil Change",
+             "service_date": date.today() - timedelta(days=n % 900), "service_status": "Pending"}
+            for n in range(services)
+        ])
+
+
+def run(engine, readers, writers, seconds):
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(key):
+        with lock:
+            counters[key] += 1
+
+    def reader():
+        query = (
+            select(Service.id, Service.service_date)
+            .where(Service.user_id == "bench", Service.service_date >= date.today() - timedelta(days=30))
+        )
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).fetchall()
+                count("reads")
+            except OperationalError:
+                count("errors")
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(Service), [{
+                        "asset_id": 1, "user_id": "bench", "service_type": "Tire Rotation",
+                        "service_date": date.today(), "service_status": "Pending",
+                    }])
+                count("writes")
+            except OperationalError:
+                count("errors")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in counters.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--services", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors/s':>12}")
+    for profile in (False, True):
+        path = os.path.join(tempfile.mkdtemp(prefix="mater-bench-"), "bench.db")
+        engine = build_engine(path, profile)
+        Base.metadata.create_all(bind=engine)
+        seed(engine, args.services)
+        result = run(engine, args.readers, args.writers, args.seconds)
+        label = "on" if profile else "off"
+        print(f"{label:<10}{result['reads']:>12.0f}{result['writes']:>12.0f}{result['errors']:>12.1f}")
+        drop_db(engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 #/blueprints/asset.py
-import os, shutil, zipfile, csv, io, tempfile
+import csv
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app, send_file, after_this_request
-from werkzeug.utils import secure_filename
-from utils.jwt.jwt_utils import retrieve_username_jwt
-from utils.storage.storage_utils import get_image_upload_folder, allowed_file, get_asset_upload_folder
+from flask import Blueprint, Response, request, jsonify, current_app
+from utils.jwt.jwt_utils import retrieve_username_jwt, get_request_user_id
+from utils.storage.storage_utils import allowed_file
+from utils.blob.blob_utils import store_upload, asset_files
+from utils.archive.archive_utils import iter_files_zip
+from utils.image.image_utils import image_pipeline, asset_image_fields
+from utils.query.query_utils import user_asset_rows
+from utils.pagination.pagination_utils import get_page_params, keyset_page
+from utils.bulk.bulk_utils import import_assets
+from utils.deletion.deletion_utils import delete_assets
 from models.asset import Asset
 from models.serviceattachment import ServiceAttachment
 
@@ -13,24 +19,17 @@ assets_blueprint = Blueprint("assets", __name__, template_folder="../templates")
 
 def create_image(file, new_asset, asset_id):
     try:
-        # Check if there is an existing image and delete it if present
-        if new_asset.image_path:
-            existing_image_path = new_asset.image_path
-            if os.path.exists(existing_image_path):
-                os.remove(existing_image_path)
-                current_app.logger.info(f"Deleted old image at: {existing_image_path}")
-
-        # Save the new image if it exists and is allowed
+        # Save the new image if it exists and is allowed. The previous image is
+        # released when the asset is committed and collected once nothing uses it
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            image_upload_folder = get_image_upload_folder(asset_id)
-            os.makedirs(image_upload_folder, exist_ok=True)  # Create folder if it doesn't exist
-            file_path = os.path.join(image_upload_folder, filename)
-            file.save(file_path)  # Save the new image file
+            stored, _ = store_upload(current_app.config["current_db"].session, file)
 
             # Update the image path in the asset
-            new_asset.image_path = file_path
-            current_app.logger.info(f"Saved new image at: {file_path}")
+            new_asset.image_path = stored.path
+            current_app.logger.info(f"Saved new image at: {stored.path}")
+
+            # Thumbnails are rendered on the image worker processes
+            image_pipeline.submit(stored.path, stored.sha256, logger=current_app.logger)
     except Exception as e:
         current_app.logger.error(f"Error uploading image: {e}")
 
@@ -128,8 +127,11 @@ def edit_asset(asset_id):
     # Handle asset editing, including updating details and processing a new image
     session = current_app.config["current_db"].session
     if request.method == "GET":
-        # Fetch and return asset details
-        asset = session.query(Asset).filter_by(id=asset_id).first()
+        # Fetch and return the details of one of the user's assets
+        user_id = get_request_user_id()
+        if not user_id:
+            return jsonify({"error": "Invalid JWT token"}), 401
+        asset = session.query(Asset).filter_by(user_id=user_id, id=asset_id).first()
         if not asset:
             return jsonify({"error": "Asset not found"}), 404
 
@@ -138,8 +140,7 @@ def edit_asset(asset_id):
             "asset_sn": asset.asset_sn,
             "description": asset.description,
             "acquired_date": str(asset.acquired_date),
-            "image_path": asset.image_path,
-            "user_id": asset.user_id,
+            **asset_image_fields(asset_id, asset.image_path),
             "asset_status": asset.asset_status,
         }
         return jsonify(asset_details), 200
@@ -182,7 +183,7 @@ def edit_asset(asset_id):
             "asset_sn": asset.asset_sn,
             "description": asset.description,
             "acquired_date": str(asset.acquired_date),
-            "image_path": asset.image_path,
+            **asset_image_fields(asset_id, asset.image_path),
             "user_id": asset.user_id,
             "asset_status": asset.asset_status,
         }
@@ -206,20 +207,29 @@ def all_assets():
     if not user_id:
         return jsonify({"error": "Invalid JWT token"}), 401
 
+    # Optional keyset pagination: send `limit` and the previous `next_cursor`
+    try:
+        paginate, limit, cursor = get_page_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     session = current_app.config["current_db"].session
     try:
         # Fetch assets for the user
-        assets = session.query(Asset).filter_by(user_id=user_id).all()
-        asset_list = [{
-            "id": asset.id,
-            "name": asset.name,
-            "asset_sn": asset.asset_sn,
-            "description": asset.description,
-            "acquired_date": str(asset.acquired_date),
-            "image_path": asset.image_path,
-            "asset_status": asset.asset_status
-        } for asset in assets]
-        return jsonify({"assets": asset_list}), 200
+        query = user_asset_rows(session, user_id)
+        if paginate:
+            assets, next_cursor = keyset_page(query, [Asset.id], cursor, limit)
+        else:
+            assets = query.all()
+        response = {"assets": Asset.serialize_rows(assets)}
+        for asset in response["assets"]:
+            # Grid tiles load the thumbnails; the stored path is not exposed
+            asset.update(asset_image_fields(asset["id"], asset.pop("image_path")))
+        if paginate:
+            response["next_cursor"] = next_cursor
+        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error retrieving assets: {e}")
         return jsonify({"error": f"Error retrieving assets: {e}"}), 500
@@ -228,7 +238,8 @@ def all_assets():
 
 @assets_blueprint.route("/asset_delete/<int:asset_id>", methods=["POST"])
 def delete_asset(asset_id):
-    # Delete an asset along with its associated services and files
+    # Delete an asset along with its services, attachments, notes and costs; its
+    # files are removed in the background
     session = current_app.config["current_db"].session
     try:
         # Extract JWT token from the request
@@ -238,26 +249,17 @@ def delete_asset(asset_id):
             return jsonify({"error": "JWT token is missing"}), 400
         user_id = retrieve_username_jwt(jwt_token)
 
-        # Fetch asset to delete
-        asset = session.query(Asset).filter_by(id=asset_id).first()
-        if not asset:
+        # Fetch the owner of the asset to delete
+        owner_id = session.query(Asset.user_id).filter_by(id=asset_id).scalar()
+        if owner_id is None:
             return jsonify({"error": "Asset not found"}), 404
-        
-        asset_folder = get_asset_upload_folder(asset_id)
 
         # Check if asset belongs to the user
-        if asset.user_id != user_id:
+        if owner_id != user_id:
             return jsonify({"error": "Unauthorized to delete this asset"}), 403
 
-        # Delete the asset and its services (the cascade should handle attachments)
-        session.delete(asset)
+        delete_assets(session, [asset_id])
         session.commit()
-
-        # Remove the asset folder if it exists
-        if os.path.isdir(asset_folder):
-            shutil.rmtree(asset_folder)
-
-        return jsonify({"message": "Asset and its associated services deleted successfully"}), 200
     except Exception as e:
         current_app.logger.error(f"Error deleting asset: {e}")
         session.rollback()  # Rollback on error
@@ -265,6 +267,11 @@ def delete_asset(asset_id):
     finally:
         session.close()  # Ensure session is closed
 
+    runner = current_app.config.get("job_runner")
+    if runner:
+        runner.wake_sweeper()  # Purge the tombstoned files now rather than at the next sweep
+    return jsonify({"message": "Asset and its associated services deleted successfully"}), 200
+
 @assets_blueprint.route("/generate_zip/<int:asset_id>", methods=["POST"])
 def export_assets(asset_id):
     # Export selected assets and all folders to zip file.
@@ -280,32 +287,21 @@ def export_assets(asset_id):
 
     session = current_app.config["current_db"].session
     try:
-        asset = session.query(Asset).filter_by(id=asset_id).first()
+        asset = session.query(Asset).filter_by(id=asset_id, user_id=user_id).first()
         if not asset:
             return jsonify({"error": "Asset not found."}), 404
 
-        zip_filename = f"assets_{user_id}.zip"
-        zip_path = os.path.join(current_app.instance_path, zip_filename)
-
-        with zipfile.ZipFile(zip_path, 'w') as zip_file:
-            asset_folder = get_asset_upload_folder(asset.id)
-            if os.path.isdir(asset_folder):
-                for root, _, files in os.walk(asset_folder):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        zip_file.write(file_path, os.path.relpath(file_path, asset_folder))
-            else:
-                return jsonify({"error": "No files for this asset."}), 404
-
-        @after_this_request
-        def cleanup(response):
-            try:
-                os.remove(zip_path)
-            except Exception as e:
-                current_app.logger.error(f"Error cleaning up zip file: {e}")
-            return response
-
-        return send_file(zip_path, as_attachment=True, mimetype='application/zip')
+        files = list(asset_files(session, asset))
+        if not files:
+            return jsonify({"error": "No files for this asset."}), 404
+
+        # Stream the archive while it is built instead of writing it to disk first
+        workers = current_app.config.get("ARCHIVE_READ_WORKERS", 4)
+        return Response(
+            iter_files_zip(files, workers=workers),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f"attachment; filename=assets_{asset.id}.zip"},
+        )
     except Exception as e:
         current_app.logger.error(f"Error exporting assets: {e}")
         return jsonify({"error": "Error exporting assets."}), 500
@@ -314,7 +310,14 @@ def export_assets(asset_id):
 
 @assets_blueprint.route('/upload_assets', methods=['POST'])
 def upload_assets():
-    """Endpoint to upload assets from a CSV file."""
+    """
+    Endpoint to upload assets from a CSV file (columns name, description, asset_sn,
+    acquired_date). Rows need a name, an asset_sn and an acquired_date in
+    YYYY-MM-DD, MM/DD/YYYY or DD/MM/YYYY; imported assets get the default status.
+    Response: {"imported", "successful_uploads", "failed_uploads", "errors"}, where
+    each error is {"line", "name", "error"} and "line" is the 1-based line of the
+    file the row starts on (the header is line 1).
+    """
 
     # Get the JWT token from form data (not JSON)
     jwt_token = request.form.get("jwt")
@@ -332,47 +335,18 @@ def upload_assets():
     if not csv_file:
         return jsonify({"error": "No file uploaded"}), 400
 
-    # Use StringIO to read the CSV file
-    stream = io.StringIO(csv_file.stream.read().decode("UTF8"), newline=None)
-    reader = csv.DictReader(stream)
-
-    successful_uploads = []
-    failed_uploads = []
-
-    for row in reader:
-        # Prepare the request_dict for asset creation
-        acquired_date_str = row.get("acquired_date")
-
-        # Try parsing the acquired_date with multiple formats
-        date_formats = ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']
-        acquired_date = None
-        for fmt in date_formats:
-            try:
-                acquired_date = datetime.strptime(acquired_date_str, fmt).date()
-                break  # Exit loop once a valid format is found
-            except ValueError:
-                continue
-
-        if not acquired_date:
-            failed_uploads.append(f"{row.get('name')}: Invalid date format")
-            continue
-
-        request_dict = {
-            "name": row.get("name"),
-            "description": row.get("description"),
-            "asset_sn": row.get("asset_sn"),
-            "acquired_date": acquired_date.strftime('%Y-%m-%d'),  # Ensure the date is in the desired format
-        }
-
-        # Since there are no images in bulk uploads, pass an empty dict for request_image
-        result = create_asset(request_dict, user_id, request_image={})
-        
-        if result:
-            successful_uploads.append(row.get("name"))
-        else:
-            failed_uploads.append(row.get("name"))
+    # Stream the upload into batched inserts inside a single transaction
+    session = current_app.config["current_db"].session
+    try:
+        report = import_assets(session, user_id, csv_file.stream)
+    except (csv.Error, UnicodeDecodeError) as e:
+        session.rollback()  # Nothing is kept from a malformed file
+        return jsonify({"error": f"Invalid CSV file: {e}"}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error importing assets: {e}")
+        session.rollback()
+        return jsonify({"error": "Error importing assets."}), 500
+    finally:
+        session.close()
 
-    return jsonify({
-        "successful_uploads": successful_uploads,
-        "failed_uploads": failed_uploads
-    }), 200
\ No newline at end of file
+    return jsonify(report), 200
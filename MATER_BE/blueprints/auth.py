@@ -4,11 +4,13 @@ from ulid import ULID
 import jwt, re, bcrypt
 from models.user import User
 from models.mfa import MFA
-from utils.jwt.jwt_utils import validate_user, generate_jwt, get_user_by_email, get_user_by_username, retrieve_username_jwt, check_admin
+from utils.jwt.jwt_utils import validate_user, generate_jwt, get_user_by_email, get_user_by_username, retrieve_username_jwt, get_request_user_id, check_admin, extract_request_token, invalidate_token, invalidate_user_auth
 from utils.notifications.notifications_utils import send_email_notification
 from utils.mfa.mfa_utils import verify_otp, generate_otp_code, create_otp_entry
 from utils.validation.validation_utils import validate_email
-from utils.config.config_utils import log_failed_login
+from utils.config.config_utils import log_failed_login, get_global_setting, settings_cache
+from utils.pagination.pagination_utils import get_page_params, keyset_page
+from utils.deletion.deletion_utils import delete_user as delete_user_data
 
 # Create a Blueprint for authentication routes
 auth_blueprint = Blueprint("auth", __name__, template_folder="../templates")
@@ -149,6 +151,9 @@ def logout():
         "message": "Logged out"
     }
     """
+    # Forget the verified token so it is checked again on its next use
+    invalidate_token(extract_request_token())
+
     if "access_token" in request.cookies:
         response = make_response(redirect("/"))
         response.set_cookie("access_token", "", expires=0)
@@ -184,6 +189,7 @@ def reset_password(user_id: str):
     try:
         session = current_app.config["current_db"].session
         session.commit()
+        invalidate_user_auth(user_id)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -227,6 +233,7 @@ def user_reset_password_self():
 
     try:
         session.commit()
+        invalidate_user_auth(user_id)
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -247,26 +254,31 @@ def delete_user(user_id: str):
     if admin_check:
         return admin_check  # Return the admin check response directly
 
-    # Get the ID of the authenticated user from the JWT token
-    auth_user_id = retrieve_username_jwt(data.get('jwt'))
+    # Get the ID of the authenticated user from the token check_admin accepted
+    auth_user_id = get_request_user_id(allow_cookie=False)
 
     if auth_user_id == user_id:
         return jsonify({"error": "Cannot delete your own account"}), 403
 
     session = current_app.config["current_db"].session
-    user = session.query(User).get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-
     try:
-        session.delete(user)
+        # Set-based: a user with thousands of assets is still a few statements
+        if not delete_user_data(session, user_id):
+            return jsonify({'error': 'User not found'}), 404
         session.commit()
-        return jsonify({'message': 'User deleted successfully'}), 200
+        invalidate_user_auth(user_id)
+        settings_cache.invalidate()  # Their local settings are gone
     except Exception as e:
+        session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         session.close()
 
+    runner = current_app.config.get("job_runner")
+    if runner:
+        runner.wake_sweeper()  # Purge the tombstoned files now rather than at the next sweep
+    return jsonify({'message': 'User deleted successfully'}), 200
+
 
 @auth_blueprint.route("/create_user", methods=["POST"])
 def create_user():
@@ -313,6 +325,7 @@ def create_user():
         session = current_app.config["current_db"].session
         session.add(new_user)
         session.commit()
+        invalidate_user_auth(user_id)  # No stale "missing user" role for the new ID
         return jsonify({"message": "User created successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -330,16 +343,26 @@ def users_all():
         print("Admin check failed")  # Add logging
         return admin_check  # Return admin check directly
 
+    # Optional keyset pagination: send `limit` and the previous `next_cursor`
     try:
-        # Fetch all users
-        users = current_app.config["current_db"].session.query(User).all()
-        user_list = [{
-            "id": user.id,
-            "username": user.username,
-            "is_admin": user.is_admin,
-        } for user in users]
-        return jsonify({"users": user_list}), 200
+        paginate, limit, cursor = get_page_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
+        # Fetch all users (ULID ids sort by creation time)
+        query = current_app.config["current_db"].session.query(*User.serialize_columns())
+        if paginate:
+            users, next_cursor = keyset_page(query, [User.id], cursor, limit)
+        else:
+            users = query.all()
+        response = {"users": User.serialize_rows(users)}
+        if paginate:
+            response["next_cursor"] = next_cursor
+        return jsonify(response), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching users: {str(e)}")
         return jsonify({"error": "Failed to fetch users"}), 500
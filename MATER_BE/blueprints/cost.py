@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
+import re
 from models.cost import Cost
+from models.asset import Asset
+from models.costrollup import AssetCostRollup, MonthlyCostRollup
 from utils.jwt.jwt_utils import retrieve_username_jwt
 from datetime import datetime
 
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
 # Create a Blueprint for cost routes
 cost_blueprint = Blueprint("costs", __name__, template_folder="../templates")
 
@@ -20,8 +25,8 @@ def costs():
         session = current_app.config["current_db"].session
         try:
             # Fetch costs based on type and type_id
-            costs = session.query(Cost).filter_by(type=cost_type, type_id=type_id).all()
-            return jsonify(costs=[cost.to_dict() for cost in costs])
+            costs = session.query(*Cost.serialize_columns()).filter_by(type=cost_type, type_id=type_id).all()
+            return jsonify(costs=Cost.serialize_rows(costs))
         except Exception as e:
             current_app.logger.error(f"Error retrieving costs: {e}")
             return jsonify({"error": f"Error retrieving costs: {e}"}), 500
@@ -116,3 +121,77 @@ def cost_detail(id):
             return jsonify({"error": f"Error deleting cost: {e}"}), 500
         finally:
             session.close()
+
+
+def analytics_user_id():
+    """
+    Return (user_id, None) from the JSON body token, or (None, error response).
+    """
+    data = request.get_json(silent=True) or {}
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return None, (jsonify({"error": "JWT token is missing"}), 400)
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return None, (jsonify({"error": "Invalid JWT token"}), 401)
+    return user_id, None
+
+@cost_blueprint.route('/analytics/assets', methods=['POST'])
+def cost_analytics_assets():
+    """Total spend per asset of the caller, highest first, read from the asset rollup."""
+    user_id, error = analytics_user_id()
+    if error:
+        return error
+
+    session = current_app.config["current_db"].session
+    try:
+        rows = (
+            session.query(*AssetCostRollup.serialize_columns(), Asset.name)
+            .outerjoin(Asset, Asset.id == AssetCostRollup.asset_id)
+            .filter(AssetCostRollup.user_id == user_id, AssetCostRollup.cost_count > 0)
+            .order_by(AssetCostRollup.total.desc(), AssetCostRollup.asset_id)
+            .all()
+        )
+        keys = AssetCostRollup.serialize_fields + ("asset_name",)
+        return jsonify(assets=[dict(zip(keys, row)) for row in rows]), 200
+    except Exception as e:
+        current_app.logger.error(f"Error reading asset cost rollups: {e}")
+        return jsonify({"error": "Error reading cost analytics"}), 500
+    finally:
+        session.close()
+
+@cost_blueprint.route('/analytics/monthly', methods=['POST'])
+def cost_analytics_monthly():
+    """
+    Spend per month of the caller from the monthly rollup. Optional `start` and
+    `end` ('YYYY-MM', inclusive) limit the range; undated costs are listed as
+    'undated' only without a range.
+    """
+    user_id, error = analytics_user_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    start, end = data.get("start"), data.get("end")
+    for name, value in (("start", start), ("end", end)):
+        if value is not None and not MONTH_PATTERN.match(str(value)):
+            return jsonify({"error": f"{name} must be a month in YYYY-MM format"}), 400
+
+    session = current_app.config["current_db"].session
+    try:
+        query = session.query(*MonthlyCostRollup.serialize_columns()).filter(
+            MonthlyCostRollup.user_id == user_id, MonthlyCostRollup.cost_count > 0
+        )
+        if start or end:
+            query = query.filter(MonthlyCostRollup.month != "undated")
+        if start:
+            query = query.filter(MonthlyCostRollup.month >= start)
+        if end:
+            query = query.filter(MonthlyCostRollup.month <= end)
+        months = MonthlyCostRollup.serialize_rows(query.order_by(MonthlyCostRollup.month).all())
+        return jsonify(months=months, total=sum(month["total"] for month in months)), 200
+    except Exception as e:
+        current_app.logger.error(f"Error reading monthly cost rollups: {e}")
+        return jsonify({"error": "Error reading cost analytics"}), 500
+    finally:
+        session.close()
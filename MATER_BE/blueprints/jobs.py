@@ -0,0 +1,114 @@
+#/src/blueprints/jobs.py
+import os
+from flask import Blueprint, request, jsonify, current_app, send_file
+from utils.jwt.jwt_utils import retrieve_username_jwt, check_admin
+from utils.jobs.jobs_utils import JOB_HANDLERS, new_job_id, job_input_path, get_job_folder, submit_job
+from models.job import Job
+
+# Create a Blueprint for background job routes
+jobs_blueprint = Blueprint("jobs", __name__, template_folder="../templates")
+
+# Job kinds that read every user's data
+ADMIN_JOB_KINDS = {"export_tables", "generate_zip"}
+
+def get_user_job(data, job_id):
+    """
+    Return (job, None) for the caller's job, or (None, error response).
+    """
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return None, (jsonify({"error": "JWT token is missing"}), 400)
+
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return None, (jsonify({"error": "Invalid JWT token"}), 401)
+
+    session = current_app.config["current_db"].session
+    job = session.query(Job).filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        return None, (jsonify({"error": "Job not found"}), 404)
+    return job, None
+
+@jobs_blueprint.route("/submit", methods=["POST"])
+def submit():
+    """
+    Queue a job. JSON body: {"jwt", "kind", "params"}. The upload_assets kind is
+    sent as multipart form data with "jwt", "kind" and the CSV in "bulk_file"; its
+    artifact is the report described on /assets/upload_assets.
+    """
+    data = request.get_json(silent=True) or request.form.to_dict()
+
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return jsonify({"error": "JWT token is missing"}), 400
+
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return jsonify({"error": "Invalid JWT token"}), 401
+
+    kind = data.get("kind")
+    if kind not in JOB_HANDLERS:
+        return jsonify({"error": f"Unknown job kind: {kind}"}), 400
+
+    if kind in ADMIN_JOB_KINDS:
+        admin_check = check_admin(data)
+        if admin_check is not None:
+            return admin_check
+
+    params = data.get("params") or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+
+    job_id = new_job_id()
+    if kind == "upload_assets":
+        csv_file = request.files.get("bulk_file")
+        if not csv_file:
+            return jsonify({"error": "No file uploaded"}), 400
+        # Keep the upload on disk until a worker picks the job up
+        os.makedirs(get_job_folder(), exist_ok=True)
+        params = {"input_path": job_input_path(job_id)}
+        csv_file.save(params["input_path"])
+
+    try:
+        job = submit_job(user_id, kind, params, job_id=job_id)
+    except Exception as e:
+        current_app.logger.error(f"Error submitting job: {e}")
+        current_app.config["current_db"].session.rollback()
+        if "input_path" in params and os.path.exists(params["input_path"]):
+            os.remove(params["input_path"])
+        return jsonify({"error": "Error submitting job"}), 500
+
+    return jsonify(job.to_dict()), 202
+
+@jobs_blueprint.route("/status/<job_id>", methods=["POST"])
+def status(job_id):
+    """
+    Return the status and progress of one of the caller's jobs.
+    """
+    job, error = get_user_job(request.get_json(silent=True) or {}, job_id)
+    if error:
+        return error
+    return jsonify(job.to_dict()), 200
+
+@jobs_blueprint.route("/result/<job_id>", methods=["POST"])
+def result(job_id):
+    """
+    Download the artifact of a finished job.
+    """
+    job, error = get_user_job(request.get_json(silent=True) or request.form.to_dict(), job_id)
+    if error:
+        return error
+
+    if job.status in ("queued", "running"):
+        return jsonify({"error": "Job has not finished", "status": job.status}), 409
+    if job.status == "failed":
+        return jsonify({"error": job.message or "Job failed", "status": job.status}), 409
+    if job.status == "expired" or not job.artifact_path or not os.path.exists(job.artifact_path):
+        return jsonify({"error": "Job result has expired"}), 410
+
+    return send_file(
+        os.path.abspath(job.artifact_path),
+        as_attachment=True,
+        download_name=job.artifact_name or os.path.basename(job.artifact_path),
+        conditional=True,
+    )
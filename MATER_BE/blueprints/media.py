@@ -0,0 +1,98 @@
+#/src/blueprints/media.py
+import os
+import re
+from flask import Blueprint, jsonify, send_file, abort, request, current_app
+from sqlalchemy import select
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from utils.blob.blob_utils import blob_path, blob_sha256
+from utils.image.image_utils import DERIVATIVE_NAMES, derivative_path, derivative_mimetype, image_pipeline
+from utils.jwt.jwt_utils import get_request_user_id
+from utils.media.media_utils import send_media, guess_mimetype, sniff_image_mimetype
+
+# Create a Blueprint for media routes
+media_blueprint = Blueprint("media", __name__, template_folder="../templates")
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# Derivative URLs contain the hash of the original, so their content never changes
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@media_blueprint.route("/images/<sha256>/<name>", methods=["GET"])
+def image_derivative(sha256, name):
+    """
+    Serve a resized copy of an asset image, e.g. /media/images/<sha256>/thumb.webp.
+    The URL is only known to clients that listed the asset, and it is cacheable
+    by browsers and proxies for a year. A derivative that is not rendered yet
+    (upload still processing, image older than the pipeline) is rendered on demand,
+    but only for a blob that is an asset image; attachments are never decoded.
+    """
+    if not SHA256_PATTERN.match(sha256) or name not in DERIVATIVE_NAMES:
+        abort(404)
+
+    path = derivative_path(sha256, name)
+    if not os.path.isfile(path):
+        source = blob_path(sha256)
+        session = current_app.config["current_db"].session
+        is_asset_image = session.execute(
+            select(Asset.id).where(Asset.image_path == source).limit(1)
+        ).first() is not None
+        if not is_asset_image or not os.path.isfile(source) or not image_pipeline.ensure(source, sha256):
+            return jsonify({"error": "Image not found"}), 404
+
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=derivative_mimetype(name),
+        conditional=True,
+        etag=f"{sha256}-{name}",
+        max_age=IMMUTABLE_MAX_AGE,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@media_blueprint.route("/assets/<int:asset_id>/image", methods=["GET"])
+def asset_image(asset_id):
+    """
+    Serve the original image of one of the caller's assets. The token is read from
+    the Authorization header or the access_token cookie.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Invalid or missing JWT token"}), 401
+
+    session = current_app.config["current_db"].session
+    image_path = session.execute(
+        select(Asset.image_path).where(Asset.id == asset_id, Asset.user_id == user_id)
+    ).scalar()
+    if not image_path or not os.path.isfile(image_path):
+        return jsonify({"error": "Image not found"}), 404
+    return send_media(image_path, sniff_image_mimetype(image_path), etag=blob_sha256(image_path))
+
+@media_blueprint.route("/attachments/<int:attachment_id>", methods=["GET"])
+def attachment(attachment_id):
+    """
+    Serve one of the caller's service attachments; ?download=1 asks the browser to
+    save it instead of displaying it. Supports Range and conditional requests.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Invalid or missing JWT token"}), 401
+
+    session = current_app.config["current_db"].session
+    row = session.execute(
+        select(ServiceAttachment.attachment_path, ServiceAttachment.file_name, ServiceAttachment.mime_type)
+        .join(Service, Service.id == ServiceAttachment.service_id)
+        .where(ServiceAttachment.id == attachment_id, Service.user_id == user_id)
+    ).first()
+    if row is None or not row.attachment_path or not os.path.isfile(row.attachment_path):
+        return jsonify({"error": "Attachment not found"}), 404
+    file_name = row.file_name or os.path.basename(row.attachment_path)
+    return send_media(
+        row.attachment_path,
+        row.mime_type or guess_mimetype(file_name),
+        file_name,
+        as_attachment=request.args.get("download") == "1",
+        etag=blob_sha256(row.attachment_path),
+    )
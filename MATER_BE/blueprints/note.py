@@ -21,8 +21,8 @@ def notes():
         session = current_app.config["current_db"].session
         try:
             # Fetch notes based on type and type_id
-            notes = session.query(Note).filter_by(type=note_type, type_id=type_id).all()
-            return jsonify(notes=[note.to_dict() for note in notes])  # Ensure to_dict method is implemented for serialization
+            notes = session.query(*Note.serialize_columns()).filter_by(type=note_type, type_id=type_id).all()
+            return jsonify(notes=Note.serialize_rows(notes))
         except Exception as e:
             current_app.logger.error(f"Error retrieving notes: {e}")
             return jsonify({"error": f"Error retrieving notes: {e}"}), 500
@@ -0,0 +1,70 @@
+#/src/blueprints/search.py
+from flask import Blueprint, request, jsonify, current_app
+from utils.jwt.jwt_utils import retrieve_username_jwt
+from utils.pagination.pagination_utils import encode_cursor, decode_cursor
+from utils.search.search_utils import search, KIND_CODES, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+
+# Create a Blueprint for search routes
+search_blueprint = Blueprint("search", __name__, template_folder="../templates")
+
+def get_search_params(data):
+    """
+    Read `kinds`, `limit` and `cursor` from a search payload. Results are ranked,
+    so the cursor carries the offset of the next page. Raises ValueError.
+    """
+    kinds = data.get("kinds") or list(KIND_CODES)
+    if not isinstance(kinds, list) or any(kind not in KIND_CODES for kind in kinds):
+        raise ValueError(f"kinds must be a list of: {', '.join(KIND_CODES)}")
+
+    try:
+        limit = int(data.get("limit") or DEFAULT_SEARCH_LIMIT)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+
+    offset = 0
+    if data.get("cursor"):
+        values = decode_cursor(data["cursor"])
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise ValueError("Invalid cursor")
+        offset = values[0]
+    return kinds, limit, offset
+
+@search_blueprint.route("", methods=["POST"])
+def search_all():
+    """
+    Full-text search over the caller's assets, services and notes.
+    JSON body: {"jwt", "q", "kinds", "limit", "cursor"}; send the returned
+    next_cursor to get the following page.
+    """
+    data = request.get_json(silent=True) or {}
+
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return jsonify({"error": "JWT token is missing"}), 400
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return jsonify({"error": "Invalid JWT token"}), 401
+
+    query = data.get("q")
+    if not isinstance(query, str) or not query.strip():
+        return jsonify({"error": "Search query is missing"}), 400
+
+    try:
+        kinds, limit, offset = get_search_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    session = current_app.config["current_db"].session
+    try:
+        results, has_more = search(session, user_id, query, kinds, limit, offset)
+        return jsonify({
+            "results": results,
+            "next_cursor": encode_cursor([offset + limit]) if has_more else None,
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error searching: {e}")
+        return jsonify({"error": "Error searching"}), 500
+    finally:
+        session.close()
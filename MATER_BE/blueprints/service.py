@@ -1,14 +1,13 @@
 #/src/blueprints/service.py
 
-from flask import Blueprint, request, render_template, jsonify, current_app
+from flask import Blueprint, request, render_template, jsonify, current_app, abort
 from datetime import datetime, timedelta
-import os
-from werkzeug.utils import secure_filename
-from models.asset import Asset
 from models.service import Service
-from models.serviceattachment import ServiceAttachment
-from utils.jwt.jwt_utils import retrieve_username_jwt
-from utils.storage.storage_utils import get_attachment_upload_folder
+from utils.jwt.jwt_utils import retrieve_username_jwt, get_request_user_id
+from utils.blob.blob_utils import store_attachment
+from utils.query.query_utils import user_assets, user_service_with_attachments, user_service_rows, SERVICE_ROW_FIELDS
+from utils.pagination.pagination_utils import get_page_params, keyset_page
+from utils.dashboard.dashboard_utils import build_dashboard, DEFAULT_UPCOMING, MAX_UPCOMING
 
 services_blueprint = Blueprint("service", __name__, template_folder="../templates")
 
@@ -17,35 +16,22 @@ from datetime import datetime
 def save_attachments(attachments, asset_id, service_id, user_id):
     # Function to save attachments and return a list of attachment paths
     attachment_paths = []
+    session = current_app.config["current_db"].session
     for attachment in attachments:
         try:
             if attachment:
-                folder = get_attachment_upload_folder(asset_id, service_id)
-                if not os.path.exists(folder):
-                    os.makedirs(folder)
-                
-                # Use the current date and time to create a unique filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{timestamp}_{secure_filename(attachment.filename)}"
-                attachment_path = os.path.join(folder, filename)
-                print(f"Saving attachment to: {attachment_path}")  # Log the path
-
-                # Save the file
-                attachment.save(attachment_path)
-                attachment_paths.append(attachment_path)
-
-                # Create a new database record
-                new_attachment = ServiceAttachment(
-                    service_id=service_id, attachment_path=attachment_path, user_id=user_id
-                )
-                current_app.config["current_db"].session.add(new_attachment)
-                
+                # Identical content is stored once and shared between attachments
+                new_attachment = store_attachment(session, attachment, service_id, user_id)
+                attachment_paths.append(new_attachment.attachment_path)
+                session.add(new_attachment)
+
                 # Commit the database changes
-                current_app.config["current_db"].session.commit()
-                print(f"Attachment saved and committed: {attachment_path}")
+                session.commit()
+                current_app.logger.info(f"Attachment {new_attachment.file_name} stored as {new_attachment.attachment_path}")
 
         except Exception as e:
-            print(f"Error saving attachment: {e}")
+            current_app.logger.error(f"Error saving attachment: {e}")
+            session.rollback()
 
     return attachment_paths
 
@@ -148,13 +134,11 @@ def add_service():
 
 @services_blueprint.route("/service_edit/<int:service_id>", methods=["GET", "POST"])
 def service_edit(service_id):
-    user_id = retrieve_username_jwt(request.cookies.get("access_token"))
-    service = (
-        current_app.config["current_db"]
-        .session.query(Service)
-        .filter_by(id=service_id, user_id=user_id)
-        .first_or_404()
-    )
+    user_id = get_request_user_id()
+    session = current_app.config["current_db"].session
+    service = user_service_with_attachments(session, user_id, service_id).first()
+    if service is None:
+        abort(404)
     service_complete2 = False
     service_add_new = False
     if request.method == "POST":
@@ -187,35 +171,24 @@ def service_edit(service_id):
         service.service_complete = service_complete
 
         attachments = request.files.getlist("attachments")
-        attachment_paths = []
 
         for attachment in attachments:
             if attachment:
-                folder = get_attachment_upload_folder(asset_id, service_id)
-                if not os.path.exists(folder):
-                    os.makedirs(folder)
-                attachment_path = os.path.join(folder, secure_filename(attachment.filename))
-                attachment.save(attachment_path)
-                attachment_paths.append(attachment_path)
-
-        for attachment_path in attachment_paths:
-            new_attachment = ServiceAttachment(
-                service_id=service.id, attachment_path=attachment_path, user_id=user_id
-            )
-            current_app.config["current_db"].session.add(new_attachment)
+                new_attachment = store_attachment(session, attachment, service.id, user_id)
+                current_app.config["current_db"].session.add(new_attachment)
 
         current_app.config["current_db"].session.commit()
         return render_template(
             "service_edit.html",
             service=service,
-            assets = current_app.config["current_db"].session.query(Asset).all(),
+            assets = user_assets(session, user_id).all(),
             toast=True,
             loggedIn=True,
         )
     return render_template(
         "service_edit.html",
         service=service,
-        assets = current_app.config["current_db"].session.query(Asset).all(),
+        assets = user_assets(session, user_id).all(),
         toast=False,
         loggedIn=True,
     )
@@ -235,35 +208,32 @@ def all_services():
     if not user_id:
         return jsonify({"error": "Invalid JWT token"}), 401
 
+    # Optional keyset pagination: send `limit` and the previous `next_cursor`
     try:
-        filter_asset_id = data.get("filter_asset_name")
-
-        # Query services for the user
-        query = current_app.config["current_db"].session.query(Service).filter_by(user_id=user_id)
-        if filter_asset_id:
-            query = query.filter(Service.asset_id == filter_asset_id)
-
-        services = query.all()
+        paginate, limit, cursor = get_page_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        services_data = []
-        for service in services:
-            # Look up the asset name from the Asset table using the service.asset_id
-            asset = current_app.config["current_db"].session.query(Asset).filter_by(id=service.asset_id).first()
-            asset_name = asset.name if asset else "Unknown"  # Handle case if asset is not found
+    try:
+        filter_asset_id = data.get("filter_asset_name")
 
-            # Add the service data including the asset name
-            services_data.append({
-                'id': service.id,
-                'asset_name': asset_name,  # Include the asset name here
-                'service_type': service.service_type,
-                'service_date': service.service_date.isoformat(),
-                'service_status': service.service_status,
-            })
+        # Query service columns for the user, with each asset name joined into the same statement
+        session = current_app.config["current_db"].session
+        query = user_service_rows(session, user_id, filter_asset_id)
+        if paginate:
+            services, next_cursor = keyset_page(query, [Service.id], cursor, limit)
+        else:
+            services = query.all()
 
-        return jsonify({
-            'services': services_data,
-        }), 200
+        response = {
+            'services': Service.serialize_rows(services, SERVICE_ROW_FIELDS),
+        }
+        if paginate:
+            response['next_cursor'] = next_cursor
+        return jsonify(response), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in /service_all: {e}")
         return jsonify({"error": "Internal server error", "status_code": 500}), 500
@@ -271,39 +241,65 @@ def all_services():
     finally:
         current_app.config["current_db"].session.close()  # Ensure session is closed
 
-@services_blueprint.route("/services_overdue", methods=["GET"])
-def get_overdue_services():
-    user_id = retrieve_username_jwt(request.cookies.get("access_token"))
-    
-    # Get today's date
-    today = datetime.today().date()
-    
-    # Fetch overdue services
-    services = (
+def due_services_response(key, *conditions):
+    """
+    Serialized services of the caller matching `conditions`, soonest first.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Invalid or missing JWT token."}), 401
+
+    rows = (
         current_app.config["current_db"]
-        .session.query(Service)
-        .filter(Service.service_date < today, Service.user_id == user_id)
+        .session.query(*Service.serialize_columns())
+        .filter(Service.user_id == user_id, *conditions)
         .order_by(Service.service_date.asc())
         .all()
     )
+    return jsonify({key: Service.serialize_rows(rows)}), 200
 
-    return jsonify({"services_overdue": [service.to_dict() for service in services]}), 200
+@services_blueprint.route("/services_overdue", methods=["GET"])
+def get_overdue_services():
+    # Get today's date
+    today = datetime.today().date()
+    return due_services_response("services_overdue", Service.service_date < today)
 
 @services_blueprint.route("/services_due_30_days", methods=["GET"])
 def get_due_services():
-    user_id = retrieve_username_jwt(request.cookies.get("access_token"))
-    
     # Get today's date
     today = datetime.today().date()
     future_date = today + timedelta(days=30)
-    
-    # Fetch services due in the next 30 days
-    services = (
-        current_app.config["current_db"]
-        .session.query(Service)
-        .filter(Service.service_date >= today, Service.service_date <= future_date, Service.user_id == user_id)
-        .order_by(Service.service_date.asc())
-        .all()
+    return due_services_response(
+        "services_due", Service.service_date >= today, Service.service_date <= future_date
     )
 
-    return jsonify({"services_due": [service.to_dict() for service in services]}), 200
\ No newline at end of file
+@services_blueprint.route("/dashboard", methods=["POST"])
+def dashboard():
+    """
+    Maintenance overview of the caller computed in SQL: service counts by status,
+    by asset and by due-date bucket, plus the next `upcoming` open services.
+    """
+    data = request.get_json(silent=True) or {}
+
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return jsonify({"error": "JWT token is missing"}), 400
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return jsonify({"error": "Invalid JWT token"}), 401
+
+    try:
+        upcoming = int(data.get("upcoming", DEFAULT_UPCOMING))
+    except (TypeError, ValueError):
+        return jsonify({"error": "upcoming must be an integer"}), 400
+    if not 0 <= upcoming <= MAX_UPCOMING:
+        return jsonify({"error": f"upcoming must be between 0 and {MAX_UPCOMING}"}), 400
+
+    session = current_app.config["current_db"].session
+    try:
+        return jsonify(build_dashboard(session, user_id, datetime.today().date(), upcoming)), 200
+    except Exception as e:
+        current_app.logger.error(f"Error building dashboard: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+    finally:
+        session.close()
@@ -1,49 +1,109 @@
 #/src/blueprints/service_attachments.py
-from flask import request, Blueprint, current_app, flash, redirect, url_for
-from utils.storage.storage_utils import delete_attachment_from_storage
+from flask import request, Blueprint, current_app, jsonify
+from utils.blob.blob_utils import delete_attachments
+from utils.jwt.jwt_utils import retrieve_username_jwt
+from utils.pagination.pagination_utils import get_page_params, keyset_page, DEFAULT_PAGE_LIMIT
+from models.service import Service
 from models.serviceattachment import ServiceAttachment
 
 service_attachment_blueprint = Blueprint(
     "service_attachment", __name__, template_folder="../templates"
 )
 
-# Route to delete selected attachments
+# Largest selection accepted by one bulk delete, so its IN list stays one statement
+MAX_BULK_DELETE = 1000
+
 @service_attachment_blueprint.route("/delete_selected_attachments", methods=["POST"])
 def delete_selected_attachments():
-    try:  # Iterate through selected_attachments, which contains the IDs of selected attachments to delete
-        selected_attachments = request.form.getlist("selected_attachments[]")
-
-        service_id = None  # Initialize service_id to None
-
-        for (
-            attachment_id
-        ) in (
-            selected_attachments
-        ):  # Retrieve the ServiceAttachment record based on the attachment_id
-            attachment = ServiceAttachment.query.get(attachment_id)
-            if attachment:
-                delete_attachment_from_storage(
-                    attachment.attachment_path
-                )  # Call a function to delete the associated file from storage
-                service_id = attachment.service_id  # stored in service_id
-                # Retrieve the service_id associated with the attachment for potential redirection
-                current_app.config["current_db"].session.delete(
-                    attachment
-                )  # Delete the ServiceAttachment record from the database
-
-        current_app.config[
-            "current_db"
-        ].session.commit()  # Commit the changes to the database after deleting selected attachments
-        flash("Selected attachments deleted successfully.", "success")
+    """
+    Delete several of the caller's attachments at once.
+    JSON body: {"jwt", "attachment_ids": [...]}. Files are removed in the background.
+    """
+    data = request.get_json(silent=True) or {}
+
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return jsonify({"error": "JWT token is missing"}), 400
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return jsonify({"error": "Invalid JWT token"}), 401
+
+    attachment_ids = data.get("attachment_ids")
+    if (
+        not isinstance(attachment_ids, list)
+        or not attachment_ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in attachment_ids)
+    ):
+        return jsonify({"error": "attachment_ids must be a non-empty list of integers"}), 400
+    if len(attachment_ids) > MAX_BULK_DELETE:
+        return jsonify({"error": f"At most {MAX_BULK_DELETE} attachments can be deleted at once"}), 400
+
+    session = current_app.config["current_db"].session
+    try:
+        deleted = delete_attachments(session, user_id, set(attachment_ids))
+        session.commit()
+    except Exception as e:
+        current_app.logger.error(f"Error deleting attachments: {e}")
+        session.rollback()
+        return jsonify({"error": "Error deleting attachments"}), 500
+    finally:
+        session.close()
+
+    runner = current_app.config.get("job_runner")
+    if runner and deleted:
+        runner.wake_sweeper()  # Unlink the legacy files now rather than at the next sweep
+    missing = sorted(set(attachment_ids) - set(deleted))
+    return jsonify({"deleted": sorted(deleted), "not_found": missing}), 200
+
+def attachments_response(*conditions):
+    """
+    One page of the caller's attachments matching `conditions`, read from the
+    database only. JSON body: {"jwt", "limit", "cursor"}; pages default to
+    DEFAULT_PAGE_LIMIT rows.
+    """
+    data = request.get_json(silent=True) or {}
+
+    jwt_token = data.get("jwt")
+    if not jwt_token:
+        return jsonify({"error": "JWT token is missing"}), 400
+    user_id = retrieve_username_jwt(jwt_token)
+    if not user_id:
+        return jsonify({"error": "Invalid JWT token"}), 401
+
+    try:
+        _, limit, cursor = get_page_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    session = current_app.config["current_db"].session
+    try:
+        # Ownership is checked through the service in the same statement
+        query = (
+            session.query(*ServiceAttachment.serialize_columns())
+            .join(Service, Service.id == ServiceAttachment.service_id)
+            .filter(Service.user_id == user_id, *conditions)
+        )
+        rows, next_cursor = keyset_page(query, [ServiceAttachment.id], cursor, limit or DEFAULT_PAGE_LIMIT)
+        attachments = ServiceAttachment.serialize_rows(rows)
+        for attachment in attachments:
+            # The stored path itself is never returned; files are served by the media route
+            del attachment["attachment_path"]
+            attachment["url"] = f"/media/attachments/{attachment['id']}"
+        return jsonify({"attachments": attachments, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        # Handle exceptions appropriately (e.g., log the error, display an error message)
-        flash("An error occurred during the deletion of attachments.", "error")
-        print(f"Error: {e}")
+        current_app.logger.error(f"Error listing attachments: {e}")
+        return jsonify({"error": "Error listing attachments"}), 500
+    finally:
+        session.close()
 
-    if service_id is not None:
-        # Redirect to the service_edit page with the obtained service_id
-        return redirect(url_for("service.service_edit", service_id=service_id))
+@service_attachment_blueprint.route("/service/<int:service_id>", methods=["POST"])
+def service_attachments(service_id):
+    """List the attachments of one of the caller's services."""
+    return attachments_response(ServiceAttachment.service_id == service_id)
 
-    else:
-        # If service_id is not obtained, redirect to a default page or handle it accordingly
-        return redirect("/services/service_all")
+@service_attachment_blueprint.route("/asset/<int:asset_id>", methods=["POST"])
+def asset_attachments(asset_id):
+    """List the attachments of every service of one of the caller's assets."""
+    return attachments_response(Service.asset_id == asset_id)
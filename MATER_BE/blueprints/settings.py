@@ -1,13 +1,15 @@
 # blueprints/settings.py
-from flask import Blueprint, request, jsonify, current_app
+import hashlib
+import json
+from flask import Blueprint, request, jsonify, current_app, Response
 from models.appsettings import AppSettings
-from utils.jwt.jwt_utils import check_admin, retrieve_username_jwt
-from sqlalchemy import or_, and_
+from utils.jwt.jwt_utils import check_admin, retrieve_username_jwt, get_request_user_id
+from utils.config.config_utils import settings_cache
 
 settings_blueprint = Blueprint('settings', __name__)
 
 def get_user_id_from_jwt(data):
-    jwt_token = data.get("jwt")
+    jwt_token = (data or {}).get("jwt")
     if not jwt_token:
         current_app.logger.error("JWT token is missing")
         return None, jsonify({"error": "JWT token is missing"}), 400
@@ -17,50 +19,48 @@ def get_user_id_from_jwt(data):
         current_app.logger.error("Invalid JWT token")
         return None, jsonify({"error": "Invalid JWT token"}), 401
 
-    current_app.logger.info(f"User ID: {user_id}")
     return user_id, None, 200
 
+def setting_to_dict(setting):
+    return {
+        'id': setting.id,
+        'whatfor': setting.whatfor,
+        'value': setting.value,
+        'globalsetting': setting.globalsetting,
+        'user_id': setting.user_id
+    }
+
+def setting_values(whatfor):
+    """
+    Return the `whatfor` options visible to the caller, resolved from the settings cache.
+    """
+    user_id, error_response, status_code = get_user_id_from_jwt(request.get_json(silent=True))
+    if error_response:
+        return error_response, status_code
+
+    return jsonify([{
+        'value': setting.value,
+    } for setting in settings_cache.resolve(whatfor, user_id)]), 200
+
 @settings_blueprint.route('/appsettings', methods=['POST'])
 def get_appsettings():
     data = request.get_json()
-    current_app.logger.info(f"Request Data: {data}")
 
     user_id, error_response, status_code = get_user_id_from_jwt(data)
     if error_response:
         return error_response, status_code
 
-    settings = current_app.config["current_db"].session.query(AppSettings).filter(
-        AppSettings.globalsetting == True
-    ).all()
-
-    return jsonify([{
-        'id': setting.id,
-        'whatfor': setting.whatfor,
-        'value': setting.value,
-        'globalsetting': setting.globalsetting,
-        'user_id': setting.user_id
-    } for setting in settings]), 200
+    return jsonify([setting_to_dict(setting) for setting in settings_cache.global_settings()]), 200
 
 @settings_blueprint.route('/appsettings/local', methods=['POST'])
 def get_appsettings_local():
     data = request.get_json()
-    current_app.logger.info(f"Request Data: {data}")
 
     user_id, error_response, status_code = get_user_id_from_jwt(data)
     if error_response:
         return error_response, status_code
 
-    settings = current_app.config["current_db"].session.query(AppSettings).filter(
-        and_(AppSettings.user_id == user_id, AppSettings.globalsetting == False)
-    ).all()
-
-    return jsonify([{
-        'id': setting.id,
-        'whatfor': setting.whatfor,
-        'value': setting.value,
-        'globalsetting': setting.globalsetting,
-        'user_id': setting.user_id
-    } for setting in settings]), 200
+    return jsonify([setting_to_dict(setting) for setting in settings_cache.local_settings(user_id)]), 200
 
 @settings_blueprint.route('/appsettings/add', methods=['POST'])
 def add_appsetting():
@@ -69,8 +69,6 @@ def add_appsetting():
     value = data.get('value')
     globalsetting = data.get('globalsetting')
 
-    current_app.logger.info(f"Request Data: {data}")
-
     user_id, error_response, status_code = get_user_id_from_jwt(data)
     if error_response:
         return error_response, status_code
@@ -83,6 +81,7 @@ def add_appsetting():
     new_setting = AppSettings(whatfor=whatfor, value=value, globalsetting=globalsetting, user_id=user_id)
     current_app.config["current_db"].session.add(new_setting)
     current_app.config["current_db"].session.commit()
+    settings_cache.invalidate()
 
     return jsonify({'message': 'Setting added successfully'}), 201 if globalsetting else 202
 
@@ -103,13 +102,12 @@ def update_appsetting():
 
     setting.value = value
     current_app.config["current_db"].session.commit()
+    settings_cache.invalidate()
 
     return jsonify({'message': 'Setting updated successfully'}), 200
 
 @settings_blueprint.route('/appsettings/delete/<int:id>', methods=['DELETE'])
 def delete_appsetting(id):
-    current_app.logger.info(f"Received delete request for setting ID: {id}")
-
     setting = current_app.config["current_db"].session.query(AppSettings).filter_by(id=id).first()
     if not setting:
         current_app.logger.error("Setting not found")
@@ -128,117 +126,63 @@ def delete_appsetting(id):
     try:
         current_app.config["current_db"].session.delete(setting)
         current_app.config["current_db"].session.commit()
-        current_app.logger.info("Setting deleted successfully")
+        settings_cache.invalidate()
+        current_app.logger.info(f"Setting {id} deleted")
         return jsonify({'message': 'Setting deleted successfully'}), 200
     except Exception as e:
         current_app.logger.error(f"Error deleting setting: {str(e)}")
+        current_app.config["current_db"].session.rollback()
         return jsonify({'error': 'Failed to delete setting'}), 500
-  
+
 @settings_blueprint.route('/appsettings/assets/status', methods=['POST'])
 def get_appsettings_assets_status():
-    data = request.get_json()
-    current_app.logger.info(f"Request Data: {data}")
-
-    global_setting = current_app.config["current_db"].session.query(AppSettings).filter_by(whatfor="global_asset_status").first()
-    current_app.logger.info(f"global_setting: {global_setting.whatfor}")
-    jwt_token = data.get("jwt")
-    if not jwt_token:
-        current_app.logger.error("JWT token is missing")
-        return jsonify({"error": "JWT token is missing"}), 400
-
-    user_id = retrieve_username_jwt(jwt_token)
-    if not user_id:
-        current_app.logger.error("Invalid JWT token")
-        return jsonify({"error": "Invalid JWT token"}), 401
-
-    current_app.logger.info(f"User ID: {user_id}")
-
-    if global_setting:
-        if global_setting.value == "Yes":
-            settings = current_app.config["current_db"].session.query(AppSettings).filter_by(globalsetting=True, whatfor="asset_status").all()
-        else:
-            settings = current_app.config["current_db"].session.query(AppSettings).filter(
-                or_(
-                    and_(AppSettings.user_id == user_id, AppSettings.whatfor == "asset_status"),
-                    and_(AppSettings.globalsetting == True, AppSettings.whatfor == "asset_status")
-                )
-            ).all()
-    else:
-        settings = current_app.config["current_db"].session.query(AppSettings).filter_by(user_id=user_id,whatfor="asset_status").all()
-
-    return jsonify([{
-        'value': setting.value,
-    } for setting in settings]), 200
-
+    return setting_values("asset_status")
 
 @settings_blueprint.route('/appsettings/services/status', methods=['POST'])
 def get_appsettings_services_status():
-    data = request.get_json()
-    current_app.logger.info(f"Request Data: {data}")
-
-    global_setting = current_app.config["current_db"].session.query(AppSettings).filter_by(whatfor="global_service_status").first()
-    current_app.logger.info(f"global_setting: {global_setting.whatfor} {global_setting.value}")
-    jwt_token = data.get("jwt")
-    if not jwt_token:
-        current_app.logger.error("JWT token is missing")
-        return jsonify({"error": "JWT token is missing"}), 400
-
-    user_id = retrieve_username_jwt(jwt_token)
-    if not user_id:
-        current_app.logger.error("Invalid JWT token")
-        return jsonify({"error": "Invalid JWT token"}), 401
-
-    current_app.logger.info(f"User ID: {user_id}")
-
-    if global_setting:
-        if global_setting.value == "Yes":
-            settings = current_app.config["current_db"].session.query(AppSettings).filter_by(globalsetting=True, whatfor="service_status").all()
-        else:
-            settings = current_app.config["current_db"].session.query(AppSettings).filter(
-                or_(
-                    and_(AppSettings.user_id == user_id, AppSettings.whatfor == "service_status"),
-                    and_(AppSettings.globalsetting == True, AppSettings.whatfor == "service_status")
-                )
-            ).all()
-    else:
-        settings = current_app.config["current_db"].session.query(AppSettings).filter_by(user_id=user_id, whatfor="service_status").all()
-
-    return jsonify([{
-        'value': setting.value,
-    } for setting in settings]), 200
+    return setting_values("service_status")
 
 @settings_blueprint.route('/appsettings/services/type', methods=['POST'])
 def get_appsettings_services_type():
-    data = request.get_json()
-    current_app.logger.info(f"Request Data: {data}")
-
-    global_setting = current_app.config["current_db"].session.query(AppSettings).filter_by(whatfor="global_service_type").first()
-    current_app.logger.info(f"global_setting: {global_setting.whatfor} {global_setting.value}")
-    jwt_token = data.get("jwt")
-    if not jwt_token:
-        current_app.logger.error("JWT token is missing")
-        return jsonify({"error": "JWT token is missing"}), 400
-
-    user_id = retrieve_username_jwt(jwt_token)
+    return setting_values("service_type")
+
+@settings_blueprint.route('/appsettings/bootstrap', methods=['GET', 'POST'])
+def get_appsettings_bootstrap():
+    """
+    Return every lookup list the frontend needs on page load in one response:
+    the same lists as /appsettings, /appsettings/local and the three status/type
+    endpoints, resolved for the caller. The token is read from the JSON body,
+    Authorization header or access_token cookie. A repeat request sending the
+    returned ETag in If-None-Match gets a 304 without a body.
+    """
+    user_id = get_request_user_id()
     if not user_id:
-        current_app.logger.error("Invalid JWT token")
-        return jsonify({"error": "Invalid JWT token"}), 401
-
-    current_app.logger.info(f"User ID: {user_id}")
-
-    if global_setting:
-        if global_setting.value == "Yes":
-            settings = current_app.config["current_db"].session.query(AppSettings).filter_by(globalsetting=True, whatfor="service_type").all()
-        else:
-            settings = current_app.config["current_db"].session.query(AppSettings).filter(
-                or_(
-                    and_(AppSettings.user_id == user_id, AppSettings.whatfor == "service_type"),
-                    and_(AppSettings.globalsetting == True, AppSettings.whatfor == "service_type")
-                )
-            ).all()
+        return jsonify({"error": "Invalid or missing JWT token"}), 401
+
+    lists = {
+        "global": [setting_to_dict(setting) for setting in settings_cache.global_settings()],
+        "local": [setting_to_dict(setting) for setting in settings_cache.local_settings(user_id)],
+    }
+    for whatfor in ("asset_status", "service_status", "service_type"):
+        lists[whatfor] = [{'value': setting.value} for setting in settings_cache.resolve(whatfor, user_id)]
+
+    body = json.dumps(lists, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    etag = hashlib.sha256(body).hexdigest()
+    headers = {"Cache-Control": "private, no-cache", "Vary": "Authorization, Cookie"}
+
+    # Checked for POST as well, since protected reads here are POSTs carrying the jwt
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
     else:
-        settings = current_app.config["current_db"].session.query(AppSettings).filter_by(user_id=user_id, whatfor="service_type").all()
-
-    return jsonify([{
-        'value': setting.value,
-    } for setting in settings]), 200
\ No newline at end of file
+        response = Response(body, status=200, mimetype="application/json", headers=headers)
+    response.set_etag(etag)
+    return response
+
+@settings_blueprint.route('/appsettings/cache', methods=['POST'])
+def get_appsettings_cache_stats():
+    """Endpoint to read the hit/miss counters of the settings cache."""
+    admin_check = check_admin(request.get_json(silent=True))
+    if admin_check:
+        return admin_check
+
+    return jsonify(settings_cache.stats()), 200
@@ -6,6 +6,60 @@ class BaseConfig:
 
     DEBUG = False
     TESTING = False
+    # Connection pool of the single engine shared by every consumer in the process
+    DATABASE_POOL = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "True").lower() == "true",
+    }
+    # Production profile for DATABASETYPE=SQLITE: pragmas applied on every new
+    # connection plus a single writer lane per process (SQLITE_PROFILE=False disables it)
+    SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "True").lower() == "true"
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative means KiB, so 64 MiB
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # milliseconds
+        "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),  # ON DELETE CASCADE of services and attachments
+    }
+    # Threads reading files ahead of the writer of streamed ZIP archives; up to two
+    # files of at most 16 MiB are buffered per thread, so 128 MiB per archive at the default
+    ARCHIVE_READ_WORKERS = int(os.getenv("ARCHIVE_READ_WORKERS", "4"))
+    # Verified-token and user-role cache shared by the requests of a process
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))  # entries each; 0 disables caching
+    AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))  # seconds before a token is verified again
+    # Seconds a process may serve its in-memory copy of the appsetting table
+    SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "60"))
+    # Rendered iCalendar feeds kept per user; dropped when the user's services change
+    CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "1024"))  # users; 0 disables caching
+    CALENDAR_CACHE_TTL = int(os.getenv("CALENDAR_CACHE_TTL", "300"))  # seconds
+    # Background jobs (exports, imports, archive builds); JOBS_WORKERS=0 disables the runner
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+    JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))  # seconds between queue checks
+    JOBS_ARTIFACT_TTL = int(os.getenv("JOBS_ARTIFACT_TTL", str(24 * 3600)))  # seconds a result is kept
+    JOBS_SWEEP_INTERVAL = int(os.getenv("JOBS_SWEEP_INTERVAL", "300"))  # seconds between expiry sweeps
+    JOBS_STALE_AFTER = int(os.getenv("JOBS_STALE_AFTER", "3600"))  # running jobs without a heartbeat fail
+    JOBS_HEARTBEAT_INTERVAL = int(os.getenv("JOBS_HEARTBEAT_INTERVAL", "30"))  # seconds between unchanged progress writes
+    # Worker processes rendering asset image thumbnails; 0 renders in the request
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+    # Asset images with more pixels get no thumbnails (decompression bombs)
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "100000000"))
+    # Who streams images and attachments: "" (Flask), "x-accel" (nginx) or "x-sendfile".
+    # For x-accel, MEDIA_ACCEL_PREFIX must be an `internal` location aliased to static/assets/
+    MEDIA_OFFLOAD = os.getenv("MEDIA_OFFLOAD", "").lower()
+    MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+    MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))  # seconds a browser may reuse a file
+    # Seconds an unreferenced blob is kept before the job sweep deletes it
+    BLOB_GC_GRACE = int(os.getenv("BLOB_GC_GRACE", "3600"))
+    # Storage reconciler run by the job sweep (0 disables it); see `flask reconcile-storage`
+    STORAGE_RECONCILE_INTERVAL = int(os.getenv("STORAGE_RECONCILE_INTERVAL", "3600"))  # seconds between runs
+    STORAGE_RECONCILE_FULL_INTERVAL = int(os.getenv("STORAGE_RECONCILE_FULL_INTERVAL", str(7 * 24 * 3600)))
+    STORAGE_ORPHAN_GRACE = int(os.getenv("STORAGE_ORPHAN_GRACE", "3600"))  # seconds before a file counts as orphaned
+    # Move orphans to instance/quarantine instead of only reporting them
+    STORAGE_QUARANTINE = os.getenv("STORAGE_QUARANTINE", "False").lower() == "true"
 
 
 class DevelopmentConfig(BaseConfig):
@@ -31,6 +85,8 @@ class TestingConfig(BaseConfig):
 
     SQLALCHEMY_DATABASE_URI_INMEMORY = "sqlite:///:memory:"
     TESTING = True
+    JOBS_WORKERS = 0  # Tests drive the job runner explicitly
+    IMAGE_WORKERS = 0
     CURRENT_SECRET_KEY = os.getenv("SECRET_KEY")
 
 
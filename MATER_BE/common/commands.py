@@ -0,0 +1,90 @@
+# common/commands.py
+import click
+from datetime import timedelta
+from flask import current_app
+from models.main import create_indexes, create_columns
+from utils.rollup.rollup_utils import rebuild_cost_rollups
+from utils.search.search_utils import create_search_index, reindex_search
+from utils.blob.blob_utils import migrate_legacy_files, backfill_attachment_metadata
+from utils.image.image_utils import backfill_derivatives
+from utils.reconcile.reconcile_utils import reconcile_storage, get_quarantine_folder
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the app's `flask` CLI."""
+
+    @app.cli.command("create-indexes")
+    def create_indexes_command():
+        """Add missing model indexes to an existing SQLite/PostgreSQL/MySQL database."""
+        engine = current_app.config["current_db"].engine
+        created = create_indexes(engine)
+        if not created:
+            click.echo("All indexes already exist.")
+            return
+        for name in created:
+            click.echo(f"Created index {name}")
+
+    @app.cli.command("create-columns")
+    def create_columns_command():
+        """Add missing nullable model columns to an existing database."""
+        engine = current_app.config["current_db"].engine
+        added = create_columns(engine)
+        if not added:
+            click.echo("All columns already exist.")
+            return
+        for name in added:
+            click.echo(f"Added column {name}")
+
+    @app.cli.command("rebuild-cost-rollups")
+    def rebuild_cost_rollups_command():
+        """Recompute the per-asset and per-month cost rollups from the cost table."""
+        session = current_app.config["current_db"].session
+        asset_rows, month_rows = rebuild_cost_rollups(session)
+        click.echo(f"Rebuilt {asset_rows} asset and {month_rows} monthly cost rollups.")
+
+    @app.cli.command("reindex-search")
+    def reindex_search_command():
+        """Rebuild the full-text search index from the asset, service and note tables."""
+        engine = current_app.config["current_db"].engine
+        backend = create_search_index(engine)
+        written = reindex_search(current_app.config["current_db"].session)
+        click.echo(f"Indexed {written} documents ({backend}).")
+
+    @app.cli.command("migrate-blobs")
+    def migrate_blobs_command():
+        """Move images and attachments uploaded before the blob store into it."""
+        migrated, freed = migrate_legacy_files(current_app.config["current_db"].session)
+        click.echo(f"Migrated {migrated} files; {freed} bytes were duplicates.")
+        updated = backfill_attachment_metadata(current_app.config["current_db"].session)
+        click.echo(f"Recorded metadata of {updated} more attachments.")
+
+    @app.cli.command("backfill-image-derivatives")
+    def backfill_image_derivatives_command():
+        """Render the missing thumbnails of asset images (run migrate-blobs first)."""
+        rendered, skipped = backfill_derivatives(current_app.config["current_db"].session)
+        click.echo(f"Rendered derivatives of {rendered} images; skipped {skipped}.")
+
+    @app.cli.command("reconcile-storage")
+    @click.option("--full", is_flag=True, help="List every folder and check every row, not only what changed.")
+    @click.option("--quarantine", is_flag=True, help="Move orphaned files to instance/quarantine.")
+    def reconcile_storage_command(full, quarantine):
+        """Report uploads no row refers to and rows whose file is missing."""
+        report = reconcile_storage(
+            current_app.config["current_db"].session,
+            grace=timedelta(seconds=current_app.config.get("STORAGE_ORPHAN_GRACE", 3600)),
+            quarantine_folder=get_quarantine_folder(current_app) if quarantine else None,
+            full=full,
+        )
+        if report is None:
+            raise click.ClickException("Another process is reconciling the storage; try again later.")
+        for path in report.orphans:
+            click.echo(f"orphan: {path}")
+        for path in report.quarantined:
+            click.echo(f"quarantined: {path}")
+        for row in report.dangling:
+            click.echo(f"missing file: {row['kind']} {row['id']} -> {row['path']}")
+        click.echo(
+            f"{'Full' if report.full else 'Incremental'} pass: listed {report.listed_dirs} of "
+            f"{report.scanned_dirs} folders, {report.added} files added, {report.removed} removed; "
+            f"{len(report.orphans)} orphans, {len(report.dangling)} rows without a file."
+        )
@@ -4,6 +4,15 @@ import os
 from flasgger import Swagger
 from flask_cors import CORS
 from .swagger import template
+from .commands import register_commands
+from utils.jobs.jobs_utils import start_job_runner
+from utils.jwt.jwt_utils import token_cache
+from utils.config.config_utils import settings_cache
+from utils.calendar.calendar_utils import calendar_cache
+from utils.serialization.serialization_utils import init_json_provider
+from utils.search.search_utils import create_search_index
+from utils.image.image_utils import image_pipeline
+from utils.media.media_utils import hide_private_static_files
 from models.shared import Database
 from models.appsettings import AppSettings
 from models.initflag import InitFlag
@@ -11,15 +20,21 @@ from models.initflag import InitFlag
 def create_app():
     app = Flask(__name__, template_folder="templates", static_folder="../static")
     CORS(app, supports_credentials=True, expose_headers=["Authorization"])
+    hide_private_static_files(app)  # Uploads are under static/ but only served by /media/ routes
     app_settings = os.getenv("APP_SETTINGS", "common.base.ProductionConfig")
     app.config.from_object(app_settings)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")  # Security key
+    init_json_provider(app)  # orjson when installed
+    token_cache.configure(app.config["AUTH_CACHE_SIZE"], app.config["AUTH_CACHE_TTL"])
+    settings_cache.configure(app.config["SETTINGS_CACHE_TTL"])
+    calendar_cache.configure(app.config["CALENDAR_CACHE_SIZE"], app.config["CALENDAR_CACHE_TTL"])
+    image_pipeline.configure(app.config["IMAGE_WORKERS"], app.config["IMAGE_MAX_PIXELS"])
     database = Database(app=app, database_type=os.getenv("DATABASETYPE"))
 
     Swagger(app, template=template)
-    if not app.config["TESTING"]:
-        database.init_db()
-        app.config["current_db"] = database.db
+    database.init_db()
+    create_search_index(database.engine)  # FTS5, tsvector or LIKE depending on the database
+    app.config["current_db"] = database.db
 
     # Create some default settings within the application context
     with app.app_context():
@@ -67,6 +82,7 @@ def create_app():
             new_flag = InitFlag(name='default_settings')
             current_app.config["current_db"].session.add(new_flag)
             current_app.config["current_db"].session.commit()
+            settings_cache.invalidate()
 
     # Blueprints to import for the various routes
     from blueprints.asset import assets_blueprint
@@ -78,6 +94,9 @@ def create_app():
     from blueprints.note import note_blueprint
     from blueprints.cost import cost_blueprint
     from blueprints.mfa import mfa_blueprint
+    from blueprints.jobs import jobs_blueprint
+    from blueprints.search import search_blueprint
+    from blueprints.media import media_blueprint
 
     app.register_blueprint(assets_blueprint, url_prefix="/assets/")
     app.register_blueprint(services_blueprint, url_prefix="/services/")
@@ -88,6 +107,14 @@ def create_app():
     app.register_blueprint(note_blueprint, url_prefix="/notes/")
     app.register_blueprint(cost_blueprint, url_prefix="/costs")
     app.register_blueprint(mfa_blueprint, url_prefix="/mfa")
+    app.register_blueprint(jobs_blueprint, url_prefix="/jobs")
+    app.register_blueprint(search_blueprint, url_prefix="/search")
+    app.register_blueprint(media_blueprint, url_prefix="/media")
+
+    register_commands(app)
+
+    # Worker threads for exports, imports and archive builds
+    start_job_runner(app)
 
     return app, database
 
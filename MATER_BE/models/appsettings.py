@@ -1,11 +1,18 @@
 # models/appsettings.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index
 from models.base import Base
 
 class AppSettings(Base):
     __tablename__ = 'appsetting'
+    __table_args__ = (
+        Index('ix_appsetting_whatfor_globalsetting', 'whatfor', 'globalsetting'),
+        Index('ix_appsetting_user_id_whatfor', 'user_id', 'whatfor'),
+    )
+
     id = Column(Integer, primary_key=True)
     whatfor = Column(String(100), nullable=False)
     value = Column(String(100), nullable=False)
     globalsetting = Column(Boolean, nullable=False, default=False)
-    user_id = Column(Integer, ForeignKey('user.id'), nullable=True)
\ No newline at end of file
+    user_id = Column(Integer, ForeignKey('user.id'), nullable=True)
+
+    serialize_fields = ("id", "whatfor", "value", "globalsetting", "user_id")
\ No newline at end of file
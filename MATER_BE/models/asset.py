@@ -1,11 +1,16 @@
 # /blueprints/asset.py
-from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref, foreign
 from models.base import Base
 from models.note import Note
 
 class Asset(Base):
     __tablename__ = "asset"
+    __table_args__ = (
+        # user_id is TEXT, so MySQL needs a prefix length (ULIDs are 26 chars)
+        Index("ix_asset_user_id_id", "user_id", "id", mysql_length={"user_id": 26}),
+        Index("ix_asset_image_path", "image_path"),  # derivative requests for a blob
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
@@ -16,6 +21,8 @@ class Asset(Base):
     
     user_id = Column(Text, ForeignKey("user.id"), nullable=False)
     asset_status = Column(String(50), nullable=False, default='Ready')  # asset status
+
+    serialize_fields = ("id", "name", "asset_sn", "description", "acquired_date", "image_path", "asset_status")
     
     # Use back_populates for the relationship with User
     asset_owner = relationship("User", back_populates="assets")
@@ -1,36 +1,209 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import MetaData, create_engine
+from sqlalchemy import MetaData, create_engine, event
+import logging
 import os
+import threading
+import time
+
+class Serializable:
+    """
+    One serializer per model. `serialize_fields` names the attributes clients see;
+    to_dict() reads them from a loaded instance, while list endpoints select just
+    serialize_columns() and turn the row tuples into the same dicts with
+    serialize_rows(), without building entities; queries that select extra columns
+    after them pass the full `keys`. Dates are left to the JSON provider.
+    """
+
+    serialize_fields = ()
+
+    @classmethod
+    def serialize_columns(cls):
+        return [getattr(cls, name) for name in cls.serialize_fields]
+
+    @classmethod
+    def serialize_rows(cls, rows, keys=None):
+        keys = keys or cls.serialize_fields
+        return [dict(zip(keys, row)) for row in rows]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.serialize_fields}
 
 metaData = MetaData()
-Base = declarative_base(metadata=metaData)
+Base = declarative_base(metadata=metaData, cls=Serializable)
 
 
-def initalize_engine(db_type, db_url):
+def sqlite_file_url(file_name):
+    # Get the absolute path to the "instance" directory within the current working directory
+    db_folder = os.path.abspath(os.path.join(os.getcwd(), "instance"))
+    # Create the "instance" directory if it doesn"t exist
+    os.makedirs(db_folder, exist_ok=True)
+    # Construct the absolute path to the SQLite database file within the "instance" directory
+    return f"sqlite:///{os.path.join(db_folder, file_name)}"
+
+
+def database_url(db_type, db_url):
+    """Resolve the connection URL for a DATABASETYPE value."""
     match db_type:
         case "TESTING":
-            # Get the absolute path to the "instance" directory within the current working directory
-            db_folder = os.path.abspath(os.path.join(os.getcwd(), "instance"))
-            # Create the "instance" directory if it doesn"t exist
-            os.makedirs(db_folder, exist_ok=True)
-            # Construct the absolute path to the SQLite database file within the "instance" directory
-            db_file_path = os.path.join(db_folder, "testing.db")
-            # Print the absolute path for debugging purposes
-            # Pass the Flask app, SQLAlchemy database instance (db), and database type ("sqlite")
-            engine = create_engine(f"sqlite:///{db_file_path}")
-            return engine
+            return sqlite_file_url("testing.db")
         case "SQLITE":
-            # Get the absolute path to the "instance" directory within the current working directory
-            db_folder = os.path.abspath(os.path.join(os.getcwd(), "instance"))
-            # Create the "instance" directory if it doesn"t exist
-            os.makedirs(db_folder, exist_ok=True)
-            # Construct the absolute path to the SQLite database file within the "instance" directory
-            db_file_path = os.path.join(db_folder, "database.db")
-            engine = create_engine(f"sqlite:///{db_file_path}")
-            return engine
-        case "POSTGRESQL":
-            engine = create_engine(db_url)
-            return engine
-        case "MYSQL":
-            engine = create_engine(db_url)
-            return engine
+            return sqlite_file_url("database.db")
+        case "POSTGRESQL" | "MYSQL":
+            return db_url
+    raise ValueError(f"Unsupported DATABASETYPE: {db_type!r}")
+
+
+def engine_options(pool_options=None):
+    """Keyword arguments for create_engine() built from the DATABASE_POOL config section."""
+    return {key: value for key, value in (pool_options or {}).items() if value is not None}
+
+
+def nest_sqlite_savepoints(engine):
+    """
+    Open the transaction before a savepoint when pysqlite has not done it yet.
+
+    pysqlite only sends BEGIN right before an INSERT/UPDATE/DELETE, so a SAVEPOINT
+    issued first starts the transaction itself and releasing it commits everything.
+    Sending BEGIN ahead of such a savepoint keeps it nested in a transaction that a
+    rollback undoes entirely; reads outside savepoints are left as they are.
+    No-op for other dialects.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "savepoint")
+    def begin_before_savepoint(conn, name):
+        if not conn.connection.driver_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+
+
+class SQLiteWriterLane:
+    """
+    Funnels the write transactions of one process through a single lock.
+
+    pysqlite only opens a transaction right before the first INSERT/UPDATE/DELETE, so
+    taking the lock there serializes writers inside the process while readers (which
+    WAL never blocks) keep running. Writers from other processes are left to
+    busy_timeout. The lock is released when the transaction commits or rolls back.
+
+    The lane belongs to a thread rather than a connection: when the thread holding it
+    writes on a second connection (e.g. a job recording progress on its own
+    connection), that write joins the lane instead of waiting for itself, and the
+    lock is released once every connection of the thread has ended its transaction.
+    """
+
+    WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+    def __init__(self, timeout):
+        self.timeout = timeout  # seconds to wait for the lane before letting SQLite arbitrate
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()  # Guards the owner, the holder count and the counters
+        self._owner = None  # Ident of the thread holding the lane
+        self._holder = None  # Thread and connection that took the lane, for the log
+        self._connections = 0  # Connections of the owner in a write transaction
+        self.writes = 0
+        self.wait_seconds = 0.0
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "commit", self._release)
+        event.listen(engine, "rollback", self._release)
+        # Connections returned to the pool mid-transaction are reset, not rolled back
+        event.listen(engine, "reset", self._reset)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("writer_lane") or not statement.lstrip().upper().startswith(self.WRITE_PREFIXES):
+            return
+        thread = threading.get_ident()
+        with self._state_lock:
+            if self._owner == thread:
+                self._join(conn)
+                return
+        started = time.perf_counter()
+        acquired = self._lock.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - started
+        with self._state_lock:
+            self.wait_seconds += waited
+            if acquired:
+                self._owner = thread
+                self._holder = f"{threading.current_thread().name} on {conn.connection.dbapi_connection!r}"
+                self._join(conn)
+                return
+            self.writes += 1
+            holder = self._holder
+        logging.warning(
+            "SQLite writer lane held by %s for over %ss; falling back to busy_timeout", holder, self.timeout
+        )
+
+    def _join(self, conn):
+        # Called with the state lock held
+        self._connections += 1
+        self.writes += 1
+        conn.info["writer_lane"] = True
+
+    def _release(self, conn):
+        self._release_info(conn.info)
+
+    def _reset(self, dbapi_connection, connection_record, reset_state):
+        self._release_info(connection_record.info)
+
+    def _release_info(self, info):
+        if not info.pop("writer_lane", False):
+            return
+        with self._state_lock:
+            self._connections -= 1
+            if self._connections:
+                return
+            self._owner = self._holder = None
+        self._lock.release()
+
+    def stats(self):
+        with self._state_lock:
+            return {"writes": self.writes, "wait_seconds": round(self.wait_seconds, 3)}
+
+
+def apply_sqlite_profile(engine, pragmas):
+    """
+    Apply the SQLite production profile: every new connection gets the configured
+    pragmas (WAL, synchronous, mmap_size, cache_size, busy_timeout, foreign_keys) and writes go
+    through a single writer lane. Returns the lane, or None for other dialects.
+    """
+    if engine.dialect.name != "sqlite":
+        return None
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    writer_lane = SQLiteWriterLane(timeout=pragmas.get("busy_timeout", 5000) / 1000)
+    writer_lane.attach(engine)
+    engine.sqlite_writer_lane = writer_lane
+    return writer_lane
+
+
+def initalize_engine(db_type, db_url, pool_options=None, sqlite_pragmas=None):
+    """
+    Build an engine outside of a Flask app (CLI tools, benchmarks). Inside the app the
+    engine is owned by Flask-SQLAlchemy and configured with the same options.
+    """
+    engine = create_engine(database_url(db_type, db_url), **engine_options(pool_options))
+    nest_sqlite_savepoints(engine)
+    if sqlite_pragmas:
+        apply_sqlite_profile(engine, sqlite_pragmas)
+    return engine
+
+
+def pool_status(engine):
+    """Snapshot of the engine's connection pool counters."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for counter in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, counter):
+            status[counter] = getattr(pool, counter)()
+    writer_lane = getattr(engine, "sqlite_writer_lane", None)
+    if writer_lane is not None:
+        status["sqlite_writer_lane"] = writer_lane.stats()
+    return status
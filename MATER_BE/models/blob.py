@@ -0,0 +1,22 @@
+# models/blob.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from models.base import Base
+
+class Blob(Base):
+    """
+    One stored file body, named by the SHA-256 of its content. refcount is the number
+    of asset images and service attachments pointing at it; unreferenced blobs are
+    removed by the job runner's sweep once BLOB_GC_GRACE has passed.
+    """
+    __tablename__ = "blob"
+    __table_args__ = (
+        Index("ix_blob_refcount_updated_at", "refcount", "updated_at"),  # garbage collection
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # Last stored or (de)referenced
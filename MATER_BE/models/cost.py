@@ -1,11 +1,14 @@
 # /blueprints/cost.py
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text
+from sqlalchemy import Column, Integer, String, Index, Float, Date, DateTime, Text
 from sqlalchemy.orm import relationship, foreign
 from sqlalchemy.sql import func
 from models.base import Base
 
 class Cost(Base):
     __tablename__ = "cost"
+    __table_args__ = (
+        Index("ix_cost_type_type_id", "type", "type_id"),
+    )
     
     id = Column(Integer, primary_key=True)
     type = Column(String(50), nullable=False)  # e.g., 'asset' or 'service'
@@ -17,17 +20,7 @@ class Cost(Base):
     created_at = Column(DateTime, default=func.now())  # Automatically sets the creation timestamp
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())  # Updates the timestamp on modification
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'type': self.type,
-            'type_id': self.type_id,
-            'cost_date': self.cost_date.isoformat() if self.cost_date else None,
-            'cost_why': self.cost_why,
-            'cost_data': self.cost_data,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-        }
+    serialize_fields = ("id", "type", "type_id", "cost_date", "cost_why", "cost_data", "created_at", "updated_at")
 
     # Relationships (viewonly=True)
     asset = relationship(
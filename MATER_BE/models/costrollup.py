@@ -0,0 +1,31 @@
+# models/costrollup.py
+from sqlalchemy import Column, Integer, String, Text, Float, Index
+from models.base import Base
+
+# Precomputed cost aggregates, kept current by utils/rollup/rollup_utils.py on every
+# flush that touches Cost rows and rebuilt from scratch by `flask rebuild-cost-rollups`.
+# A cost counts towards the asset it belongs to: directly for type 'asset', through
+# its service for type 'service'.
+
+class AssetCostRollup(Base):
+    __tablename__ = "cost_rollup_asset"
+    __table_args__ = (
+        Index("ix_cost_rollup_asset_user_id", "user_id", mysql_length={"user_id": 26}),
+    )
+
+    asset_id = Column(Integer, primary_key=True)
+    user_id = Column(Text, nullable=False)
+    total = Column(Float, nullable=False, default=0.0)  # Sum of cost_data
+    cost_count = Column(Integer, nullable=False, default=0)
+
+    serialize_fields = ("asset_id", "total", "cost_count")
+
+class MonthlyCostRollup(Base):
+    __tablename__ = "cost_rollup_month"
+
+    user_id = Column(String(26), primary_key=True)
+    month = Column(String(7), primary_key=True)  # 'YYYY-MM', or 'undated' for costs without a date
+    total = Column(Float, nullable=False, default=0.0)
+    cost_count = Column(Integer, nullable=False, default=0)
+
+    serialize_fields = ("month", "total", "cost_count")
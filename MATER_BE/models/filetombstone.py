@@ -0,0 +1,16 @@
+# models/filetombstone.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Text, DateTime
+from models.base import Base
+
+class FileTombstone(Base):
+    """
+    A file or folder left behind by a deleted row. Written in the transaction that
+    deletes the row, so the path is never lost; the job runner's reaper removes it
+    from disk and then deletes the tombstone.
+    """
+    __tablename__ = "filetombstone"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
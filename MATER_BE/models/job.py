@@ -0,0 +1,41 @@
+# models/job.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from models.base import Base
+
+class Job(Base):
+    __tablename__ = "job"
+    __table_args__ = (
+        Index("ix_job_status_created_at", "status", "created_at"),  # workers claim the oldest queued job
+        Index("ix_job_expires_at", "expires_at"),  # artifact sweeper
+    )
+
+    id = Column(String(26), primary_key=True)  # ULID
+    user_id = Column(Text, ForeignKey("user.id"), nullable=False)  # Owner of the job and its artifact
+    kind = Column(String(50), nullable=False)  # Registered handler, e.g. 'export_tables'
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed, expired
+    progress = Column(Integer, nullable=False, default=0)  # Percent complete
+    message = Column(Text, nullable=True)  # Error or status detail
+    params = Column(Text, nullable=True)  # JSON encoded handler parameters
+    artifact_path = Column(String(255), nullable=True)  # Result file under instance/jobs
+    artifact_name = Column(String(255), nullable=True)  # Download file name of the result
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # Heartbeat while running
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # When the artifact is deleted
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "has_result": self.status == "succeeded" and self.artifact_path is not None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
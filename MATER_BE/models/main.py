@@ -1,7 +1,9 @@
-from models.base import Base, initalize_engine
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from models.base import Base
 import os
 
-def init_db(db_type, db_url):
+def init_db(engine):
     from models.user import User
     from models.serviceattachment import ServiceAttachment
     from models.service import Service
@@ -11,11 +13,64 @@ def init_db(db_type, db_url):
     from models.cost import Cost
     from models.mfa import MFA
     from models.otp import OTP
+    from models.job import Job
+    from models.costrollup import AssetCostRollup, MonthlyCostRollup
+    from models.blob import Blob
+    from models.filetombstone import FileTombstone
+    from models.storagemanifest import StorageManifest, StorageCheckpoint
 
-    engine = initalize_engine(db_type, db_url)
     Base.metadata.create_all(bind=engine)
+    # Bring tables created by earlier versions up to date
+    create_columns(engine)
+    create_indexes(engine)
     return engine
 
 
+def create_indexes(engine):
+    """
+    Add any index declared on the models that is missing from an existing database.
+    create_all() skips tables that already exist, so databases created before an
+    index was declared never receive it. Runs in init_db(). Returns the names of the
+    indexes created.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # create_all() builds new tables together with their indexes
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing_indexes:
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+    return created
+
+
+def create_columns(engine):
+    """
+    Add nullable columns declared on the models that are missing from existing tables.
+    Like create_indexes, this covers what create_all() skips for tables that already
+    exist. Runs in init_db(). Returns the names ('table.column') of the columns added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                definition = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
 def drop_db(engine):
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
@@ -1,11 +1,14 @@
 # /blueprints/note.py
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime
+from sqlalchemy import Column, Integer, String, Index, Text, Date, DateTime
 from sqlalchemy.orm import relationship, foreign
 from sqlalchemy.sql import func
 from models.base import Base
 
 class Note(Base):
     __tablename__ = "note"
+    __table_args__ = (
+        Index("ix_note_type_type_id", "type", "type_id"),
+    )
     
     id = Column(Integer, primary_key=True)
     type = Column(String(50), nullable=False)  # e.g., 'asset' or 'service'
@@ -16,14 +19,7 @@ class Note(Base):
     created_at = Column(DateTime, default=func.now())  # Automatically sets the creation timestamp
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())  # Updates the timestamp on modification
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'type': self.type,
-            'type_id': self.type_id,
-            'note_date': self.note_date.isoformat() if self.note_date else None,  # Format date to ISO
-            'note_data': self.note_data,
-        }
+    serialize_fields = ("id", "type", "type_id", "note_date", "note_data")
 
     # Relationships (viewonly=True)
     asset = relationship(
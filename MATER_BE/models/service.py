@@ -1,10 +1,18 @@
 from icalendar import Event
-from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey, Boolean, Float, Index
 from sqlalchemy.orm import relationship, backref
 from models.base import Base
 
 class Service(Base):
     __tablename__ = "service"
+    __table_args__ = (
+        # user_id is TEXT, so MySQL needs a prefix length (ULIDs are 26 chars)
+        Index("ix_service_user_id_service_date", "user_id", "service_date", mysql_length={"user_id": 26}),
+        Index("ix_service_user_id_service_status", "user_id", "service_status", mysql_length={"user_id": 26}),
+        Index("ix_service_asset_id", "asset_id"),
+        Index("ix_service_user_id_id", "user_id", "id", mysql_length={"user_id": 26}),  # keyset pagination
+        Index("ix_service_user_id_asset_id", "user_id", "asset_id", mysql_length={"user_id": 26}),  # dashboard per asset
+    )
     
     id = Column(Integer, primary_key=True)
     asset_id = Column(Integer, ForeignKey("asset.id", ondelete="CASCADE"), nullable=False)
@@ -13,6 +21,8 @@ class Service(Base):
     service_status = Column(String(100))
     
     user_id = Column(Text, ForeignKey("user.id"), nullable=False)
+
+    serialize_fields = ("id", "asset_id", "service_type", "service_date", "service_status")
     
     # Use back_populates for the relationship with User
     service_owner = relationship("User", back_populates="services")
@@ -34,9 +44,11 @@ class Service(Base):
 
     def to_icalendar_event(self):  #
         event = Event()
+        event.add("uid", f"service-{self.id}@mater")  # Stable, so clients update events in place
         event.add("summary", self.service_type)
         event.add("dtstart", self.service_date)
-        event.add("description", self.service_notes)
+        if self.service_status:
+            event.add("description", f"Status: {self.service_status}")
         # Add more fields as needed
 
         return event
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from models.base import Base
 
 
 class ServiceAttachment(Base):
     __tablename__ = "serviceattachment"
+    __table_args__ = (
+        Index("ix_serviceattachment_service_id", "service_id"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Text, nullable = False)
@@ -13,4 +16,14 @@ class ServiceAttachment(Base):
     # Use back_populates for the relationship with Service
     service = relationship("Service", back_populates="serviceattachments")
     
-    attachment_path = Column(String(255))
\ No newline at end of file
+    attachment_path = Column(String(255))  # Content-addressed blob, see utils/blob
+    file_name = Column(String(255), nullable=True)  # Name of the uploaded file
+    # Recorded at upload so listings never stat the upload volume
+    file_size = Column(BigInteger, nullable=True)  # bytes
+    mime_type = Column(String(100), nullable=True)
+    checksum = Column(String(64), nullable=True)  # SHA-256 of the content
+    uploaded_at = Column(DateTime, nullable=True)
+
+    serialize_fields = (
+        "id", "service_id", "attachment_path", "file_name", "file_size", "mime_type", "checksum", "uploaded_at"
+    )
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 import os
 
+from models.base import database_url, engine_options, pool_status, apply_sqlite_profile, nest_sqlite_savepoints
 from models.main import init_db, drop_db
 
 
@@ -16,53 +17,27 @@ class Database:
         self.engine = None
 
     def init_db(self):
-        # Switch statement on DB_TYPE, default is SQLiteDB
-        match self.database_type:
-            case "POSTGRESQL":
-                # Set url as its own variable to update when necessary
-                self.app.config["SQLALCHEMY_DATABASE_URI"] = self.app.config[
-                    f"SQLALCHEMY_DATABASE_URI_{self.database_type}"
-                ]
-                self.db.init_app(self.app)
-                self.engine = init_db(
-                    self.database_type, self.app.config["SQLALCHEMY_DATABASE_URI"]
-                )
-            case "MYSQL":
-                # Set url as its own variable to update when necessary
-                self.app.config["SQLALCHEMY_DATABASE_URI"] = self.app.config[
-                    f"SQLALCHEMY_DATABASE_URI_{self.database_type}"
-                ]
-                self.db.init_app(self.app)
-                self.engine = init_db(
-                    self.database_type, self.app.config["SQLALCHEMY_DATABASE_URI"]
-                )
-            case "TESTING":
-                db_folder = os.path.abspath(os.path.join(os.getcwd(), "instance"))
-                # Create the "instance" directory if it doesn"t exist
-                os.makedirs(db_folder, exist_ok=True)
-                # Construct the absolute path to the SQLite database file within the "instance" directory
-                db_file_path = os.path.join(db_folder, "testing.db")
-                # Print the absolute path for debugging purposes
-                # Set the Flask app"s configuration for the SQLite database URI
-                self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_file_path}"
-                # Create database tables using the create_db_tables function
-                # Pass the Flask app, SQLAlchemy database instance (db), and database type ("sqlite")
-                self.db.init_app(self.app)
-                self.engine = init_db("TESTING", "")
-            case "SQLITE":
-                # Get the absolute path to the "instance" directory within the current working directory
-                db_folder = os.path.abspath(os.path.join(os.getcwd(), "instance"))
-                # Create the "instance" directory if it doesn"t exist
-                os.makedirs(db_folder, exist_ok=True)
-                # Construct the absolute path to the SQLite database file within the "instance" directory
-                db_file_path = os.path.join(db_folder, "database.db")
-                # Print the absolute path for debugging purposes
-                # Set the Flask app"s configuration for the SQLite database URI
-                self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_file_path}"
-                # Create database tables using the create_db_tables function
-                # Pass the Flask app, SQLAlchemy database instance (db), and database type ("sqlite")
-                self.db.init_app(self.app)
-                init_db("SQLITE", self.app.config["SQLALCHEMY_DATABASE_URI"])
+        # One engine per process: Flask-SQLAlchemy builds it from the pool configuration
+        # and every consumer (sessions, exports, migrations) shares it
+        if self.engine is not None:
+            return self.engine
+
+        configured_url = self.app.config.get(f"SQLALCHEMY_DATABASE_URI_{self.database_type}")
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = database_url(self.database_type, configured_url)
+        self.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(self.app.config.get("DATABASE_POOL"))
+        self.db.init_app(self.app)
+
+        with self.app.app_context():
+            self.engine = self.db.engine
+        nest_sqlite_savepoints(self.engine)
+        if self.app.config.get("SQLITE_PROFILE"):
+            apply_sqlite_profile(self.engine, self.app.config["SQLITE_PRAGMAS"])
+        # Create database tables on the shared engine
+        init_db(self.engine)
+        return self.engine
+
+    def pool_status(self):
+        return pool_status(self.engine)
 
     def drop_all_tables(self):
         with self.app.app_context():
@@ -0,0 +1,30 @@
+# models/storagemanifest.py
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, Float, Boolean, DateTime, Index
+from models.base import Base
+
+# What utils/reconcile/reconcile_utils.py last saw of the upload folder. A directory
+# whose mtime still matches its row is not listed again, so a run only reads the
+# folders that changed since the previous one.
+
+class StorageManifest(Base):
+    __tablename__ = "storage_manifest"
+    __table_args__ = (
+        Index("ix_storage_manifest_parent", "parent", mysql_length={"parent": 255}),
+        Index("ix_storage_manifest_status", "status"),
+    )
+
+    path = Column(String(512), primary_key=True)  # As stored in image_path/attachment_path
+    parent = Column(String(512), nullable=True)  # Containing folder; None for the upload root
+    is_dir = Column(Boolean, nullable=False, default=False)
+    size = Column(BigInteger, nullable=True)
+    mtime = Column(Float, nullable=True)  # None: list the folder again on the next run
+    status = Column(String(20), nullable=True)  # 'pending' (unreferenced, in grace) or 'orphan'
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
+class StorageCheckpoint(Base):
+    """Named watermarks of the reconciler, e.g. how far blob changes were checked."""
+    __tablename__ = "storage_checkpoint"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(String(100), nullable=False)
@@ -1,17 +1,24 @@
 # models/user.py
-from sqlalchemy import Column, Text, Boolean
+from sqlalchemy import Column, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (
+        # email is already covered by its unique constraint; login ORs it with username
+        Index("ix_user_username", "username", mysql_length=64),
+    )
+
     id = Column(Text, primary_key=True)
     username = Column(Text, nullable=False)
     password = Column(Text, nullable=False)
     email = Column(Text, unique=True, nullable=False)
     is_admin = Column(Boolean, default=False)
 
+    serialize_fields = ("id", "username", "is_admin")  # Never the password hash
+
     # Relationship with Service and Asset
     services = relationship("Service", back_populates="service_owner")
     assets = relationship("Asset", back_populates="asset_owner")
@@ -0,0 +1,28 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models.base import nest_sqlite_savepoints
+from models.main import init_db
+from models.user import User
+
+
+class InMemoryDBTest(unittest.TestCase):
+    """
+    Test case with the tables of every model in a fresh in-memory SQLite database,
+    set up like the app's engine. Provides `self.engine` and an open `self.session`.
+    """
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        nest_sqlite_savepoints(self.engine)
+        init_db(self.engine)
+        self.session = Session(self.engine)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def add_user(self, user_id="u1"):
+        user = User(id=user_id, username=user_id, password="x", email=f"{user_id}@example.com")
+        self.session.add(user)
+        return user
@@ -0,0 +1,77 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert
+from utils.archive.archive_utils import ZipStream, iter_directory_zip
+from utils.export.export_utils import iter_tables_zip
+
+
+class TestZipStream(unittest.TestCase):
+    def build(self, entries):
+        archive = ZipStream()
+        chunks = []
+        for name, data, compress in entries:
+            chunks.extend(archive.add(name, (data[n:n + 7] for n in range(0, len(data), 7)), compress))
+        chunks.extend(archive.finish())
+        return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+    def test_round_trip(self):
+        entries = [
+            ("a.csv", b"id,name\n1,one\n" * 50, True),
+            ("nested/ü.txt", b"stored as is", False),
+            ("empty.txt", b"", True),
+        ]
+        with self.build(entries) as archive:
+            self.assertIsNone(archive.testzip())
+            for name, data, compress in entries:
+                info = archive.getinfo(name)
+                self.assertEqual(archive.read(name), data)
+                self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+
+    def test_streams_while_building(self):
+        # The local header and first data leave before the entry's content ends
+        chunks = ZipStream().add("endless.bin", iter(lambda: os.urandom(64 * 1024), None))
+        self.assertTrue(next(chunks).startswith(b"PK\x03\x04"))
+        chunks.close()
+
+    def test_export_tables(self):
+        engine = create_engine("sqlite://")
+        metadata = MetaData()
+        table = Table("thing", metadata, Column("id", Integer, primary_key=True), Column("name", String(20)))
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(table), [{"id": n, "name": f"thing {n}"} for n in range(1, 2501)])
+
+        data = b"".join(iter_tables_zip(engine, [table], chunk_size=100))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            rows = list(csv.reader(io.StringIO(archive.read("thing.csv").decode("utf-8"))))
+        self.assertEqual(rows[0], ["id", "name"])
+        self.assertEqual(len(rows), 2501)
+        self.assertEqual(rows[-1], ["2500", "thing 2500"])
+
+    def test_directory_zip(self):
+        with tempfile.TemporaryDirectory() as root:
+            files = {
+                "1/image/photo.JPG": os.urandom(3000),
+                "1/service_attachments/4/manual.txt": b"torque spec 90 ft-lb\n" * 400,
+                "2/notes.csv": b"",
+            }
+            for name, data in files.items():
+                os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+                with open(os.path.join(root, name), "wb") as file:
+                    file.write(data)
+
+            data = b"".join(iter_directory_zip(root, workers=2))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()), sorted(files))
+            for name, content in files.items():
+                self.assertEqual(archive.read(name), content)
+            self.assertEqual(archive.getinfo("1/image/photo.JPG").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(
+                archive.getinfo("1/service_attachments/4/manual.txt").compress_type, zipfile.ZIP_DEFLATED
+            )
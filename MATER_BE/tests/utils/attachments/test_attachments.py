@@ -0,0 +1,151 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from werkzeug.datastructures import FileStorage
+from models.base import Base
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from models.blob import Blob
+from models.filetombstone import FileTombstone
+from utils.blob.blob_utils import store_blob, store_attachment, backfill_attachment_metadata
+from utils.reaper.reaper_utils import reap_files
+from utils.jwt.jwt_utils import token_cache, generate_jwt
+from blueprints.service_attachments import service_attachment_blueprint
+
+SECRET_KEY = "attachments-test-secret-key-0123456789"
+
+
+class TestAttachmentMetadata(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-attachments-")
+        os.chdir(self.folder)
+        token_cache.clear()
+        self.app = Flask(__name__, instance_path=self.folder)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(self.folder, 'attachments.db')}"
+        self.app.config["CURRENT_SECRET_KEY"] = SECRET_KEY
+        self.db = SQLAlchemy(model_class=Base)
+        self.db.init_app(self.app)
+        self.app.config["current_db"] = self.db
+        self.app.register_blueprint(service_attachment_blueprint, url_prefix="/service_attachments")
+        with self.app.app_context():
+            init_db(self.db.engine)
+            session = self.db.session
+            session.add_all([
+                User(id="u1", username="u1", password="x", email="u1@example.com"),
+                User(id="u2", username="u2", password="x", email="u2@example.com"),
+                Asset(id=1, name="Truck", user_id="u1"),
+                Asset(id=2, name="Boat", user_id="u2"),
+            ])
+            session.flush()
+            session.add_all([
+                Service(id=10, asset_id=1, user_id="u1"),
+                Service(id=11, asset_id=1, user_id="u1"),
+                Service(id=20, asset_id=2, user_id="u2"),
+            ])
+            session.commit()
+            self.tokens = {user: generate_jwt(user) for user in ("u1", "u2")}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def upload(self, service_id, user_id, content, filename, mimetype=None):
+        with self.app.app_context():
+            session = self.db.session
+            file = FileStorage(io.BytesIO(content), filename=filename, content_type=mimetype)
+            attachment = store_attachment(session, file, service_id, user_id)
+            session.add(attachment)
+            session.commit()
+            return attachment.id
+
+    def list(self, url, user="u1", **body):
+        return self.client.post(url, json={"jwt": self.tokens[user], **body})
+
+    def test_store_attachment_records_metadata(self):
+        attachment_id = self.upload(10, "u1", b"%PDF-1.4 manual", "manual.pdf")
+        self.upload(10, "u1", b"raw", "notes", mimetype="text/plain")
+        with self.app.app_context():
+            rows = self.db.session.query(ServiceAttachment).order_by(ServiceAttachment.id).all()
+            self.assertEqual(rows[0].id, attachment_id)
+            self.assertEqual(rows[0].file_size, 15)
+            self.assertEqual(rows[0].mime_type, "application/pdf")
+            self.assertEqual(len(rows[0].checksum), 64)
+            self.assertIsNotNone(rows[0].uploaded_at)
+            self.assertEqual(rows[1].mime_type, "text/plain")  # No extension: the client's type
+
+    def test_listing_pages_and_ownership(self):
+        for index in range(3):
+            self.upload(10, "u1", f"file {index}".encode(), f"file{index}.txt")
+        self.upload(11, "u1", b"other service", "other.txt")
+        self.upload(20, "u2", b"not mine", "theirs.txt")
+
+        response = self.list("/service_attachments/service/10", limit=2)
+        self.assertEqual(response.status_code, 200)
+        first = response.get_json()
+        self.assertEqual([a["file_name"] for a in first["attachments"]], ["file0.txt", "file1.txt"])
+        self.assertEqual(first["attachments"][0]["url"], f"/media/attachments/{first['attachments'][0]['id']}")
+        self.assertNotIn("attachment_path", first["attachments"][0])
+        second = self.list("/service_attachments/service/10", limit=2, cursor=first["next_cursor"]).get_json()
+        self.assertEqual([a["file_name"] for a in second["attachments"]], ["file2.txt"])
+        self.assertIsNone(second["next_cursor"])
+
+        by_asset = self.list("/service_attachments/asset/1").get_json()["attachments"]
+        self.assertEqual(len(by_asset), 4)
+        self.assertEqual(self.list("/service_attachments/asset/2").get_json()["attachments"], [])
+        self.assertEqual(self.list("/service_attachments/service/10", user="u2").get_json()["attachments"], [])
+        self.assertEqual(self.client.post("/service_attachments/service/10", json={}).status_code, 400)
+        self.assertEqual(self.list("/service_attachments/service/10", cursor="bogus").status_code, 400)
+
+    def test_backfill_from_blob_table(self):
+        with self.app.app_context():
+            session = self.db.session
+            stored = store_blob(session, io.BytesIO(b"old upload"))
+            session.add(ServiceAttachment(service_id=10, user_id="u1", attachment_path=stored.path, file_name="old.txt"))
+            session.commit()
+            self.assertEqual(backfill_attachment_metadata(session), 1)
+            row = session.query(ServiceAttachment).one()
+            self.assertEqual((row.file_size, row.checksum, row.mime_type), (10, stored.sha256, "text/plain"))
+            self.assertIsNotNone(row.uploaded_at)
+            self.assertEqual(backfill_attachment_metadata(session), 0)
+
+    def test_bulk_delete(self):
+        shared = [self.upload(10, "u1", b"same content", f"copy{index}.txt") for index in range(3)]
+        theirs = self.upload(20, "u2", b"same content", "theirs.txt")
+        legacy = os.path.join("static", "assets", "1", "old.txt")
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, "wb") as file:
+            file.write(b"legacy")
+        with self.app.app_context():
+            session = self.db.session
+            session.add(ServiceAttachment(id=50, service_id=11, user_id="u1", attachment_path=legacy))
+            session.commit()
+
+        url = "/service_attachments/delete_selected_attachments"
+        self.assertEqual(self.list(url, attachment_ids="1").status_code, 400)
+        response = self.list(url, attachment_ids=shared[:2] + [50, theirs, 999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"deleted": sorted(shared[:2] + [50]), "not_found": sorted([theirs, 999])})
+
+        with self.app.app_context():
+            session = self.db.session
+            remaining = {row.id for row in session.query(ServiceAttachment.id)}
+            self.assertEqual(remaining, {shared[2], theirs})
+            self.assertEqual(session.query(Blob.refcount).scalar(), 2)  # Released without the ORM events
+            self.assertTrue(os.path.exists(legacy))  # Left to the reaper
+            self.assertEqual([row.path for row in session.query(FileTombstone.path)], [legacy])
+            self.assertEqual(reap_files(session), 1)
+            self.assertFalse(os.path.exists(legacy))
+            self.assertEqual(session.query(FileTombstone).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.orm import Session
+from models.main import init_db, create_columns
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from models.blob import Blob
+from utils.blob.blob_utils import store_blob, blob_sha256, collect_blobs, migrate_legacy_files, asset_files
+
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        # The store lives below the relative upload folder, so work in a scratch directory
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-blob-")
+        os.chdir(self.folder)
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        self.session = Session(self.engine)
+        self.session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            Asset(id=1, name="Truck", user_id="u1"),
+        ])
+        self.session.flush()
+        self.session.add_all([Service(id=10, asset_id=1, user_id="u1"), Service(id=11, asset_id=1, user_id="u1")])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def attach(self, service_id, content, file_name="manual.pdf"):
+        stored = store_blob(self.session, io.BytesIO(content))
+        self.session.add(ServiceAttachment(
+            service_id=service_id, user_id="u1", attachment_path=stored.path, file_name=file_name
+        ))
+        self.session.commit()
+        return stored
+
+    def refcount(self, sha256):
+        blob = self.session.get(Blob, sha256)
+        self.session.expire_all()
+        return blob.refcount if blob else None
+
+    def test_identical_content_is_stored_once(self):
+        first = self.attach(10, b"%PDF manual")
+        second = self.attach(11, b"%PDF manual")
+        self.assertTrue(first.new)
+        self.assertFalse(second.new)
+        self.assertEqual(first.path, second.path)
+        self.assertEqual(blob_sha256(first.path), first.sha256)
+        self.assertEqual(self.refcount(first.sha256), 2)
+        self.assertEqual(self.session.get(Blob, first.sha256).size, len(b"%PDF manual"))
+
+        self.session.delete(self.session.query(ServiceAttachment).filter_by(service_id=10).one())
+        self.session.commit()
+        self.assertEqual(self.refcount(first.sha256), 1)
+        self.assertEqual(collect_blobs(self.session, timedelta(0)), 0)
+
+        # Deleting the asset cascades to the other attachment and releases the blob
+        self.session.delete(self.session.get(Asset, 1))
+        self.session.commit()
+        self.assertEqual(self.refcount(first.sha256), 0)
+        self.assertEqual(collect_blobs(self.session, timedelta(hours=1)), 0)  # Still in its grace period
+        self.assertEqual(collect_blobs(self.session, timedelta(0)), 1)
+        self.assertFalse(os.path.exists(first.path))
+        self.assertIsNone(self.refcount(first.sha256))
+
+    def test_replaced_image_and_rollback(self):
+        old = store_blob(self.session, io.BytesIO(b"old image"))
+        asset = self.session.get(Asset, 1)
+        asset.image_path = old.path
+        self.session.commit()
+        new = store_blob(self.session, io.BytesIO(b"new image"))
+        asset.image_path = new.path
+        self.session.commit()
+        self.assertEqual((self.refcount(old.sha256), self.refcount(new.sha256)), (0, 1))
+
+        self.session.add(ServiceAttachment(service_id=10, user_id="u1", attachment_path=new.path))
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.refcount(new.sha256), 1)
+        self.assertEqual([arcname for _, arcname in asset_files(self.session, asset)], [f"image/{new.sha256}"])
+
+    def test_migrate_legacy_files(self):
+        legacy = os.path.join("static", "assets", "1", "service_attachments", "10")
+        os.makedirs(legacy)
+        for n in range(3):
+            with open(os.path.join(legacy, f"copy{n}.pdf"), "wb") as file:
+                file.write(b"same manual")
+            self.session.add(ServiceAttachment(
+                service_id=10, user_id="u1", attachment_path=os.path.join(legacy, f"copy{n}.pdf")
+            ))
+        self.session.commit()
+
+        migrated, freed = migrate_legacy_files(self.session)
+        self.assertEqual((migrated, freed), (3, 2 * len(b"same manual")))
+        attachments = self.session.query(ServiceAttachment).order_by(ServiceAttachment.id).all()
+        self.assertEqual({attachment.attachment_path for attachment in attachments}, {attachments[0].attachment_path})
+        self.assertEqual([attachment.file_name for attachment in attachments], ["copy0.pdf", "copy1.pdf", "copy2.pdf"])
+        self.assertEqual(self.refcount(blob_sha256(attachments[0].attachment_path)), 3)
+        self.assertEqual(os.listdir(legacy), [])
+
+
+class TestCreateColumns(unittest.TestCase):
+    def test_adds_missing_nullable_columns(self):
+        engine = create_engine("sqlite://")
+        init_db(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE serviceattachment DROP COLUMN file_name"))
+        self.assertEqual(create_columns(engine), ["serviceattachment.file_name"])
+        self.assertIn("file_name", {column["name"] for column in inspect(engine).get_columns("serviceattachment")})
+        self.assertEqual(create_columns(engine), [])
+
+    def test_init_db_upgrades_existing_tables(self):
+        engine = create_engine("sqlite://")
+        init_db(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE serviceattachment DROP COLUMN checksum"))
+        init_db(engine)  # As on startup after an upgrade
+        self.assertIn("checksum", {column["name"] for column in inspect(engine).get_columns("serviceattachment")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import io
+from datetime import date
+from models.asset import Asset
+from tests.database import InMemoryDBTest
+from utils.bulk.bulk_utils import parse_date, import_assets, INVALID_DATE
+
+
+class TestBulkUtils(InMemoryDBTest):
+    def test_parse_date(self):
+        self.assertEqual(parse_date("2024-03-05"), date(2024, 3, 5))
+        self.assertEqual(parse_date("03/05/2024"), date(2024, 3, 5))  # month first, like before
+        self.assertEqual(parse_date("25/12/2024"), date(2024, 12, 25))  # falls back to day first
+        self.assertEqual(parse_date("1/2/2024"), date(2024, 1, 2))
+        self.assertEqual(parse_date("2024-1-2"), date(2024, 1, 2))
+        # Rejected by datetime.strptime as well, like an empty or missing date
+        for value in ("2024-13-01", "31/31/2024", "yesterday", "1/2/24", "20240102", " 2024-01-02", "", None):
+            self.assertIs(parse_date(value), INVALID_DATE)
+
+    def test_import_assets(self):
+        upload = io.BytesIO(
+            "﻿name,description,asset_sn,acquired_date,asset_status\n"
+            "Truck,\"two\nlines\",SN1,2024-01-31,Removed\n"
+            "Mower,,SN2,02/01/2024\n"
+            "\n"
+            "Broken,,SN3,someday\n"
+            ",,SN4,2024-01-01\n"
+            "Pump,,SN5,\n".encode("utf-8")
+        )
+        self.add_user()
+        self.session.commit()
+        report = import_assets(self.session, "u1", upload, batch_size=2)
+
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(report["successful_uploads"], ["Truck", "Mower"])
+        # Lines of the file, counting the header, the quoted line break and the blank line
+        self.assertEqual(
+            [(error["line"], error["error"]) for error in report["errors"]],
+            [(6, "Invalid date format"), (7, "Missing required fields: name or asset_sn"),
+             (8, "Invalid date format")],
+        )
+        assets = {asset.name: asset for asset in self.session.query(Asset).all()}
+        self.assertEqual(assets["Truck"].description, "two\nlines")
+        self.assertEqual(assets["Truck"].asset_status, "Ready")  # The upload never set a status
+        self.assertEqual(assets["Mower"].acquired_date, date(2024, 2, 1))
+
+    def test_import_assets_malformed_file_keeps_nothing(self):
+        rows = "".join(f"Asset {number},,SN{number},2024-01-01\n" for number in range(5))
+        upload = io.BytesIO(f"name,description,asset_sn,acquired_date\n{rows}".encode("utf-8") + b"Bad \xff,,SN9,2024-01-01\n")
+        self.add_user()
+        self.session.commit()
+        # Two batches of two rows have been inserted and released when the bad line is decoded
+        with self.assertRaises(UnicodeDecodeError):
+            import_assets(self.session, "u1", upload, batch_size=2)
+        self.session.rollback()
+        self.assertEqual(self.session.query(Asset).count(), 0)
@@ -0,0 +1,79 @@
+import unittest
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from utils.calendar.calendar_utils import calendar_cache, render_calendar, parse_window, calendar_events
+
+
+class TestCalendarCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        calendar_cache.configure(16, 300)
+        with Session(self.engine) as session:
+            session.add(User(id="u1", username="u1", password="x", email="u1@example.com"))
+            session.add(Asset(id=1, name="Truck", user_id="u1"))
+            session.add(Service(id=1, asset_id=1, user_id="u1", service_type="Oil Change",
+                                service_date=date(2024, 5, 1), service_status="Pending"))
+            session.add(Service(id=2, asset_id=1, user_id="u1", service_type="Undated"))
+            session.commit()
+
+    def feed(self, session):
+        return calendar_cache.get("u1", "events", lambda: render_calendar(session, "u1"))
+
+    def test_invalidated_on_commit_only(self):
+        with Session(self.engine) as session:
+            first = self.feed(session)
+            self.assertIn(b"UID:service-1@mater", first.body)
+            self.assertNotIn(b"Undated", first.body)
+            self.assertIs(self.feed(session), first)
+
+            service = session.get(Service, 1)
+            service.service_type = "Tire Rotation"
+            session.flush()
+            self.assertIs(self.feed(session), first)  # Not committed yet
+            session.rollback()
+            self.assertIs(self.feed(session), first)
+
+            session.get(Service, 1).service_type = "Tire Rotation"
+            session.commit()
+            second = self.feed(session)
+            self.assertIsNot(second, first)
+            self.assertIn(b"Tire Rotation", second.body)
+            self.assertNotEqual(second.etag, first.etag)
+
+            session.delete(session.get(Asset, 1))
+            session.commit()
+            self.assertNotIn(b"VEVENT", self.feed(session).body)
+        self.assertEqual(calendar_cache.stats()["misses"], 3)
+
+    def test_windowed_events(self):
+        with Session(self.engine) as session:
+            session.add_all([
+                Service(id=3, asset_id=1, user_id="u1", service_type="Inspection",
+                        service_date=date(2024, 5, 31), service_status="Complete"),
+                Service(id=4, asset_id=1, user_id="u1", service_type="Next month",
+                        service_date=date(2024, 6, 1), service_status="Pending"),
+            ])
+            session.commit()
+
+            start, end = parse_window({"start": "2024-05-01T00:00:00-05:00", "end": "2024-06-01T00:00:00-05:00"})
+            self.assertEqual((start, end), (date(2024, 5, 1), date(2024, 6, 1)))
+            titles = lambda events: [event["title"] for event in events]
+            self.assertEqual(titles(calendar_events(session, "u1", start, end)), ["Oil Change", "Inspection"])
+            self.assertEqual(titles(calendar_events(session, "u1", start, end, completed=True)), ["Inspection"])
+            self.assertEqual(titles(calendar_events(session, "u1", start, end, completed=False)), ["Oil Change"])
+            self.assertEqual(len(calendar_events(session, "u1")), 3)  # No window: every dated service
+
+        self.assertEqual(parse_window({}), (None, None))
+        for args in ({"start": "May"}, {"start": "2024-06-01", "end": "2024-05-01"}):
+            with self.assertRaises(ValueError):
+                parse_window(args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from models.base import Base
+from models.main import init_db
+from models.appsettings import AppSettings
+from models.user import User
+from utils.config.config_utils import SettingsCache, settings_cache
+from utils.jwt.jwt_utils import generate_jwt, token_cache
+from blueprints.settings import settings_blueprint
+
+SECRET_KEY = "settings-test-secret-key-0123456789abcdef"
+
+
+class TestSettingsCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.db = SQLAlchemy(model_class=Base)
+        self.db.init_app(self.app)
+        self.app.config["current_db"] = self.db
+        self.context = self.app.app_context()
+        self.context.push()
+        init_db(self.db.engine)
+        self.db.session.add_all([
+            AppSettings(whatfor="global_service_type", value="Yes", globalsetting=True),
+            AppSettings(whatfor="service_type", value="Oil Change", globalsetting=True),
+            AppSettings(whatfor="service_type", value="Mine", globalsetting=False, user_id="u1"),
+            AppSettings(whatfor="service_type", value="Theirs", globalsetting=False, user_id="u2"),
+            AppSettings(whatfor="asset_status", value="Ready", globalsetting=True),
+            AppSettings(whatfor="asset_status", value="Mine", globalsetting=False, user_id="u1"),
+        ])
+        self.db.session.commit()
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.context.pop()
+
+    def values(self, settings):
+        return [setting.value for setting in settings]
+
+    def test_resolve_precedence(self):
+        cache = SettingsCache(ttl=60)
+        self.assertEqual(self.values(cache.resolve("service_type", "u1")), ["Oil Change"])
+        # Without a global flag only the user's own options apply
+        self.assertEqual(self.values(cache.resolve("asset_status", "u1")), ["Mine"])
+        self.assertEqual(cache.first("global_service_type").value, "Yes")
+        self.assertEqual(self.values(cache.local_settings("u1")), ["Mine", "Mine"])
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["hits"], 3)
+
+        self.db.session.query(AppSettings).filter_by(whatfor="global_service_type").update({"value": "No"})
+        self.db.session.commit()
+        self.assertEqual(self.values(cache.resolve("service_type", "u1")), ["Oil Change"])  # Still cached
+        cache.invalidate()
+        self.assertEqual(self.values(cache.resolve("service_type", "u1")), ["Oil Change", "Mine"])
+        self.assertEqual(cache.stats()["misses"], 2)
+
+
+class TestBootstrapEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["CURRENT_SECRET_KEY"] = SECRET_KEY
+        self.db = SQLAlchemy(model_class=Base)
+        self.db.init_app(self.app)
+        self.app.config["current_db"] = self.db
+        self.app.register_blueprint(settings_blueprint, url_prefix="/settings")
+        token_cache.clear()
+        settings_cache.invalidate()
+        with self.app.app_context():
+            init_db(self.db.engine)
+            self.db.session.add_all([
+                User(id="u1", username="u1", password="x", email="u1@example.com", is_admin=True),
+                AppSettings(id=1, whatfor="global_asset_status", value="No", globalsetting=True),  # Users add their own
+                AppSettings(id=2, whatfor="asset_status", value="Ready", globalsetting=True),
+                AppSettings(id=3, whatfor="asset_status", value="Mine", globalsetting=False, user_id="u1"),
+            ])
+            self.db.session.commit()
+            self.token = generate_jwt("u1")
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        settings_cache.invalidate()
+
+    def bootstrap(self, **headers):
+        return self.client.post("/settings/appsettings/bootstrap", json={"jwt": self.token}, headers=headers)
+
+    def update(self, setting_id, value):
+        response = self.client.post(
+            "/settings/appsettings/update", json={"jwt": self.token, "id": setting_id, "value": value}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_and_not_modified(self):
+        response = self.bootstrap()
+        self.assertEqual(response.status_code, 200)
+        etag, weak = response.get_etag()
+        self.assertFalse(weak)
+        self.assertEqual(response.json["asset_status"], [{"value": "Ready"}, {"value": "Mine"}])
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+
+        response = self.bootstrap(**{"If-None-Match": f'"{etag}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.get_etag(), (etag, False))
+        self.assertEqual(self.client.post("/settings/appsettings/bootstrap", json={}).status_code, 401)
+
+    def test_etag_changes_with_settings(self):
+        etags = [self.bootstrap().get_etag()[0]]
+        self.update(2, "Ready to go")  # Global
+        etags.append(self.bootstrap().get_etag()[0])
+        self.update(3, "Still mine")  # Local
+        response = self.bootstrap(**{"If-None-Match": f'"{etags[-1]}"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["asset_status"], [{"value": "Ready to go"}, {"value": "Still mine"}])
+        etags.append(response.get_etag()[0])
+        self.assertEqual(len(set(etags)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
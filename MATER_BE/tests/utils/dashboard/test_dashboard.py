@@ -0,0 +1,57 @@
+import unittest
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from utils.dashboard.dashboard_utils import build_dashboard
+
+TODAY = date(2024, 6, 15)
+
+
+class TestDashboard(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        self.session = Session(self.engine)
+        self.session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            User(id="u2", username="u2", password="x", email="u2@example.com"),
+            Asset(id=1, name="Truck", user_id="u1"),
+            Asset(id=2, name="Mower", user_id="u1"),
+            Asset(id=3, name="Other", user_id="u2"),
+        ])
+        services = [
+            (1, -100, "Pending"), (1, -10, "On Hold"), (1, -10, "Complete"),
+            (1, 0, "Pending"), (2, 7, None), (2, 20, "Pending"), (2, 400, "Pending"), (2, None, "Pending"),
+        ]
+        for n, (asset_id, days, status) in enumerate(services):
+            self.session.add(Service(
+                id=n + 1, asset_id=asset_id, user_id="u1", service_type=f"type {n}", service_status=status,
+                service_date=TODAY + timedelta(days=days) if days is not None else None,
+            ))
+        self.session.add(Service(asset_id=3, user_id="u2", service_date=TODAY, service_status="Pending"))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_build_dashboard(self):
+        dashboard = build_dashboard(self.session, "u1", TODAY, upcoming=3)
+        self.assertEqual(dashboard["by_status"], {"Pending": 5, "On Hold": 1, "Complete": 1, "None": 1})
+        self.assertEqual(dashboard["by_due"], {
+            "overdue_90_plus": 1, "overdue_31_90": 0, "overdue_1_30": 1, "due_7_days": 2,
+            "due_8_30_days": 1, "due_later": 1, "undated": 1,
+        })
+        self.assertEqual(dashboard["by_asset"], [
+            {"asset_id": 1, "asset_name": "Truck", "total": 4, "open": 3, "overdue": 2},
+            {"asset_id": 2, "asset_name": "Mower", "total": 4, "open": 4, "overdue": 0},
+        ])
+        self.assertEqual([service["id"] for service in dashboard["upcoming"]], [4, 5, 6])
+        self.assertEqual(dashboard["upcoming"][0]["asset_name"], "Truck")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.appsettings import AppSettings
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from models.note import Note
+from models.cost import Cost
+from models.blob import Blob
+from models.job import Job
+from models.mfa import MFA
+from models.costrollup import AssetCostRollup, MonthlyCostRollup
+from models.filetombstone import FileTombstone
+from utils.blob.blob_utils import store_blob
+from utils.calendar.calendar_utils import calendar_cache
+from utils.deletion.deletion_utils import delete_assets, delete_user
+from utils.reaper.reaper_utils import reap_files
+from utils.rollup.rollup_utils import rebuild_cost_rollups
+from utils.search.search_utils import create_search_index, search
+
+
+class TestCascadingDeletion(unittest.TestCase):
+    foreign_keys = True
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-deletion-")
+        os.chdir(self.folder)
+        self.engine = create_engine("sqlite://")
+        if self.foreign_keys:
+            event.listen(self.engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+        init_db(self.engine)
+        create_search_index(self.engine)
+        self.session = Session(self.engine)
+        session = self.session
+        image = store_blob(session, io.BytesIO(b"shared image"))
+        manual = store_blob(session, io.BytesIO(b"manual"))
+        session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            User(id="u2", username="u2", password="x", email="u2@example.com"),
+            Asset(id=1, name="Ford Truck", user_id="u1", image_path=image.path),
+            Asset(id=2, name="Ford Mower", user_id="u1", image_path=image.path),
+            Asset(id=3, name="Ford Focus", user_id="u2"),
+        ])
+        session.flush()
+        session.add_all([
+            Service(id=10, asset_id=1, user_id="u1", service_type="Oil Change", service_date=date(2024, 1, 5)),
+            Service(id=11, asset_id=1, user_id="u1", service_type="Tires"),
+            Service(id=20, asset_id=2, user_id="u1", service_type="Blades"),
+            Service(id=30, asset_id=3, user_id="u2", service_type="Oil Change"),
+        ])
+        session.flush()
+        self.legacy = os.path.join("static", "assets", "1", "service_attachments", "10", "old.pdf")
+        os.makedirs(os.path.dirname(self.legacy))
+        with open(self.legacy, "wb") as file:
+            file.write(b"legacy")
+        session.add_all([
+            ServiceAttachment(service_id=10, user_id="u1", attachment_path=manual.path),
+            ServiceAttachment(service_id=20, user_id="u1", attachment_path=manual.path),
+            ServiceAttachment(service_id=11, user_id="u1", attachment_path=self.legacy),
+            Note(type="asset", type_id=1, note_data="Ford paperwork"),
+            Note(type="service", type_id=10, note_data="Ford synthetic oil"),
+            Note(type="service", type_id=30, note_data="Ford oil for u2"),
+            Cost(type="asset", type_id=1, cost_date=date(2024, 1, 5), cost_data=100.0),
+            Cost(type="service", type_id=10, cost_date=date(2024, 1, 9), cost_data=40.0),
+            Cost(type="service", type_id=20, cost_date=date(2024, 2, 1), cost_data=7.0),
+            Cost(type="service", type_id=30, cost_date=date(2024, 1, 9), cost_data=9.0),
+            Job(id="01JOB", user_id="u1", kind="export_tables", artifact_path=os.path.join(self.folder, "artifact")),
+            MFA(user_id="u1", mfa_method="totp"),
+            AppSettings(whatfor="theme", value="dark", globalsetting=False, user_id="u1"),
+            AppSettings(whatfor="theme", value="light", globalsetting=True),
+        ])
+        session.commit()
+        self.image, self.manual = image.sha256, manual.sha256
+
+    def tearDown(self):
+        self.session.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def refcounts(self):
+        return dict(self.session.execute(select(Blob.sha256, Blob.refcount)).all())
+
+    def rollups(self):
+        assets = {row.asset_id: (row.total, row.cost_count) for row in self.session.query(AssetCostRollup) if row.cost_count}
+        months = {(row.user_id, row.month): (row.total, row.cost_count)
+                  for row in self.session.query(MonthlyCostRollup) if row.cost_count}
+        return assets, months
+
+    def hits(self, user_id):
+        results, _ = search(self.session, user_id, "ford")
+        return {(result["kind"], result["id"]) for result in results}
+
+    def test_delete_assets(self):
+        calendar_cache.get("u1", "plain", lambda: b"cached")
+        self.assertEqual(delete_assets(self.session, [1]), 1)
+        self.session.commit()
+        self.assertIsNone(calendar_cache._users.get("u1"))
+
+        self.assertEqual(self.session.query(Service.id).filter(Service.asset_id == 1).count(), 0)
+        self.assertEqual(
+            sorted(row.service_id for row in self.session.query(ServiceAttachment.service_id)), [20]
+        )
+        # Notes and costs keyed on (type, type_id) go too; other assets keep theirs
+        self.assertEqual(sorted(row.type_id for row in self.session.query(Note.type_id)), [30])
+        self.assertEqual(sorted(row.type_id for row in self.session.query(Cost.type_id)), [20, 30])
+
+        self.assertEqual(self.refcounts(), {self.image: 1, self.manual: 1})
+        incremental = self.rollups()
+        self.assertEqual(incremental, ({2: (7.0, 1), 3: (9.0, 1)}, {("u1", "2024-02"): (7.0, 1), ("u2", "2024-01"): (9.0, 1)}))
+        rebuild_cost_rollups(self.session)
+        self.assertEqual(self.rollups(), incremental)
+        self.assertEqual(self.hits("u1"), {("asset", 2)})
+        self.assertEqual(self.hits("u2"), {("asset", 3), ("note", 3)})
+
+        # The legacy file and upload folder are purged after the commit
+        self.assertTrue(os.path.exists(self.legacy))
+        self.assertEqual(reap_files(self.session), 2)
+        self.assertFalse(os.path.exists(os.path.join("static", "assets", "1")))
+        self.assertEqual(self.session.query(FileTombstone).count(), 0)
+
+    def test_delete_user(self):
+        self.assertFalse(delete_user(self.session, "nobody"))
+        self.assertTrue(delete_user(self.session, "u1"))
+        self.session.commit()
+        self.assertEqual([row.id for row in self.session.query(User.id)], ["u2"])
+        self.assertEqual([row.id for row in self.session.query(Asset.id)], [3])
+        self.assertEqual([row.id for row in self.session.query(Service.id)], [30])
+        self.assertEqual(self.session.query(ServiceAttachment).count(), 0)
+        self.assertEqual(self.session.query(Job).count() + self.session.query(MFA).count(), 0)
+        # The local setting goes with the user; the global one stays
+        self.assertEqual([row.value for row in self.session.query(AppSettings.value)], ["light"])
+        self.assertEqual(self.refcounts(), {self.image: 0, self.manual: 0})
+        self.assertEqual(self.rollups(), ({3: (9.0, 1)}, {("u2", "2024-01"): (9.0, 1)}))
+        self.assertEqual(self.hits("u1"), set())
+        paths = {row.path for row in self.session.query(FileTombstone.path)}
+        self.assertEqual(paths, {self.legacy, os.path.join("static", "assets", "1"), os.path.join(self.folder, "artifact")})
+
+    def test_cascade_is_left_to_the_database(self):
+        enforced = self.session.execute(text("PRAGMA foreign_keys")).scalar()
+        self.assertEqual(bool(enforced), self.foreign_keys)
+
+
+class TestDeletionWithoutForeignKeys(TestCascadingDeletion):
+    # SQLite without PRAGMA foreign_keys: children are deleted explicitly
+    foreign_keys = False
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from types import SimpleNamespace
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from utils.blob.blob_utils import store_blob, collect_blobs
+from utils.image.image_utils import (
+    Image, ImagePipeline, DERIVATIVE_NAMES, derivative_path, has_derivatives, image_urls, backfill_derivatives,
+)
+
+
+def image_bytes(size, mode="RGB", image_format="JPEG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class TestImageDerivatives(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-image-")
+        os.chdir(self.folder)
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(User(id="u1", username="u1", password="x", email="u1@example.com"))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def store(self, data):
+        stored = store_blob(self.session, io.BytesIO(data))
+        self.session.add(Asset(name="Truck", user_id="u1", image_path=stored.path))
+        self.session.commit()
+        return stored
+
+    def test_renders_every_derivative(self):
+        stored = self.store(image_bytes((3000, 2000)))
+        ImagePipeline(workers=0).submit(stored.path, stored.sha256)
+        self.assertTrue(has_derivatives(stored.sha256))
+        with Image.open(derivative_path(stored.sha256, "thumb.webp")) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("WEBP", (256, 171)))
+        with Image.open(derivative_path(stored.sha256, "medium.jpg")) as medium:
+            self.assertEqual((medium.format, medium.size), ("JPEG", (1024, 683)))
+        self.assertLess(os.path.getsize(derivative_path(stored.sha256, "thumb.webp")), len(image_bytes((3000, 2000))))
+
+        urls = image_urls(stored.path)
+        self.assertEqual(urls["thumb_webp"], f"/media/images/{stored.sha256}/thumb.webp")
+        self.assertEqual(len(urls), len(DERIVATIVE_NAMES))
+        self.assertIsNone(image_urls("static/assets/1/image/legacy.jpg"))
+
+        # Collecting the blob removes its derivatives too
+        self.session.delete(self.session.query(Asset).one())
+        self.session.commit()
+        collect_blobs(self.session, timedelta(0))
+        self.assertFalse(os.path.exists(derivative_path(stored.sha256, "thumb.webp")))
+
+    def test_small_transparent_image(self):
+        stored = self.store(image_bytes((100, 50), "RGBA", "PNG"))
+        ImagePipeline(workers=0).submit(stored.path, stored.sha256)
+        with Image.open(derivative_path(stored.sha256, "thumb.jpg")) as thumb:
+            self.assertEqual((thumb.mode, thumb.size), ("RGB", (100, 50)))  # Never upscaled
+        with Image.open(derivative_path(stored.sha256, "medium.webp")) as medium:
+            self.assertEqual(medium.mode, "RGBA")
+
+    def test_process_pool_and_backfill(self):
+        first = self.store(image_bytes((800, 600)))
+        second = self.store(image_bytes((600, 800)))
+        self.store(b"not an image")
+        pipeline = ImagePipeline(workers=1)
+        try:
+            self.assertEqual(backfill_derivatives(self.session, pipeline), (2, 1))
+        finally:
+            pipeline.shutdown()
+        self.assertTrue(has_derivatives(first.sha256) and has_derivatives(second.sha256))
+
+    def test_refuses_oversized_image(self):
+        stored = self.store(image_bytes((400, 300)))
+        pipeline = ImagePipeline(workers=0, max_pixels=100_000)
+        self.assertFalse(pipeline.ensure(stored.path, stored.sha256))
+        self.assertFalse(os.path.exists(derivative_path(stored.sha256, "thumb.webp")))
+
+    def test_media_route(self):
+        from blueprints.media import media_blueprint
+        app = Flask(__name__)
+        app.config["current_db"] = SimpleNamespace(session=self.session)
+        app.register_blueprint(media_blueprint, url_prefix="/media")
+        stored = self.store(image_bytes((640, 480)))
+        # A blob that is not an asset image (e.g. an attachment) is never rendered
+        attachment = store_blob(self.session, io.BytesIO(image_bytes((320, 240))))
+        self.session.commit()
+        client = app.test_client()
+
+        # Rendered on demand the first time
+        response = client.get(f"/media/images/{stored.sha256}/thumb.webp")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/webp")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn("max-age=31536000", response.headers["Cache-Control"])
+        etag = response.headers["ETag"]
+        response.close()
+
+        response = client.get(f"/media/images/{stored.sha256}/thumb.webp", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+        self.assertEqual(client.get(f"/media/images/{stored.sha256}/huge.png").status_code, 404)
+        self.assertEqual(client.get(f"/media/images/{'0' * 64}/thumb.jpg").status_code, 404)
+        self.assertEqual(client.get(f"/media/images/{attachment.sha256}/thumb.jpg").status_code, 404)
+        self.assertFalse(has_derivatives(attachment.sha256))
+
+
+if __name__ == "__main__":
+    unittest.main()
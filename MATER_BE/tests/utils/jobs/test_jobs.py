@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from models.base import Base, apply_sqlite_profile, nest_sqlite_savepoints
+from models.main import init_db
+from models.user import User
+from models.job import Job
+from models.asset import Asset
+from utils.blob.blob_utils import BLOB_FOLDER
+from utils.jobs.jobs_utils import JobError, JobRunner, job_handler, submit_job
+
+
+@job_handler("test_echo")
+def echo_job(context):
+    if context.params.get("fail"):
+        raise JobError("Asked to fail")
+    context.set_progress(1, 2)
+    context.write_artifact([json.dumps(context.params).encode("utf-8")])
+    return "echo.json"
+
+
+@job_handler("test_slow")
+def slow_job(context):
+    # Reports the same percentage while a sweep (in another process) fails the job
+    context.set_progress(1, 2)
+    context.runner.update_job(context.id, status="failed", message="Job stopped responding")
+    context.set_progress(1, 2)
+    context.write_artifact([b"late"])
+    return "slow.txt"
+
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="mater-jobs-")
+        self.app = Flask(__name__, instance_path=self.folder)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(self.folder, 'jobs.db')}"
+        self.app.config["JOBS_ARTIFACT_TTL"] = 60
+        db = SQLAlchemy(model_class=Base)
+        db.init_app(self.app)
+        self.app.config["current_db"] = db
+        with self.app.app_context():
+            init_db(db.engine)
+            db.session.add(User(id="u1", username="u1", password="x", email="u1@example.com"))
+            db.session.commit()
+        self.db = db
+        self.runner = JobRunner(self.app)
+
+    def test_run_and_sweep(self):
+        with self.app.app_context():
+            ok = submit_job("u1", "test_echo", {"value": 1}).id
+            failed = submit_job("u1", "test_echo", {"fail": True}).id
+            unknown = submit_job("u1", "missing_kind").id
+
+        self.assertTrue(self.runner.run_next())
+        self.assertTrue(self.runner.run_next())
+        self.assertTrue(self.runner.run_next())
+        self.assertFalse(self.runner.run_next())
+
+        with self.app.app_context():
+            job = self.db.session.get(Job, ok)
+            self.assertEqual((job.status, job.progress, job.artifact_name), ("succeeded", 100, "echo.json"))
+            with open(job.artifact_path) as artifact:
+                self.assertEqual(json.load(artifact), {"value": 1})
+            self.assertEqual(self.db.session.get(Job, failed).message, "Asked to fail")
+            self.assertEqual(self.db.session.get(Job, unknown).status, "failed")
+            artifact_path = job.artifact_path
+
+            # Expire everything and leave a running job without a heartbeat
+            self.db.session.query(Job).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+            self.db.session.add(Job(id="stale", user_id="u1", kind="test_echo", status="running",
+                                    updated_at=datetime.utcnow() - timedelta(days=1)))
+            self.db.session.commit()
+
+        self.assertEqual(self.runner.sweep(), 3)
+        self.assertFalse(os.path.exists(artifact_path))
+        with self.app.app_context():
+            self.assertEqual(self.db.session.get(Job, ok).status, "expired")
+            self.assertEqual(self.db.session.get(Job, "stale").status, "failed")
+
+    def test_upload_assets_job(self):
+        input_path = os.path.join(self.folder, "upload.input")
+        with open(input_path, "wb") as upload:
+            upload.write(b"name,description,asset_sn,acquired_date\nTruck,,SN1,2024-01-31\n,,SN2,\n")
+        with self.app.app_context():
+            job_id = submit_job("u1", "upload_assets", {"input_path": input_path}).id
+        self.assertTrue(self.runner.run_next())
+        with self.app.app_context():
+            job = self.db.session.get(Job, job_id)
+            self.assertEqual(job.status, "succeeded")
+            with open(job.artifact_path) as artifact:
+                report = json.load(artifact)
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual(len(report["errors"]), 1)
+        self.assertFalse(os.path.exists(input_path))
+
+    def test_upload_assets_job_with_sqlite_profile(self):
+        # Progress is reported while the import holds the single SQLite writer
+        with self.app.app_context():
+            nest_sqlite_savepoints(self.db.engine)
+            lane = apply_sqlite_profile(self.db.engine, {"journal_mode": "WAL", "busy_timeout": 2000})
+            self.db.engine.dispose()
+        rows = "".join(f"Asset {i},,SN{i},2024-01-31\n" for i in range(2500))
+        input_path = os.path.join(self.folder, "upload.input")
+        with open(input_path, "w") as upload:
+            upload.write("name,description,asset_sn,acquired_date\n" + rows)
+        with self.app.app_context():
+            job_id = submit_job("u1", "upload_assets", {"input_path": input_path}).id
+        self.assertTrue(self.runner.run_next())
+        with self.app.app_context():
+            job = self.db.session.get(Job, job_id)
+            self.assertEqual((job.status, job.progress), ("succeeded", 100))
+            self.assertEqual(self.db.session.query(Asset).count(), 2500)
+        # No progress write waited for the writer the import itself holds
+        self.assertLess(lane.stats()["wait_seconds"], 1)
+
+    def test_writer_lane_belongs_to_a_thread(self):
+        with self.app.app_context():
+            lane = apply_sqlite_profile(self.db.engine, {"journal_mode": "WAL", "busy_timeout": 500})
+            engine = self.db.engine
+            engine.dispose()
+
+        def write_elsewhere():
+            with engine.connect() as connection:
+                connection.execute(text("CREATE TEMP TABLE scratch (id INTEGER)"))
+
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("UPDATE user SET email = 'a@example.com'"))
+            # A second connection of the same thread joins the lane instead of waiting for itself
+            second.execute(text("CREATE TEMP TABLE scratch (id INTEGER)"))
+            self.assertLess(lane.stats()["wait_seconds"], 0.25)
+            first.commit()
+            # Still held for the other thread while `second` is in its transaction
+            with self.assertLogs(level="WARNING") as logs:
+                other = threading.Thread(target=write_elsewhere)
+                other.start()
+                other.join()
+            self.assertIn("held by MainThread", logs.output[0])
+            second.commit()
+        self.assertEqual(lane.stats()["writes"], 3)
+
+    def test_heartbeat_and_finish_after_sweep(self):
+        self.runner.heartbeat_interval = 0  # Every report is a heartbeat
+        with self.app.app_context():
+            job_id = submit_job("u1", "test_slow").id
+        writes = []
+        heartbeat = self.runner.heartbeat
+        self.runner.heartbeat = lambda context, **values: writes.append(values) or heartbeat(context, **values)
+        self.assertTrue(self.runner.run_next())
+        self.assertEqual(len(writes), 2)
+        with self.app.app_context():
+            job = self.db.session.get(Job, job_id)
+            # The sweep's verdict stands and the late artifact is discarded
+            self.assertEqual((job.status, job.artifact_path), ("failed", None))
+        self.assertFalse(os.path.exists(os.path.join(self.runner.job_folder, f"{job_id}.result")))
+
+    def test_migrate_storage(self):
+        # Images uploaded before the blob store get moved into it without a CLI step
+        cwd = os.getcwd()
+        os.chdir(self.folder)  # The store lives below the relative upload folder
+        try:
+            legacy = os.path.join("static", "assets", "1")
+            os.makedirs(legacy)
+            with open(os.path.join(legacy, "truck.png"), "wb") as file:
+                file.write(b"\x89PNG legacy")
+            with self.app.app_context():
+                self.db.session.add(Asset(id=1, name="Truck", user_id="u1", image_path=os.path.join(legacy, "truck.png")))
+                self.db.session.commit()
+            self.assertEqual(self.runner.migrate_storage(), (1, 0))
+            self.assertEqual(self.runner.migrate_storage(), (0, 0))  # The lease was released
+            with self.app.app_context():
+                self.assertTrue(self.db.session.get(Asset, 1).image_path.startswith(BLOB_FOLDER))
+            self.assertEqual(os.listdir(legacy), [])
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import unittest
+import jwt
+from flask import Flask, g
+from utils.jwt.jwt_utils import (
+    TokenCache, token_cache, verify_token, extract_request_token, invalidate_token, check_admin, get_request_user_id,
+)
+
+
+class TestTokenCache(unittest.TestCase):
+    def test_lru_and_ttl(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.put_user_id("a", "u1")
+        cache.put_user_id("b", "u1")
+        self.assertEqual(cache.get_user_id("a"), "u1")  # "a" is now the most recent
+        cache.put_user_id("c", "u2")
+        self.assertIsNone(cache.get_user_id("b"))
+        self.assertEqual(cache.get_user_id("c"), "u2")
+
+        cache.put_role("u1", True)
+        cache.put_role("ghost", None)
+        self.assertEqual(cache.get_role("u1"), (True,))
+        self.assertEqual(cache.get_role("ghost"), (None,))
+
+        cache.invalidate_user("u1")
+        self.assertIsNone(cache.get_user_id("a"))
+        self.assertIsNone(cache.get_role("u1"))
+        self.assertEqual(cache.get_user_id("c"), "u2")
+
+        cache.ttl = 0
+        cache.put_user_id("d", "u3")
+        time.sleep(0.01)
+        self.assertIsNone(cache.get_user_id("d"))
+
+    def test_verify_token(self):
+        app = Flask(__name__)
+        app.config["CURRENT_SECRET_KEY"] = "test-secret-key-of-at-least-32-bytes"
+        token = jwt.encode({"id": "u1"}, "test-secret-key-of-at-least-32-bytes", algorithm="HS256")
+        forged = jwt.encode({"id": "u1"}, "another-secret-key-of-at-least-32-bytes", algorithm="HS256")
+        token_cache.clear()
+
+        with app.test_request_context(json={"jwt": token}, headers={"Authorization": "Bearer ignored"}):
+            self.assertEqual(extract_request_token(), token)
+            self.assertEqual(verify_token(token), ("u1", None))
+            self.assertEqual(g.auth_user_id, "u1")
+            self.assertEqual(verify_token(forged), (None, "Invalid token"))
+            self.assertEqual(verify_token(None), (None, "Token is missing"))
+        self.assertEqual(token_cache.get_user_id(token), "u1")
+        self.assertIsNone(token_cache.get_user_id(forged))
+
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            self.assertEqual(verify_token(extract_request_token()), ("u1", None))
+            invalidate_token(token)
+            self.assertIsNone(token_cache.get_user_id(token))
+            self.assertIsNone(g.get("auth_token"))
+
+    def test_check_admin_ignores_cookie(self):
+        app = Flask(__name__)
+        app.config["CURRENT_SECRET_KEY"] = "test-secret-key-of-at-least-32-bytes"
+        token = jwt.encode({"id": "admin"}, "test-secret-key-of-at-least-32-bytes", algorithm="HS256")
+        token_cache.clear()
+        token_cache.put_role("admin", True)
+
+        # A cross-site request carries the cookie but cannot set the body or header
+        with app.test_request_context(headers={"Cookie": f"access_token={token}"}):
+            response, status = check_admin({})
+            self.assertEqual((status, response.json), (403, {"error": "Token is missing"}))
+            self.assertIsNone(get_request_user_id(allow_cookie=False))
+            self.assertEqual(get_request_user_id(), "admin")
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            self.assertIsNone(check_admin({}))
+        with app.test_request_context(json={"jwt": token}):
+            self.assertIsNone(check_admin({"jwt": token}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from models.base import Base
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from utils.blob.blob_utils import store_blob
+from utils.jwt.jwt_utils import token_cache
+from utils.media.media_utils import hide_private_static_files
+from blueprints.media import media_blueprint
+
+SECRET_KEY = "media-test-secret-key-0123456789abcdef"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+PDF = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+class TestMediaRoutes(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-media-")
+        os.chdir(self.folder)
+        token_cache.clear()
+        self.app = Flask(__name__, instance_path=self.folder)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(self.folder, 'media.db')}"
+        self.app.config["CURRENT_SECRET_KEY"] = SECRET_KEY
+        db = SQLAlchemy(model_class=Base)
+        db.init_app(self.app)
+        self.app.config["current_db"] = db
+        self.app.register_blueprint(media_blueprint, url_prefix="/media")
+        with self.app.app_context():
+            init_db(db.engine)
+            session = db.session
+            image = store_blob(session, io.BytesIO(PNG))
+            manual = store_blob(session, io.BytesIO(PDF))
+            session.add_all([
+                User(id="u1", username="u1", password="x", email="u1@example.com"),
+                User(id="u2", username="u2", password="x", email="u2@example.com"),
+                Asset(id=1, name="Truck", user_id="u1", image_path=image.path),
+            ])
+            session.flush()
+            session.add(Service(id=10, asset_id=1, user_id="u1"))
+            session.flush()
+            session.add(ServiceAttachment(
+                id=5, service_id=10, user_id="u1", attachment_path=manual.path, file_name="Manual ü.pdf"
+            ))
+            session.commit()
+            from utils.jwt.jwt_utils import generate_jwt
+            self.tokens = {user: generate_jwt(user) for user in ("u1", "u2")}
+        self.manual_sha256 = manual.sha256
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def get(self, url, user="u1", **headers):
+        headers["Authorization"] = f"Bearer {self.tokens[user]}"
+        response = self.client.get(url, headers=headers)
+        response.get_data()  # Buffered before the file is closed
+        response.close()
+        return response
+
+    def test_authorization(self):
+        self.assertEqual(self.client.get("/media/attachments/5").status_code, 401)
+        self.assertEqual(self.get("/media/attachments/5", user="u2").status_code, 404)
+        self.assertEqual(self.get("/media/assets/1/image", user="u2").status_code, 404)
+        self.assertEqual(self.get("/media/attachments/99").status_code, 404)
+
+    def test_range_and_conditional(self):
+        response = self.get("/media/attachments/5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/pdf")
+        self.assertEqual(response.get_etag()[0], self.manual_sha256)
+        self.assertIn("inline", response.headers["Content-Disposition"])
+        self.assertIn("private", response.headers["Cache-Control"])
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+
+        response = self.get("/media/attachments/5", Range="bytes=0-8")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, PDF[:9])
+        self.assertEqual(response.headers["Content-Range"], f"bytes 0-8/{len(PDF)}")
+
+        response = self.get("/media/attachments/5", **{"If-None-Match": f'"{self.manual_sha256}"'})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.get("/media/attachments/5?download=1")
+        self.assertTrue(response.headers["Content-Disposition"].startswith("attachment"))
+
+        response = self.get("/media/assets/1/image")
+        self.assertEqual((response.status_code, response.mimetype, response.data), (200, "image/png", PNG))
+
+    def test_proxy_offload(self):
+        self.app.config["MEDIA_OFFLOAD"] = "x-accel"
+        response = self.get("/media/attachments/5")
+        sha256 = self.manual_sha256
+        self.assertEqual(
+            response.headers["X-Accel-Redirect"], f"/protected-media/blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+        )
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.mimetype, "application/pdf")
+        self.assertIn("filename*=UTF-8''Manual%20%C3%BC.pdf", response.headers["Content-Disposition"])
+        self.assertEqual(self.get("/media/attachments/5", **{"If-None-Match": f'"{sha256}"'}).status_code, 304)
+
+        self.app.config["MEDIA_OFFLOAD"] = "x-sendfile"
+        response = self.get("/media/assets/1/image")
+        self.assertTrue(os.path.isabs(response.headers["X-Sendfile"]))
+        self.assertEqual(response.data, b"")
+
+    def test_static_folder_hides_uploads(self):
+        # Uploads live under static/, as in production; only the /media/ routes serve them
+        app = Flask(__name__, static_folder=os.path.join(self.folder, "static"))
+        hide_private_static_files(app)
+        with open(os.path.join(self.folder, "static", "styles.css"), "w") as styles:
+            styles.write("body {}")
+        client = app.test_client()
+        self.assertEqual(client.get("/static/styles.css").status_code, 200)
+        blob = f"blobs/{self.manual_sha256[:2]}/{self.manual_sha256[2:4]}/{self.manual_sha256}"
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, "static", "assets", blob)))
+        for url in (f"/static/assets/{blob}", f"/static/images/../assets/{blob}", "/static/derivatives/ab/x"):
+            self.assertEqual(client.get(url).status_code, 404, url)
+
+
+if __name__ == "__main__":
+    unittest.main()
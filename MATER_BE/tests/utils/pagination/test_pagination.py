@@ -0,0 +1,38 @@
+from models.asset import Asset
+from tests.database import InMemoryDBTest
+from utils.pagination.pagination_utils import (
+    encode_cursor, decode_cursor, get_page_params, keyset_page, MAX_PAGE_LIMIT
+)
+
+
+class TestPaginationUtils(InMemoryDBTest):
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor([42, "01HZX"])
+        self.assertEqual(decode_cursor(cursor), [42, "01HZX"])
+
+    def test_invalid_cursor(self):
+        for cursor in ("not base64!", encode_cursor([1])[:-1] + "*", "eyJhIjoxfQ"):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_page_params(self):
+        self.assertEqual(get_page_params({}), (False, None, None))
+        self.assertEqual(get_page_params({"limit": "5"}), (True, 5, None))
+        with self.assertRaises(ValueError):
+            get_page_params({"limit": MAX_PAGE_LIMIT + 1})
+
+    def test_keyset_page_walks_every_row_once(self):
+        self.add_user()
+        self.session.add_all([Asset(name=f"asset {n}", user_id="u1") for n in range(23)])
+        self.session.commit()
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            query = self.session.query(Asset).filter(Asset.user_id == "u1")
+            rows, cursor = keyset_page(query, [Asset.id], cursor, limit=10)
+            seen.extend(asset.id for asset in rows)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, list(range(1, 24)))
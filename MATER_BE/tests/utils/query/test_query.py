@@ -0,0 +1,55 @@
+from datetime import date
+from sqlalchemy import event
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from tests.database import InMemoryDBTest
+from utils.query.query_utils import user_services, user_service_with_attachments, user_service_rows, SERVICE_ROW_FIELDS
+
+
+class TestQueryUtils(InMemoryDBTest):
+    def setUp(self):
+        super().setUp()
+        self.add_user()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def add_services(self, count):
+        for n in range(count):
+            asset = Asset(name=f"asset {n}", user_id="u1")
+            service = Service(asset=asset, user_id="u1", service_date=date.today())
+            service.serviceattachments.append(ServiceAttachment(user_id="u1", attachment_path=f"{n}.pdf"))
+            self.session.add(service)
+        self.session.commit()
+        self.session.expunge_all()
+        self.statements.clear()
+
+    def test_user_services_statement_count_is_constant(self):
+        for count in (1, 25):
+            self.add_services(count)
+            names = [service.asset.name for service in user_services(self.session, "u1").all()]
+            self.assertEqual(len(self.statements), 1)
+            self.assertEqual(len(names), self.session.query(Service).count())
+            self.statements.clear()
+
+    def test_user_service_with_attachments(self):
+        self.add_services(3)
+        service = user_service_with_attachments(self.session, "u1", 2).first()
+        self.assertEqual(service.asset.name, "asset 1")
+        self.assertEqual(len(service.serviceattachments), 1)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_user_service_rows(self):
+        self.add_services(2)
+        services = Service.serialize_rows(
+            user_service_rows(self.session, "u1").order_by(Service.id), SERVICE_ROW_FIELDS
+        )
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(services[1], {
+            "id": 2, "asset_id": 2, "service_type": None, "service_date": date.today(),
+            "service_status": None, "asset_name": "asset 1",
+        })
+        self.assertEqual(len(self.session.identity_map), 0)  # No entities were built
@@ -0,0 +1,134 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from models.storagemanifest import StorageManifest, StorageCheckpoint
+from utils.blob.blob_utils import store_blob
+from utils.reconcile import reconcile_utils
+from utils.reconcile.reconcile_utils import reconcile_storage
+
+
+def write(path, content=b"data", age=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+
+
+class TestStorageReconciler(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix="mater-reconcile-")
+        os.chdir(self.folder)
+        # Folders changed "just now" would be listed again on every run of the test
+        self.racy_seconds = reconcile_utils.RACY_SECONDS
+        reconcile_utils.RACY_SECONDS = -60
+        # Blobs touched within the overlap would be checked again on every run
+        self.overlap = reconcile_utils.CHECKPOINT_OVERLAP
+        reconcile_utils.CHECKPOINT_OVERLAP = timedelta(0)
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        self.session = Session(self.engine)
+        image = store_blob(self.session, io.BytesIO(b"image"))
+        self.legacy = os.path.join("static", "assets", "1", "service_attachments", "10", "manual.pdf")
+        write(self.legacy, age=7200)
+        self.session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            Asset(id=1, name="Truck", user_id="u1", image_path=image.path),
+        ])
+        self.session.flush()
+        self.session.add(Service(id=10, asset_id=1, user_id="u1"))
+        self.session.flush()
+        self.session.add(ServiceAttachment(id=5, service_id=10, user_id="u1", attachment_path=self.legacy))
+        self.session.commit()
+        self.image = image
+
+    def tearDown(self):
+        reconcile_utils.RACY_SECONDS = self.racy_seconds
+        reconcile_utils.CHECKPOINT_OVERLAP = self.overlap
+        self.session.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def reconcile(self, **kwargs):
+        kwargs.setdefault("grace", timedelta(hours=1))
+        return reconcile_storage(self.session, **kwargs)
+
+    def test_first_run_is_full_and_clean(self):
+        report = self.reconcile()
+        self.assertTrue(report.full)
+        self.assertEqual((report.orphans, report.dangling), ([], []))
+        self.assertEqual(report.added, 2)
+        # Nothing changed: no folder is listed again
+        again = self.reconcile()
+        self.assertFalse(again.full)
+        self.assertEqual((again.listed_dirs, again.added, again.removed), (0, 0, 0))
+        self.assertGreater(again.scanned_dirs, 0)
+
+    def test_orphans_after_grace(self):
+        self.reconcile()
+        stray = os.path.join("static", "assets", "1", "image", "failed-upload.jpg")
+        fresh = os.path.join("static", "assets", "1", "image", "uploading.jpg")
+        write(stray, age=7200)
+        write(fresh)
+        report = self.reconcile()
+        self.assertEqual(report.listed_dirs, 2)  # The new folder and its parent only
+        self.assertEqual(report.orphans, [stray])
+        # Reported once; the fresh file is re-checked until it is old enough
+        self.assertEqual(self.reconcile().orphans, [])
+        self.assertEqual(self.reconcile(grace=timedelta(0)).orphans, [fresh])
+
+        quarantine = os.path.join(self.folder, "quarantine")
+        report = self.reconcile(quarantine_folder=quarantine, grace=timedelta(0))
+        self.assertEqual(sorted(report.quarantined), sorted([stray, fresh]))
+        self.assertFalse(os.path.exists(stray))
+        self.assertTrue(os.path.isfile(os.path.join(quarantine, "1", "image", "failed-upload.jpg")))
+        self.assertEqual(self.session.query(StorageManifest).filter(StorageManifest.status.isnot(None)).count(), 0)
+
+    def test_dangling_rows(self):
+        self.reconcile()
+        os.remove(self.legacy)
+        os.remove(self.image.path)
+        report = self.reconcile()
+        found = {(row["kind"], row["id"]) for row in report.dangling}
+        self.assertEqual(found, {("attachment", 5), ("asset", 1), ("blob", self.image.sha256)})
+        # Reported when the change is seen; a full pass finds them again
+        self.assertEqual(self.reconcile().dangling, [])
+        self.assertEqual(len(self.reconcile(full=True).dangling), 3)
+
+    def test_new_rows_checked_through_blob_checkpoint(self):
+        self.reconcile()
+        # A row taking a blob whose file vanished without its folder being seen to change
+        missing = store_blob(self.session, io.BytesIO(b"gone"))
+        self.session.commit()
+        self.reconcile()
+        os.remove(missing.path)
+        os.utime(os.path.dirname(missing.path), (0, 0))
+        self.session.execute(
+            update(StorageManifest).where(StorageManifest.path == os.path.dirname(missing.path)).values(mtime=0)
+        )
+        self.session.add(Asset(id=2, name="Mower", user_id="u1", image_path=missing.path))
+        self.session.commit()
+        found = {(row["kind"], row["id"]) for row in self.reconcile().dangling}
+        self.assertEqual(found, {("asset", 2), ("blob", missing.sha256)})
+
+    def test_lease(self):
+        self.session.add(StorageCheckpoint(name="lease", value="9999-01-01T00:00:00"))
+        self.session.commit()
+        self.assertIsNone(self.reconcile())
+
+
+if __name__ == "__main__":
+    unittest.main()
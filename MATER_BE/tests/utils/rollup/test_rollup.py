@@ -0,0 +1,94 @@
+import unittest
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.cost import Cost
+from models.costrollup import AssetCostRollup, MonthlyCostRollup
+from utils.rollup.rollup_utils import rebuild_cost_rollups
+
+
+class TestCostRollups(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        self.session = Session(self.engine)
+        self.session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            Asset(id=1, name="Truck", user_id="u1"),
+            Asset(id=2, name="Mower", user_id="u1"),
+        ])
+        self.session.flush()
+        self.session.add(Service(id=10, asset_id=1, user_id="u1", service_type="Oil Change"))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def snapshot(self):
+        assets = {row.asset_id: (round(row.total, 2), row.cost_count)
+                  for row in self.session.query(AssetCostRollup) if row.cost_count}
+        months = {row.month: (round(row.total, 2), row.cost_count)
+                  for row in self.session.query(MonthlyCostRollup) if row.cost_count}
+        return assets, months
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        rebuild_cost_rollups(self.session)
+        self.assertEqual(incremental, self.snapshot())
+        return incremental
+
+    def test_incremental_updates(self):
+        self.session.add_all([
+            Cost(type="asset", type_id=1, cost_date=date(2024, 1, 5), cost_data=10.0),
+            Cost(type="service", type_id=10, cost_date=date(2024, 1, 20), cost_data=5.5),
+            Cost(type="asset", type_id=2, cost_date=None, cost_data=3.0),
+        ])
+        self.session.commit()
+        assets, months = self.assert_matches_rebuild()
+        self.assertEqual(assets, {1: (15.5, 2), 2: (3.0, 1)})
+        self.assertEqual(months, {"2024-01": (15.5, 2), "undated": (3.0, 1)})
+
+        cost = self.session.query(Cost).filter_by(type="asset", type_id=1).one()
+        cost.cost_data = 12.0
+        cost.cost_date = date(2024, 2, 1)
+        self.session.commit()
+        assets, months = self.assert_matches_rebuild()
+        self.assertEqual(months["2024-02"], (12.0, 1))
+
+        self.session.get(Service, 10).asset_id = 2  # The service's costs follow it
+        self.session.commit()
+        assets, _ = self.assert_matches_rebuild()
+        self.assertEqual(assets, {1: (12.0, 1), 2: (8.5, 2)})
+
+        self.session.delete(self.session.query(Cost).filter_by(type="asset", type_id=2).one())
+        self.session.commit()
+        self.assert_matches_rebuild()
+
+        self.session.delete(self.session.get(Asset, 2))  # Its service goes with it
+        self.session.commit()
+        assets, months = self.assert_matches_rebuild()
+        self.assertEqual(assets, {1: (12.0, 1)})
+        self.assertEqual(months, {"2024-02": (12.0, 1)})
+
+    def test_update_after_commit(self):
+        cost = Cost(type="asset", type_id=1, cost_date=date(2024, 1, 5), cost_data=10.0)
+        self.session.add(cost)
+        self.session.commit()
+        cost.cost_data = 4.0  # The committed instance is expired
+        self.session.commit()
+        assets, _ = self.assert_matches_rebuild()
+        self.assertEqual(assets, {1: (4.0, 1)})
+
+    def test_rollback_leaves_rollups(self):
+        self.session.add(Cost(type="asset", type_id=1, cost_date=date(2024, 1, 5), cost_data=10.0))
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.snapshot(), ({}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
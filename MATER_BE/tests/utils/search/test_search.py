@@ -0,0 +1,115 @@
+import io
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from models.main import init_db
+from models.user import User
+from models.asset import Asset
+from models.service import Service
+from models.note import Note
+from utils.bulk.bulk_utils import import_assets
+from utils.search.search_utils import create_search_index, reindex_search, search, search_terms, metadata
+
+
+class TestSearch(unittest.TestCase):
+    backend = "fts5"
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        init_db(self.engine)
+        if self.backend == "fts5":
+            self.assertEqual(create_search_index(self.engine), "fts5")
+        else:
+            metadata.create_all(bind=self.engine)
+            self.engine.search_backend = self.backend
+        self.session = Session(self.engine)
+        self.session.add_all([
+            User(id="u1", username="u1", password="x", email="u1@example.com"),
+            User(id="u2", username="u2", password="x", email="u2@example.com"),
+            Asset(id=1, name="Ford Truck", asset_sn="SN-100", description="Red pickup", user_id="u1"),
+            Asset(id=2, name="Lawn Mower", description="Needs an oil change soon", user_id="u1"),
+            Asset(id=3, name="Ford Focus", user_id="u2"),
+        ])
+        self.session.flush()
+        self.session.add_all([
+            Service(id=10, asset_id=1, user_id="u1", service_type="Oil Change", service_status="Pending"),
+            Note(id=20, type="asset", type_id=1, note_data="Check the tire pressure"),
+            Note(id=21, type="service", type_id=10, note_data="Used synthetic oil"),
+        ])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def hits(self, query, user_id="u1", **kwargs):
+        results, _ = search(self.session, user_id, query, **kwargs)
+        return [(result["kind"], result["id"]) for result in results]
+
+    def test_ranked_and_scoped_to_user(self):
+        self.assertEqual(self.hits("ford"), [("asset", 1)])
+        self.assertEqual(self.hits("ford", user_id="u2"), [("asset", 3)])
+        # Title matches rank above body matches; words match by prefix
+        self.assertEqual(self.hits("oil")[0], ("service", 10))
+        self.assertEqual(set(self.hits("oil")), {("service", 10), ("asset", 2), ("note", 21)})
+        self.assertEqual(self.hits("oil chan"), [("service", 10), ("asset", 2)])
+        self.assertEqual(self.hits("oil", kinds=["note"]), [("note", 21)])
+        self.assertEqual(self.hits("sn 100"), [("asset", 1)])
+        self.assertEqual(self.hits("\"*) NEAR ("), [])
+
+    def test_pagination(self):
+        first, has_more = search(self.session, "u1", "oil", limit=2)
+        rest, more_after = search(self.session, "u1", "oil", limit=2, offset=2)
+        self.assertTrue(has_more)
+        self.assertFalse(more_after)
+        self.assertEqual(len(first) + len(rest), 3)
+
+    def test_index_follows_changes(self):
+        asset = self.session.get(Asset, 1)
+        asset.name = "Chevy Truck"
+        self.session.commit()
+        self.assertEqual(self.hits("ford"), [])
+        self.assertEqual(self.hits("chevy"), [("asset", 1)])
+
+        self.session.get(Note, 20).note_data = "Rotate tires"
+        self.session.commit()
+        self.assertEqual(self.hits("rotate"), [("note", 20)])
+
+        # Deleting an asset drops its services and the notes of both
+        self.session.delete(asset)
+        self.session.commit()
+        self.assertEqual(self.hits("rotate"), [])
+        self.assertEqual(self.hits("synthetic"), [])
+        self.assertEqual(self.hits("oil"), [("asset", 2)])
+
+    def test_rollback_leaves_index(self):
+        self.session.add(Asset(id=4, name="Generator", user_id="u1"))
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.hits("generator"), [])
+
+    def test_reindex_matches_incremental(self):
+        before = {query: self.hits(query) for query in ("oil", "ford", "tire")}
+        table = "search_index" if self.backend == "fts5" else "search_document"
+        self.session.execute(text(f"DELETE FROM {table}"))
+        self.session.commit()
+        self.assertEqual(reindex_search(self.session), 6)
+        self.assertEqual({query: self.hits(query) for query in before}, before)
+
+    def test_bulk_import_is_indexed(self):
+        upload = io.BytesIO(b"name,description,asset_sn,acquired_date\nTractor,Green,SN-7,2024-01-01\nTrailer,,SN-8,2024-01-01\n")
+        report = import_assets(self.session, "u1", upload, batch_size=1)
+        self.assertEqual(report["imported"], 2)
+        tractor = self.session.query(Asset).filter_by(name="Tractor").one()
+        self.assertEqual(self.hits("green"), [("asset", tractor.id)])
+        self.assertEqual(len(self.hits("sn")), 3)  # With the Ford Truck's SN-100
+
+    def test_search_terms(self):
+        self.assertEqual(search_terms("Oil-change  SN_100!"), ["oil", "change", "sn", "100"])
+
+
+class TestLikeSearch(TestSearch):
+    backend = "like"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Flask, jsonify
+from models.note import Note
+from utils.serialization.serialization_utils import ORJSONProvider, ISODateJSONProvider, orjson
+
+
+class TestJSONProviders(unittest.TestCase):
+    payload = {
+        "date": date(2024, 5, 1),
+        "datetime": datetime(2024, 5, 1, 8, 30),
+        "decimal": Decimal("1.5"),
+        "nested": [{"none": None}],
+    }
+    expected = {"date": "2024-05-01", "datetime": "2024-05-01T08:30:00", "decimal": 1.5, "nested": [{"none": None}]}
+
+    def check(self, provider_class):
+        app = Flask(__name__)
+        app.json = provider_class(app)
+        with app.app_context():
+            response = jsonify(self.payload)
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertEqual(json.loads(response.get_data()), self.expected)
+            self.assertEqual(app.json.loads(app.json.dumps(self.payload)), self.expected)
+
+    def test_stdlib_provider(self):
+        self.check(ISODateJSONProvider)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_provider(self):
+        self.check(ORJSONProvider)
+
+    def test_model_serializer(self):
+        note = Note(id=1, type="asset", type_id=2, note_date=date(2024, 5, 1), note_data="text")
+        row = (1, "asset", 2, date(2024, 5, 1), "text")
+        self.assertEqual(note.to_dict(), Note.serialize_rows([row])[0])
+        self.assertEqual(list(note.to_dict()), list(Note.serialize_fields))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#src/utils/archive/archive_utils.py
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+FILE_ATTRIBUTES = 0o100644 << 16
+# Formats that are already compressed; deflating them again only burns CPU
+PRECOMPRESSED_EXTENSIONS = {
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "pdf", "zip", "gz", "bz2", "xz", "7z",
+    "mp3", "mp4", "mov", "docx", "xlsx", "pptx",
+}
+FILE_CHUNK_SIZE = 1024 * 1024
+# Files up to this size are read on the thread pool ahead of the writer, larger ones inline
+READ_AHEAD_LIMIT = 16 * 1024 * 1024
+
+class _WriteThroughBuffer:
+    """
+    Write-only file object without tell() or seek(). zipfile then never goes back to
+    patch a header: every entry is followed by a data descriptor, so whatever it has
+    written can be drained and sent at once.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ZipStream:
+    """
+    Build a ZIP archive with zipfile as a sequence of byte chunks, so it can be sent
+    to a client (or written to any file object) while it is being produced.
+
+        archive = ZipStream()
+        yield from archive.add("table.csv", csv_chunks)
+        yield from archive.finish()
+    """
+
+    def __init__(self):
+        self._buffer = _WriteThroughBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", zipfile.ZIP_DEFLATED)
+        self.entry_count = 0
+
+    def _drain(self):
+        data = self._buffer.drain()
+        if data:
+            yield data
+
+    def add(self, arcname, chunks, compress=True, timestamp=None, size=None):
+        """
+        Yield the bytes of one entry whose content comes from an iterable of byte chunks.
+        Without `size` the entry gets ZIP64 sizes, as it may pass 4 GiB.
+        """
+        info = zipfile.ZipInfo(arcname, max(time.localtime(timestamp)[:6], (1980, 1, 1, 0, 0, 0)))
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.external_attr = FILE_ATTRIBUTES
+        info.file_size = size or 0
+        with self._zip.open(info, "w", force_zip64=size is None) as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                yield from self._drain()
+        self.entry_count += 1
+        yield from self._drain()
+
+    def finish(self):
+        """
+        Yield the central directory and end records that close the archive.
+        """
+        self._zip.close()
+        yield from self._drain()
+
+def is_precompressed(path):
+    """
+    True for files whose format is already compressed and should be stored as is.
+    """
+    return path.rsplit(".", 1)[-1].lower() in PRECOMPRESSED_EXTENSIONS
+
+def iter_file(path, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Yield the content of a file in chunks.
+    """
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            yield chunk
+
+def read_file(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+def iter_directory_files(root):
+    """
+    Yield (path, arcname) for every file below root in a stable order.
+    """
+    for folder, subfolders, filenames in os.walk(root):
+        subfolders.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(folder, filename)
+            yield path, os.path.relpath(path, root).replace(os.sep, "/")
+
+def iter_directory_zip(root, workers=4, progress=None):
+    """
+    Yield a ZIP archive of every file below root while it is being built.
+    """
+    return iter_files_zip(iter_directory_files(root), workers, progress)
+
+def iter_files_zip(files, workers=4, progress=None):
+    """
+    Yield a ZIP archive of `files`, (path, arcname) pairs, while it is being built.
+
+    Already-compressed media is stored without recompression. Files up to
+    READ_AHEAD_LIMIT are read on `workers` threads up to `workers * 2` files ahead
+    of the writer, so disk reads overlap with compression, which stays on the
+    calling thread. Memory is bounded by `workers * 2 * READ_AHEAD_LIMIT` (128 MiB
+    at the defaults), and neither time to first byte nor disk usage depends on the
+    size of the tree.
+    `progress(done, total)` is called after each file; it costs one extra listing
+    of the tree up front.
+    """
+    archive = ZipStream()
+    window = deque()
+    workers = max(workers, 1)
+    if progress:
+        files = list(files)
+        total = len(files)
+        progress(0, total)
+
+    def write(path, arcname, future):
+        timestamp = os.path.getmtime(path)
+        compress = not is_precompressed(path)
+        if future is not None:
+            data = future.result()
+            yield from archive.add(arcname, [data], compress, timestamp, size=len(data))
+        else:
+            yield from archive.add(arcname, iter_file(path), compress, timestamp, size=os.path.getsize(path))
+        if progress:
+            progress(archive.entry_count, total)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-read")
+    try:
+        for path, arcname in files:
+            if len(window) >= workers * 2:
+                yield from write(*window.popleft())
+            future = None
+            if os.path.getsize(path) <= READ_AHEAD_LIMIT:
+                future = executor.submit(read_file, path)
+            window.append((path, arcname, future))
+        while window:
+            yield from write(*window.popleft())
+        yield from archive.finish()
+    finally:
+        # Also reached when the client disconnects and the generator is closed
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,354 @@
+#src/utils/blob/blob_utils.py
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter, namedtuple
+from datetime import datetime
+from sqlalchemy import event, inspect, select, delete, insert, update
+from sqlalchemy.orm import Session
+from werkzeug.utils import secure_filename
+from models.asset import Asset
+from models.blob import Blob
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from utils.query.query_utils import upsert_add
+from utils.storage.storage_utils import UPLOAD_BASE_FOLDER, get_asset_upload_folder, get_derivative_folder
+from utils.media.media_utils import guess_mimetype
+from utils.reaper.reaper_utils import tombstone_paths
+
+# Uploads are stored once per distinct content under blobs/<aa>/<bb>/<sha256>, hashed
+# while they are streamed to disk. Asset.image_path and ServiceAttachment.attachment_path
+# hold the blob path; the blob row's refcount follows those columns through Session
+# events, so cascades and rollbacks keep it right. Paths outside the blob folder
+# (files uploaded before the store existed) are left alone.
+
+BLOB_FOLDER = os.path.join(UPLOAD_BASE_FOLDER, "blobs")
+BLOB_CHUNK_SIZE = 1024 * 1024
+SHA256_LENGTH = 64
+
+# Columns holding a blob path
+BLOB_REFERENCES = {Asset: "image_path", ServiceAttachment: "attachment_path"}
+
+# What store_blob returns; `new` is False when the content was already stored
+StoredBlob = namedtuple("StoredBlob", ["path", "sha256", "size", "new"])
+
+def blob_path(sha256):
+    return os.path.join(BLOB_FOLDER, sha256[:2], sha256[2:4], sha256)
+
+def blob_sha256(path):
+    """
+    Return the SHA-256 of a blob path, or None for a path outside the blob store.
+    """
+    if not path:
+        return None
+    sha256 = os.path.basename(path)
+    if len(sha256) != SHA256_LENGTH or os.path.normpath(path) != os.path.normpath(blob_path(sha256)):
+        return None
+    return sha256
+
+def store_blob(session, stream):
+    """
+    Copy a binary stream into the blob store and return a StoredBlob. Content that
+    is already stored is not written again. The blob row is created with no
+    references; saving the path on an asset or attachment takes one.
+    """
+    tmp_folder = os.path.join(BLOB_FOLDER, "tmp")
+    os.makedirs(tmp_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=tmp_folder, delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: stream.read(BLOB_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+
+    sha256 = digest.hexdigest()
+    path = blob_path(sha256)
+    # Touching updated_at keeps the sweep from collecting a blob that is being re-uploaded
+    upsert_add(session.connection(), Blob, {"sha256": sha256}, {"size": size, "updated_at": datetime.utcnow()}, {"refcount": 0})
+    new = not os.path.exists(path)
+    if new:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp.name, path)
+    else:
+        os.remove(tmp.name)
+    return StoredBlob(path, sha256, size, new)
+
+def store_upload(session, file):
+    """
+    Store an uploaded werkzeug FileStorage. Returns (StoredBlob, secure file name).
+    """
+    return store_blob(session, file.stream), secure_filename(file.filename)
+
+def store_attachment(session, file, service_id, user_id):
+    """
+    Store an uploaded file and return a new ServiceAttachment recording its size,
+    type and checksum.
+    """
+    stored, file_name = store_upload(session, file)
+    mime_type = guess_mimetype(file_name)
+    if mime_type == "application/octet-stream" and file.mimetype:
+        mime_type = file.mimetype  # As sent by the client, for names without a known extension
+    return ServiceAttachment(
+        service_id=service_id,
+        user_id=user_id,
+        attachment_path=stored.path,
+        file_name=file_name,
+        file_size=stored.size,
+        mime_type=mime_type,
+        checksum=stored.sha256,
+        uploaded_at=datetime.utcnow(),
+    )
+
+def _loaded_value(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+def _load_previous_path(target, value, oldvalue, initiator):
+    # Registered only for active_history: the replaced path must be loaded before an
+    # expired attribute is overwritten, or its blob would never be released
+    pass
+
+for _model, _key in BLOB_REFERENCES.items():
+    event.listen(getattr(_model, _key), "set", _load_previous_path, active_history=True)
+
+@event.listens_for(Session, "before_flush")
+def _collect_blob_references(session, flush_context, instances):
+    deltas = Counter()
+    for obj in session.new:
+        key = BLOB_REFERENCES.get(type(obj))
+        if key:
+            deltas[blob_sha256(getattr(obj, key))] += 1
+    for obj in session.dirty:
+        key = BLOB_REFERENCES.get(type(obj))
+        if key:
+            history = inspect(obj).attrs[key].history
+            if history.has_changes():
+                deltas[blob_sha256(_loaded_value(inspect(obj), key))] -= 1
+                deltas[blob_sha256(getattr(obj, key))] += 1
+    with session.no_autoflush:
+        for obj in session.deleted:
+            key = BLOB_REFERENCES.get(type(obj))
+            if key:
+                deltas[blob_sha256(getattr(obj, key))] -= 1  # Loads an expired value
+    deltas.pop(None, None)
+    deltas = {sha256: delta for sha256, delta in deltas.items() if delta}
+    if deltas:
+        session.info.setdefault("blob_refcount_deltas", []).append(deltas)
+
+def adjust_blob_refcounts(connection, deltas):
+    """
+    Add {sha256: delta} to the blob refcounts. Statements that bypass the Session
+    events (bulk deletes) must call this themselves.
+    """
+    now = datetime.utcnow()
+    for sha256, delta in deltas.items():
+        updated = connection.execute(
+            update(Blob).where(Blob.sha256 == sha256).values(refcount=Blob.refcount + delta, updated_at=now)
+        ).rowcount
+        # A path set without store_blob (e.g. restored from a backup) gets its row here
+        if not updated and delta > 0 and os.path.isfile(blob_path(sha256)):
+            connection.execute(insert(Blob).values(
+                sha256=sha256, size=os.path.getsize(blob_path(sha256)), refcount=delta, created_at=now, updated_at=now
+            ))
+
+@event.listens_for(Session, "after_flush")
+def _apply_blob_references(session, flush_context):
+    for deltas in session.info.pop("blob_refcount_deltas", ()):
+        adjust_blob_refcounts(session.connection(), deltas)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_blob_references(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("blob_refcount_deltas", None)
+
+def collect_blobs(session, grace):
+    """
+    Delete blobs without references that were last touched more than `grace`
+    (a timedelta) ago, rows and files. Returns the number removed.
+    """
+    cutoff = datetime.utcnow() - grace
+    unreferenced = Blob.refcount <= 0, Blob.updated_at < cutoff
+    removed = 0
+    for sha256 in session.execute(select(Blob.sha256).where(*unreferenced)).scalars().all():
+        # Re-checked row by row: an upload may have taken a reference meanwhile. The
+        # file goes before the commit, so a concurrent upload of the same content
+        # waits on the row and writes the file again.
+        if session.execute(delete(Blob).where(Blob.sha256 == sha256, *unreferenced)).rowcount:
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(get_derivative_folder(sha256), ignore_errors=True)  # Resized image copies
+            session.commit()
+            removed += 1
+    session.commit()
+    return removed
+
+def delete_attachments(session, user_id, attachment_ids):
+    """
+    Delete the given attachments of `user_id` in one statement, without loading
+    them as entities. Blob references are released here; legacy files outside the
+    blob store are tombstoned for the reaper. Does not commit. Returns the ids deleted.
+    """
+    rows = session.execute(
+        select(ServiceAttachment.id, ServiceAttachment.attachment_path)
+        .join(Service, Service.id == ServiceAttachment.service_id)
+        .where(ServiceAttachment.id.in_(attachment_ids), Service.user_id == user_id)
+    ).all()
+    if not rows:
+        return []
+    deleted = [row.id for row in rows]
+    session.execute(
+        delete(ServiceAttachment).where(ServiceAttachment.id.in_(deleted)),
+        execution_options={"synchronize_session": False},
+    )
+    connection = session.connection()
+    deltas = Counter()
+    legacy_paths = []
+    for row in rows:
+        sha256 = blob_sha256(row.attachment_path)
+        if sha256:
+            deltas[sha256] -= 1
+        else:
+            legacy_paths.append(row.attachment_path)
+    adjust_blob_refcounts(connection, deltas)
+    tombstone_paths(connection, legacy_paths)
+    return deleted
+
+def release_asset_files(connection, asset_ids):
+    """
+    Release the blobs of the given assets' images and attachments and tombstone
+    their legacy files and upload folders, before a bulk delete removes the rows.
+    """
+    images = connection.execute(
+        select(Asset.image_path).where(Asset.id.in_(asset_ids), Asset.image_path.isnot(None))
+    ).scalars()
+    attachments = connection.execute(
+        select(ServiceAttachment.attachment_path)
+        .join(Service, Service.id == ServiceAttachment.service_id)
+        .where(Service.asset_id.in_(asset_ids), ServiceAttachment.attachment_path.isnot(None))
+    ).scalars()
+    deltas = Counter()
+    legacy_paths = []
+    for path in (*images, *attachments):
+        sha256 = blob_sha256(path)
+        if sha256:
+            deltas[sha256] -= 1
+        else:
+            legacy_paths.append(path)
+    legacy_paths.extend(
+        folder for folder in map(get_asset_upload_folder, asset_ids) if os.path.isdir(folder)
+    )
+    adjust_blob_refcounts(connection, deltas)
+    tombstone_paths(connection, legacy_paths)
+
+def asset_files(session, asset):
+    """
+    Yield (path, arcname) for the stored files of an asset: its image, the attachments
+    of its services and anything left in its legacy upload folder.
+    """
+    if blob_sha256(asset.image_path) and os.path.isfile(asset.image_path):
+        yield asset.image_path, f"image/{os.path.basename(asset.image_path)}"
+    rows = session.execute(
+        select(ServiceAttachment.id, ServiceAttachment.service_id, ServiceAttachment.attachment_path, ServiceAttachment.file_name)
+        .join(Service, Service.id == ServiceAttachment.service_id)
+        .where(Service.asset_id == asset.id)
+        .order_by(ServiceAttachment.id)
+    )
+    for attachment_id, service_id, path, file_name in rows:
+        if blob_sha256(path) and os.path.isfile(path):
+            name = file_name or os.path.basename(path)
+            yield path, f"service_attachments/{service_id}/{attachment_id}_{name}"
+    legacy_folder = get_asset_upload_folder(asset.id)
+    for folder, subfolders, filenames in os.walk(legacy_folder):
+        subfolders.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(folder, filename)
+            yield path, os.path.relpath(path, legacy_folder).replace(os.sep, "/")
+
+def migrate_legacy_files(session, batch_size=500):
+    """
+    Move files uploaded before the blob store into it, repointing their rows, and
+    delete the originals. Returns (files migrated, bytes freed by deduplication).
+    """
+    migrated = freed = 0
+    for model, key in BLOB_REFERENCES.items():
+        column = getattr(model, key)
+        last_id = 0
+        while True:
+            rows = (
+                session.query(model)
+                .filter(model.id > last_id, column.isnot(None), ~column.startswith(BLOB_FOLDER))
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            originals = []
+            for obj in rows:
+                path = getattr(obj, key)
+                if not os.path.isfile(path):
+                    continue
+                with open(path, "rb") as file:
+                    stored = store_blob(session, file)
+                if not stored.new:
+                    freed += stored.size
+                if model is ServiceAttachment:
+                    obj.file_name = obj.file_name or os.path.basename(path)
+                    obj.file_size = stored.size
+                    obj.checksum = stored.sha256
+                    obj.mime_type = obj.mime_type or guess_mimetype(obj.file_name)
+                    obj.uploaded_at = obj.uploaded_at or datetime.utcfromtimestamp(os.path.getmtime(path))
+                setattr(obj, key, stored.path)
+                originals.append(path)
+            last_id = rows[-1].id
+            session.commit()
+            for path in originals:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            migrated += len(originals)
+    return migrated, freed
+
+def backfill_attachment_metadata(session):
+    """
+    Fill size, type, checksum and upload time of blob attachments stored before they
+    were recorded, from the blob table alone. Returns the number of rows updated.
+    """
+    rows = session.execute(
+        select(ServiceAttachment.id, ServiceAttachment.attachment_path, ServiceAttachment.file_name)
+        .where(ServiceAttachment.checksum.is_(None), ServiceAttachment.attachment_path.startswith(BLOB_FOLDER))
+    ).all()
+    shas = {row.id: blob_sha256(row.attachment_path) for row in rows}
+    blobs = {
+        blob.sha256: blob
+        for blob in session.execute(
+            select(Blob.sha256, Blob.size, Blob.created_at).where(Blob.sha256.in_(set(shas.values()) - {None}))
+        )
+    }
+    updated = 0
+    for row in rows:
+        blob = blobs.get(shas[row.id])
+        if blob is None:
+            continue
+        session.execute(
+            update(ServiceAttachment).where(ServiceAttachment.id == row.id).values(
+                file_size=blob.size, checksum=blob.sha256, mime_type=guess_mimetype(row.file_name), uploaded_at=blob.created_at
+            )
+        )
+        updated += 1
+    session.commit()
+    return updated
@@ -0,0 +1,145 @@
+#src/utils/bulk/bulk_utils.py
+import codecs
+import csv
+from datetime import date
+from itertools import islice
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models.asset import Asset
+from utils.search.search_utils import write_asset_documents
+
+# Rows validated and inserted per statement (and per savepoint)
+IMPORT_BATCH_SIZE = 1000
+# Returned by parse_date for values that match none of the accepted formats
+INVALID_DATE = object()
+
+def parse_date(value):
+    """
+    Parse an acquired_date written as %Y-%m-%d, %m/%d/%Y or %d/%m/%Y, tried in that
+    order with strptime's rules: a four-digit year, a one or two digit month and day,
+    no surrounding spaces. Returns INVALID_DATE when nothing matches, an empty value
+    included. Values are split instead of run through strptime format by format, so
+    the common case raises no exceptions.
+    """
+    value = value or ""
+    if "-" in value:
+        year, *month_day = parts = value.split("-")
+        candidates = [month_day]
+    else:
+        *month_day, year = parts = value.split("/")
+        candidates = [month_day, month_day[::-1]]
+    if len(parts) != 3 or len(year) != 4 or not all(
+        part.isascii() and part.isdigit() and len(part) <= 4 for part in parts
+    ) or any(len(part) > 2 for part in month_day):
+        return INVALID_DATE
+    for month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            continue
+    return INVALID_DATE
+
+def parse_dates(values):
+    """
+    Normalize a batch of date strings; see parse_date.
+    """
+    return [parse_date(value) for value in values]
+
+def iter_csv_records(stream):
+    """
+    Yield (line, row) for the rows of an uploaded CSV, decoding the byte stream line
+    by line instead of reading the whole upload into memory. `line` is the 1-based
+    line the row starts on, counting the header and quoted line breaks; rows are
+    dicts like csv.DictReader's and blank lines are skipped.
+    """
+    reader = csv.reader(codecs.iterdecode(stream, "utf-8-sig"))
+    header = next(reader, None)
+    line = reader.line_num + 1
+    for row in reader:
+        if row:
+            yield line, dict(zip(header, row))
+        line = reader.line_num + 1
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _fail(report, line, name, error):
+    report["failed_uploads"].append(f"{name}: {error}")
+    report["errors"].append({"line": line, "name": name, "error": error})
+
+def _succeed(report, rows):
+    report["imported"] += len(rows)
+    report["successful_uploads"].extend(values["name"] for _, values in rows)
+
+def _validate_batch(batch, user_id, report):
+    acquired_dates = parse_dates(record.get("acquired_date") for _, record in batch)
+    rows = []
+    for (line, record), acquired_date in zip(batch, acquired_dates):
+        name = (record.get("name") or "").strip()
+        asset_sn = (record.get("asset_sn") or "").strip()
+        # Checked in the order of the original row-by-row upload
+        if acquired_date is INVALID_DATE:
+            _fail(report, line, name, "Invalid date format")
+            continue
+        if not (name and asset_sn):
+            _fail(report, line, name, "Missing required fields: name or asset_sn")
+            continue
+        rows.append((line, {
+            "name": name,
+            "asset_sn": asset_sn,
+            "description": record.get("description"),
+            "acquired_date": acquired_date,
+            "user_id": user_id,
+            "image_path": None,
+        }))
+    return rows
+
+def _insert_rows(session, rows):
+    # Bulk inserts skip the after_flush search indexing, so the new assets are indexed here
+    values = [values for _, values in rows]
+    statement = insert(Asset)
+    if session.get_bind().dialect.insert_executemany_returning:
+        ids = session.scalars(statement.returning(Asset.id, sort_by_parameter_order=True), values).all()
+    else:  # No RETURNING with executemany (MySQL)
+        connection = session.connection()
+        ids = [connection.execute(insert(Asset.__table__), row).inserted_primary_key[0] for row in values]
+    write_asset_documents(session.connection(), zip(ids, values))
+
+def _insert_batch(session, rows, report):
+    if not rows:
+        return
+    try:
+        with session.begin_nested():
+            _insert_rows(session, rows)
+    except SQLAlchemyError:
+        # Retry the failed batch row by row to report exactly which rows were rejected
+        for line, values in rows:
+            try:
+                with session.begin_nested():
+                    _insert_rows(session, [(line, values)])
+            except SQLAlchemyError as e:
+                _fail(report, line, values["name"], f"Database error: {getattr(e, 'orig', e)}")
+            else:
+                _succeed(report, [(line, values)])
+    else:
+        _succeed(report, rows)
+
+def import_assets(session, user_id, stream, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import assets from a CSV byte stream for a user in a single transaction.
+
+    Rows are validated a batch at a time and each batch is inserted with one
+    executemany statement inside its own savepoint, so a rejected batch is retried
+    row by row without losing the others. Malformed CSV (csv.Error or
+    UnicodeDecodeError) propagates so the caller can roll everything back (on
+    SQLite, engines set up with nest_sqlite_savepoints()).
+    Returns a report with the imported count and a per-row error list giving the
+    CSV line of each rejected row.
+    """
+    report = {"imported": 0, "successful_uploads": [], "failed_uploads": [], "errors": []}
+    for batch in _batches(iter_csv_records(stream), batch_size):
+        _insert_batch(session, _validate_batch(batch, user_id, report), report)
+    session.commit()
+    return report
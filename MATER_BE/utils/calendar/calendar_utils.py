@@ -0,0 +1,181 @@
+#src/utils/calendar/calendar_utils.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from icalendar import Calendar
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models.asset import Asset
+from models.service import Service
+
+MAX_VARIANTS_PER_USER = 8
+
+class RenderedCalendar:
+    """An ICS body with the validators it is served with."""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()
+        # HTTP dates have one second resolution
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.created = time.monotonic()
+
+class CalendarCache:
+    """
+    Rendered iCalendar feeds per user, keyed by variant (plain export or a named
+    subscription). Entries are dropped when the user's services change and
+    otherwise expire after `ttl` seconds, which bounds how long another process
+    can serve a feed it did not invalidate. At most `maxsize` users are kept.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._users = OrderedDict()  # user_id -> {variant: RenderedCalendar}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._users.clear()
+
+    def get(self, user_id, variant, render):
+        """
+        Return the cached feed of a user, calling render() to build it on a miss.
+        """
+        with self._lock:
+            entry = self._users.get(user_id, {}).get(variant)
+            if entry is not None and time.monotonic() - entry.created < self.ttl:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = RenderedCalendar(render())
+        if self.maxsize > 0:
+            with self._lock:
+                variants = self._users.setdefault(user_id, {})
+                if len(variants) >= MAX_VARIANTS_PER_USER:
+                    variants.clear()  # e.g. many subscription names
+                variants[variant] = entry
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.maxsize:
+                    self._users.popitem(last=False)
+        return entry
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._users), "hits": self.hits, "misses": self.misses}
+
+# Shared by every request in the process; sized from CALENDAR_CACHE_* in create_app
+calendar_cache = CalendarCache()
+
+def parse_window(args):
+    """
+    Read the optional FullCalendar `start`/`end` query parameters (ISO dates or
+    datetimes; `end` is exclusive). Returns (start, end) dates, either may be None.
+    Raises ValueError on a malformed value or an empty range.
+    """
+    window = []
+    for name in ("start", "end"):
+        value = args.get(name)
+        if not value:
+            window.append(None)
+            continue
+        try:
+            window.append(date.fromisoformat(value[:10]))  # The time and offset part is not needed for dates
+        except ValueError:
+            raise ValueError(f"Invalid {name} date: {value}")
+    start, end = window
+    if start and end and start >= end:
+        raise ValueError("start must be before end")
+    return start, end
+
+def calendar_events(session, user_id, start=None, end=None, completed=None):
+    """
+    Return the FullCalendar events of a user's dated services in [start, end).
+    `completed` True/False narrows the same range query to completed or
+    incomplete services. Only the columns an event needs are loaded.
+    """
+    query = (
+        session.query(Service.id, Service.service_type, Service.service_date)
+        .filter(Service.user_id == user_id, Service.service_date.isnot(None))
+    )
+    if start:
+        query = query.filter(Service.service_date >= start)
+    if end:
+        query = query.filter(Service.service_date < end)
+    if completed is True:
+        query = query.filter(Service.service_status == "Complete")
+    elif completed is False:
+        query = query.filter(Service.service_status != "Complete")
+    return [
+        {
+            "title": service_type,
+            "start": service_date.isoformat(),
+            "end": service_date.isoformat(),  # Same-day events, as in Service.to_calendar_event
+            "description": service_id,
+        }
+        for service_id, service_type, service_date in query.order_by(Service.service_date, Service.id)
+    ]
+
+def render_calendar(session, user_id, method=None, name=None):
+    """
+    Build the ICS body of every dated service of a user.
+    """
+    services = (
+        session.query(Service)
+        .filter(Service.user_id == user_id, Service.service_date.isnot(None))
+        .order_by(Service.id)
+        .all()
+    )
+    cal = Calendar()  # Create iCalendar object
+    cal.add("prodid", "-//MATER//Services//EN")
+    cal.add("version", "2.0")
+    if method:
+        cal.add("method", method)
+    if name:
+        cal.add("X-WR-CALNAME", name)
+    for service in services:
+        cal.add_component(service.to_icalendar_event())
+    return cal.to_ical()
+
+@event.listens_for(Session, "after_flush")
+def _collect_calendar_changes(session, flush_context):
+    # Remember whose services a transaction touched; the feeds are dropped on commit
+    changed = session.info.setdefault("calendar_users", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Service):
+            changed.add(instance.user_id)
+    for instance in session.deleted:
+        if isinstance(instance, Asset):  # Takes its services with it
+            changed.add(instance.user_id)
+
+def mark_calendars_changed(session, user_ids):
+    """
+    Drop the feeds of `user_ids` when the session commits, for bulk statements
+    that bypass the flush.
+    """
+    session.info.setdefault("calendar_users", set()).update(user_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_calendars(session):
+    for user_id in session.info.pop("calendar_users", ()):
+        calendar_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_calendar_changes(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("calendar_users", None)
@@ -1,8 +1,12 @@
 # src/utils/config/config_utils.py
 import os
+import time
+import threading
+from collections import namedtuple
 from flask import current_app
 import logging
 from logging.handlers import RotatingFileHandler
+from sqlalchemy import select
 from models.appsettings import AppSettings
 
 # Set up logging to both a file and the console
@@ -43,12 +47,115 @@ def get_env_variable(key, default=None):
     """
     return os.getenv(key, default)
 
+# Read-only copy of an AppSettings row held by the settings cache
+CachedSetting = namedtuple("CachedSetting", ["id", "whatfor", "value", "globalsetting", "user_id"])
+
+class SettingsCache:
+    """
+    In-process copy of the appsetting table. The table is loaded once and every
+    lookup, including global/per-user precedence, is answered from memory. Writers
+    call invalidate() after committing; the TTL bounds how long another process
+    can serve a stale copy.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._settings = None
+        self._by_whatfor = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, ttl):
+        self.ttl = ttl
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._settings = None
+            self._by_whatfor = {}
+
+    def _load(self):
+        session = current_app.config["current_db"].session
+        rows = session.execute(
+            select(
+                AppSettings.id, AppSettings.whatfor, AppSettings.value,
+                AppSettings.globalsetting, AppSettings.user_id,
+            ).order_by(AppSettings.id)
+        ).all()
+        settings = [CachedSetting(*row) for row in rows]
+        by_whatfor = {}
+        for setting in settings:
+            by_whatfor.setdefault(setting.whatfor, []).append(setting)
+        return settings, by_whatfor
+
+    def _snapshot(self):
+        with self._lock:
+            if self._settings is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._settings, self._by_whatfor
+            self.misses += 1
+        settings, by_whatfor = self._load()
+        with self._lock:
+            self._settings, self._by_whatfor = settings, by_whatfor
+            self._loaded_at = time.monotonic()
+        return settings, by_whatfor
+
+    def all(self):
+        return self._snapshot()[0]
+
+    def first(self, whatfor):
+        """
+        Return the first setting named `whatfor` (lowest id), or None.
+        """
+        matches = self._snapshot()[1].get(whatfor)
+        return matches[0] if matches else None
+
+    def global_settings(self):
+        return [setting for setting in self.all() if setting.globalsetting]
+
+    def local_settings(self, user_id):
+        return [setting for setting in self.all() if setting.user_id == user_id and not setting.globalsetting]
+
+    def resolve(self, whatfor, user_id):
+        """
+        Return the `whatfor` options a user sees. The 'global_<whatfor>' flag decides:
+        'Yes' means global options only, any other value adds the user's own options
+        to the global ones, and a missing flag means the user's own options only.
+        """
+        by_whatfor = self._snapshot()[1]
+        flag = by_whatfor.get(f"global_{whatfor}")
+        options = by_whatfor.get(whatfor, [])
+        if flag:
+            if flag[0].value == "Yes":
+                return [setting for setting in options if setting.globalsetting]
+            return [setting for setting in options if setting.globalsetting or setting.user_id == user_id]
+        return [setting for setting in options if setting.user_id == user_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "loaded": self._settings is not None,
+                "settings": len(self._settings or []),
+            }
+
+# Shared by every request in the process; TTL comes from SETTINGS_CACHE_TTL in create_app
+settings_cache = SettingsCache()
+
+def get_global_setting(setting_name):
+    """
+    Retrieve the cached setting row named `setting_name`, or None.
+    """
+    return settings_cache.first(setting_name)
+
 def get_app_setting(setting_name):
     """
-    Retrieve a setting from the database based on its name.
+    Retrieve a setting value based on its name.
     """
-    session = current_app.config["current_db"].session
-    setting = session.query(AppSettings).filter_by(whatfor=setting_name).first()
+    setting = settings_cache.first(setting_name)
     return setting.value if setting else None
 
 def update_app_setting(setting_name, value):
@@ -65,6 +172,7 @@ def update_app_setting(setting_name, value):
         session.add(setting)
     
     session.commit()
+    settings_cache.invalidate()
     return setting
 
 def get_jwt_secret_key():
@@ -0,0 +1,112 @@
+#src/utils/dashboard/dashboard_utils.py
+from datetime import timedelta
+from sqlalchemy import and_, case, func, or_
+from models.asset import Asset
+from models.service import Service
+
+DEFAULT_UPCOMING = 5
+MAX_UPCOMING = 50
+
+# Buckets of open services by due date, in display order: (name, days from today
+# lower bound inclusive, upper bound exclusive); None leaves that side open
+DUE_BUCKETS = (
+    ("overdue_90_plus", None, -90),
+    ("overdue_31_90", -90, -30),
+    ("overdue_1_30", -30, 0),
+    ("due_7_days", 0, 8),
+    ("due_8_30_days", 8, 31),
+    ("due_later", 31, None),
+)
+
+def open_service_filter():
+    """
+    Services that still need doing: any status but 'Complete', including none.
+    """
+    return or_(Service.service_status.is_(None), Service.service_status != "Complete")
+
+def counts_by_status(session, user_id):
+    rows = (
+        session.query(Service.service_status, func.count())
+        .filter(Service.user_id == user_id)
+        .group_by(Service.service_status)
+        .all()
+    )
+    return {status or "None": count for status, count in rows}
+
+def counts_by_asset(session, user_id, today):
+    """
+    Service counts per asset: total, open and overdue (open and dated before today).
+    """
+    is_open = open_service_filter()
+    rows = (
+        session.query(
+            Service.asset_id,
+            Asset.name,
+            func.count(),
+            func.sum(case((is_open, 1), else_=0)),
+            func.sum(case((is_open & (Service.service_date < today), 1), else_=0)),
+        )
+        .outerjoin(Asset, Service.asset_id == Asset.id)
+        .filter(Service.user_id == user_id)
+        .group_by(Service.asset_id, Asset.name)
+        .order_by(Service.asset_id)
+        .all()
+    )
+    return [
+        {
+            "asset_id": asset_id,
+            "asset_name": name or "Unknown",
+            "total": total,
+            "open": int(open_count or 0),
+            "overdue": int(overdue or 0),
+        }
+        for asset_id, name, total, open_count, overdue in rows
+    ]
+
+def counts_by_due_bucket(session, user_id, today):
+    """
+    Open services per DUE_BUCKETS entry, plus 'undated', in one GROUP BY.
+    """
+    whens = []
+    for name, low, high in DUE_BUCKETS:
+        conditions = []
+        if low is not None:
+            conditions.append(Service.service_date >= today + timedelta(days=low))
+        if high is not None:
+            conditions.append(Service.service_date < today + timedelta(days=high))
+        whens.append((and_(*conditions), name))
+    bucket = case(*whens, else_="undated").label("bucket")
+
+    rows = (
+        session.query(bucket, func.count())
+        .filter(Service.user_id == user_id, open_service_filter())
+        .group_by(bucket)
+        .all()
+    )
+    counts = dict.fromkeys([name for name, _, _ in DUE_BUCKETS] + ["undated"], 0)
+    counts.update(rows)
+    return counts
+
+def upcoming_services(session, user_id, today, limit=DEFAULT_UPCOMING):
+    """
+    The next `limit` open services due today or later, soonest first.
+    """
+    keys = Service.serialize_fields + ("asset_name",)
+    rows = (
+        session.query(*Service.serialize_columns(), func.coalesce(Asset.name, "Unknown"))
+        .outerjoin(Asset, Service.asset_id == Asset.id)
+        .filter(Service.user_id == user_id, Service.service_date >= today, open_service_filter())
+        .order_by(Service.service_date, Service.id)
+        .limit(limit)
+        .all()
+    )
+    return [dict(zip(keys, row)) for row in rows]
+
+def build_dashboard(session, user_id, today, upcoming=DEFAULT_UPCOMING):
+    return {
+        "today": today,
+        "by_status": counts_by_status(session, user_id),
+        "by_asset": counts_by_asset(session, user_id, today),
+        "by_due": counts_by_due_bucket(session, user_id, today),
+        "upcoming": upcoming_services(session, user_id, today, upcoming),
+    }
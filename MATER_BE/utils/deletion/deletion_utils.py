@@ -0,0 +1,95 @@
+#src/utils/deletion/deletion_utils.py
+import json
+from sqlalchemy import and_, delete, or_, select
+from models.appsettings import AppSettings
+from models.asset import Asset
+from models.cost import Cost
+from models.job import Job
+from models.mfa import MFA
+from models.note import Note
+from models.otp import OTP
+from models.service import Service
+from models.serviceattachment import ServiceAttachment
+from models.costrollup import MonthlyCostRollup
+from models.user import User
+from utils.blob.blob_utils import release_asset_files
+from utils.calendar.calendar_utils import mark_calendars_changed
+from utils.reaper.reaper_utils import tombstone_paths
+from utils.rollup.rollup_utils import release_asset_costs
+from utils.search.search_utils import delete_asset_documents
+
+# Deleting an asset or a user is a fixed number of set-based statements, however many
+# services hang below it: services and attachments go with the asset through their
+# ON DELETE CASCADE foreign keys, and notes and costs (which have no foreign key)
+# through DELETEs on (type, type_id). The Session events never see these rows, so the
+# rollups, blob refcounts, search index and calendar cache are updated here, and the
+# files left behind are tombstoned for the job runner's reaper.
+
+ASSET_BATCH_SIZE = 500
+
+def foreign_keys_enforced(connection):
+    """SQLite only enforces ON DELETE CASCADE with PRAGMA foreign_keys=ON."""
+    if connection.dialect.name != "sqlite":
+        return True
+    return bool(connection.exec_driver_sql("PRAGMA foreign_keys").scalar())
+
+def _execute(session, statement):
+    # Nothing deleted here is loaded, so the identity map is left alone
+    return session.execute(statement, execution_options={"synchronize_session": False})
+
+def delete_assets(session, asset_ids):
+    """
+    Delete the given assets with their services, attachments, notes and costs.
+    Ownership must already be checked. Does not commit. Returns the number of
+    assets deleted.
+    """
+    asset_ids = list(asset_ids)
+    if not asset_ids:
+        return 0
+    connection = session.connection()
+    services = select(Service.id).where(Service.asset_id.in_(asset_ids))
+    service_ids = connection.execute(services).scalars().all()
+    user_ids = connection.execute(select(Asset.user_id).where(Asset.id.in_(asset_ids)).distinct()).scalars().all()
+
+    # Derived state first, while the rows are still there to read
+    release_asset_costs(connection, asset_ids)
+    release_asset_files(connection, asset_ids)
+    delete_asset_documents(connection, asset_ids, service_ids)
+    mark_calendars_changed(session, user_ids)
+
+    for model in (Note, Cost):
+        _execute(session, delete(model).where(or_(
+            and_(model.type == "asset", model.type_id.in_(asset_ids)),
+            and_(model.type == "service", model.type_id.in_(services.scalar_subquery())),
+        )))
+    if not foreign_keys_enforced(connection):
+        _execute(session, delete(ServiceAttachment).where(ServiceAttachment.service_id.in_(services.scalar_subquery())))
+        _execute(session, delete(Service).where(Service.asset_id.in_(asset_ids)))
+    return _execute(session, delete(Asset).where(Asset.id.in_(asset_ids))).rowcount
+
+def delete_user(session, user_id):
+    """
+    Delete a user with everything they own, assets in batches, and their local
+    settings. Does not commit; callers invalidate settings_cache after the commit.
+    Returns False when the user does not exist.
+    """
+    connection = session.connection()
+    if connection.execute(select(User.id).where(User.id == user_id)).first() is None:
+        return False
+    while True:
+        asset_ids = connection.execute(
+            select(Asset.id).where(Asset.user_id == user_id).order_by(Asset.id).limit(ASSET_BATCH_SIZE)
+        ).scalars().all()
+        if not asset_ids:
+            break
+        delete_assets(session, asset_ids)
+
+    jobs = connection.execute(select(Job.artifact_path, Job.params).where(Job.user_id == user_id)).all()
+    tombstone_paths(connection, [
+        path for job in jobs
+        for path in (job.artifact_path, json.loads(job.params or "{}").get("input_path"))
+    ])
+    for model in (Job, MFA, OTP, MonthlyCostRollup, AppSettings):
+        _execute(session, delete(model).where(model.user_id == user_id))
+    _execute(session, delete(User).where(User.id == user_id))
+    return True
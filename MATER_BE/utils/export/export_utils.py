@@ -0,0 +1,41 @@
+#src/utils/export/export_utils.py
+import csv
+import io
+from sqlalchemy import select
+from utils.archive.archive_utils import ZipStream
+
+# Rows fetched per round trip; also the number of rows encoded per CSV chunk
+EXPORT_CHUNK_SIZE = 1000
+
+def iter_table_csv(connection, table, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield a table as UTF-8 CSV byte chunks. Rows are read in batches (a server-side
+    cursor where the driver supports one), so memory use does not grow with the table.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in table.columns])
+
+    result = connection.execute(select(table).execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header of an empty table
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_tables_zip(engine, tables, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Yield a ZIP archive holding one `<table>.csv` per table, built while it is sent.
+    A connection is borrowed from the pool only for the duration of the stream.
+    `progress(done, total)` is called after each table.
+    """
+    archive = ZipStream()
+    with engine.connect() as connection:
+        for done, table in enumerate(tables, start=1):
+            yield from archive.add(f"{table.name}.csv", iter_table_csv(connection, table, chunk_size))
+            if progress:
+                progress(done, len(tables))
+    yield from archive.finish()
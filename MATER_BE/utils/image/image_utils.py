@@ -0,0 +1,209 @@
+#src/utils/image/image_utils.py
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from models.asset import Asset
+from utils.blob.blob_utils import blob_sha256, blob_path
+from utils.storage.storage_utils import get_derivative_folder
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it the original image is served
+    Image = None
+
+# Longest edge in pixels of each derivative; images are never upscaled
+DERIVATIVE_SIZES = {"thumb": 256, "medium": 1024}
+# extension -> (Pillow format, mimetype, save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DERIVATIVE_NAMES = tuple(
+    f"{size}.{extension}" for size in DERIVATIVE_SIZES for extension in DERIVATIVE_FORMATS
+)
+# Larger images are refused before decoding (decompression bombs); see IMAGE_MAX_PIXELS
+DEFAULT_MAX_PIXELS = 100_000_000
+
+def derivative_path(sha256, name):
+    return os.path.join(get_derivative_folder(sha256), name)
+
+def derivative_mimetype(name):
+    return DERIVATIVE_FORMATS[name.rsplit(".", 1)[1]][1]
+
+def has_derivatives(sha256):
+    return all(os.path.isfile(derivative_path(sha256, name)) for name in DERIVATIVE_NAMES)
+
+def image_urls(image_path):
+    """
+    Return {derivative name: URL} for an asset image stored as a blob, or None. The
+    URLs contain the content hash, so clients may cache them forever.
+    """
+    sha256 = blob_sha256(image_path)
+    if not sha256:
+        return None
+    return {name.replace(".", "_"): f"/media/images/{sha256}/{name}" for name in DERIVATIVE_NAMES}
+
+def asset_image_fields(asset_id, image_path):
+    """
+    Return the image fields sent to clients for an asset. The stored path itself is
+    never returned; `image_url` is the authorized route serving the original.
+    """
+    return {
+        "image_url": f"/media/assets/{asset_id}/image" if image_path else None,
+        "image_urls": image_urls(image_path),
+    }
+
+def render_derivatives(source, folder, max_pixels=DEFAULT_MAX_PIXELS):
+    """
+    Write every derivative of the image at `source` into `folder`. Runs in a worker
+    process, so it only touches the filesystem. Returns the names written. Raises
+    ValueError for images over `max_pixels`; Pillow itself refuses those over twice
+    Image.MAX_IMAGE_PIXELS with DecompressionBombError.
+    """
+    written = []
+    with Image.open(source) as image:
+        # Only the header has been read so far
+        if image.width * image.height > max_pixels:
+            raise ValueError(f"{image.width}x{image.height} image is over {max_pixels} pixels")
+        os.makedirs(folder, exist_ok=True)
+        # Let the JPEG decoder scale down while decoding; far cheaper than a full decode
+        largest = max(DERIVATIVE_SIZES.values())
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        for size_name, size in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.LANCZOS)
+            for extension, (image_format, _, options) in DERIVATIVE_FORMATS.items():
+                resized = image
+                if image_format == "JPEG" and has_alpha:
+                    resized = Image.new("RGB", image.size, (255, 255, 255))
+                    resized.paste(image, mask=image.getchannel("A"))
+                name = f"{size_name}.{extension}"
+                # Written under a temporary name so a reader never sees a partial file
+                with tempfile.NamedTemporaryFile(dir=folder, suffix=".tmp", delete=False) as tmp:
+                    try:
+                        resized.save(tmp, image_format, **options)
+                    except BaseException:
+                        tmp.close()
+                        os.remove(tmp.name)
+                        raise
+                os.replace(tmp.name, os.path.join(folder, name))
+                written.append(name)
+    return written
+
+class ImagePipeline:
+    """
+    Renders image derivatives on a pool of worker processes, so decoding and resizing
+    camera-sized images neither blocks a request nor holds the GIL of the web worker.
+    With workers=0 (or without Pillow) submit() renders inline.
+    """
+
+    def __init__(self, workers=0, max_pixels=DEFAULT_MAX_PIXELS):
+        self.workers = workers
+        self.max_pixels = max_pixels
+        self._pool = None
+        self._pending = {}  # sha256 -> future, so an image is rendered once at a time
+        self._lock = threading.Lock()
+
+    def configure(self, workers, max_pixels=DEFAULT_MAX_PIXELS):
+        self.shutdown()
+        self.workers = workers
+        self.max_pixels = max_pixels
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a threaded web worker can deadlock the child
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        return self._pool
+
+    def submit(self, source, sha256, logger=None):
+        """
+        Queue the derivatives of the image blob `sha256` stored at `source`. Returns a
+        future, or None when they already exist or Pillow is not installed.
+        """
+        if Image is None or has_derivatives(sha256):
+            return None
+        folder = get_derivative_folder(sha256)
+        with self._lock:
+            if sha256 in self._pending:
+                return self._pending[sha256]
+            if self.workers <= 0:
+                future = None
+            else:
+                future = self._get_pool().submit(render_derivatives, source, folder, self.max_pixels)
+                self._pending[sha256] = future
+        if future is None:
+            render_derivatives(source, folder, self.max_pixels)
+            return None
+
+        def done(future):
+            with self._lock:
+                self._pending.pop(sha256, None)
+            if future.exception() is not None and logger is not None:
+                logger.error(f"Rendering derivatives of {sha256} failed: {future.exception()}")
+        future.add_done_callback(done)
+        return future
+
+    def ensure(self, source, sha256):
+        """
+        Render the derivatives now if they are missing, waiting for a queued render.
+        Returns False when the image cannot be rendered.
+        """
+        if Image is None:
+            return False
+        try:
+            future = self.submit(source, sha256)
+            if future is not None:
+                future.result()
+        except Exception:
+            return False
+        return has_derivatives(sha256)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._pending.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+# Shared by the process; sized from IMAGE_WORKERS in create_app
+image_pipeline = ImagePipeline()
+
+def backfill_derivatives(session, pipeline=None):
+    """
+    Render the missing derivatives of every asset image in the blob store. Returns
+    (images rendered, images skipped because they are not blobs or failed).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    pipeline = pipeline or image_pipeline
+    rendered = skipped = 0
+    futures = []
+    paths = session.query(Asset.image_path).filter(Asset.image_path.isnot(None)).distinct()
+    for (image_path,) in paths:
+        sha256 = blob_sha256(image_path)
+        if not sha256 or not os.path.isfile(blob_path(sha256)):
+            skipped += 1
+            continue
+        if has_derivatives(sha256):
+            continue
+        try:
+            future = pipeline.submit(blob_path(sha256), sha256)
+        except Exception:
+            skipped += 1
+            continue
+        if future is None:
+            rendered += 1
+        else:
+            futures.append(future)
+    for future in futures:
+        try:
+            future.result()
+            rendered += 1
+        except Exception:
+            skipped += 1
+    return rendered, skipped
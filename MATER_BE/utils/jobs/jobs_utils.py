@@ -0,0 +1,434 @@
+#src/utils/jobs/jobs_utils.py
+import csv
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import MetaData, update
+from ulid import ULID
+from models.asset import Asset
+from models.job import Job
+from utils.archive.archive_utils import iter_directory_zip, iter_files_zip
+from utils.blob.blob_utils import asset_files, collect_blobs, migrate_legacy_files, backfill_attachment_metadata
+from utils.bulk.bulk_utils import import_assets
+from utils.export.export_utils import iter_tables_zip
+from utils.reaper.reaper_utils import reap_files
+from utils.reconcile.reconcile_utils import (
+    reconcile_storage, get_quarantine_folder, take_storage_lease, release_storage_lease,
+)
+from utils.storage.storage_utils import UPLOAD_BASE_FOLDER
+
+# kind -> handler(context); a handler writes its result to context.artifact_path and
+# returns the download file name, or raises JobError with a message for the client
+JOB_HANDLERS = {}
+
+class JobError(Exception):
+    """A job failure whose message is safe to show to the user."""
+
+def job_handler(kind):
+    """
+    Register a function as the handler of a job kind.
+    """
+    def decorator(f):
+        JOB_HANDLERS[kind] = f
+        return f
+    return decorator
+
+def get_job_folder(app=None):
+    """
+    Return the folder holding job inputs and result artifacts.
+    """
+    return os.path.join((app or current_app).instance_path, "jobs")
+
+def new_job_id():
+    return str(ULID())
+
+def job_input_path(job_id):
+    """
+    Return where an uploaded input (e.g. a bulk CSV) is kept until its job runs.
+    """
+    return os.path.join(get_job_folder(), f"{job_id}.input")
+
+def submit_job(user_id, kind, params=None, job_id=None):
+    """
+    Queue a job and wake the local runner. Returns the Job row.
+    """
+    session = current_app.config["current_db"].session
+    job = Job(id=job_id or new_job_id(), user_id=user_id, kind=kind, status="queued", params=json.dumps(params or {}))
+    session.add(job)
+    session.commit()
+    runner = current_app.config.get("job_runner")
+    if runner:
+        runner.wake()
+    return job
+
+def _holds_sqlite_write(session):
+    # True when the session's connection has written: it holds the writer lane or an open transaction
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    connection = session.connection()
+    return bool(connection.info.get("writer_lane") or connection.connection.driver_connection.in_transaction)
+
+def _remove_file(path):
+    try:
+        if path:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class JobContext:
+    """
+    What a handler gets to work with: its parameters, owner, artifact path and a
+    progress reporter.
+    """
+
+    def __init__(self, runner, job, session):
+        self.runner = runner
+        self.session = session  # The handler's session
+        self.id = job.id
+        self.user_id = job.user_id
+        self.params = json.loads(job.params or "{}")
+        self.artifact_path = os.path.join(runner.job_folder, f"{job.id}.result")
+        self._progress = -1
+        self._written_at = 0.0
+
+    def set_progress(self, done, total=100):
+        """
+        Record progress and the heartbeat: whenever the percentage changes, and at
+        least every JOBS_HEARTBEAT_INTERVAL seconds while the handler reports.
+        """
+        percent = min(100, int(done * 100 / total)) if total else 100
+        now = time.monotonic()
+        if percent == self._progress and now - self._written_at < self.runner.heartbeat_interval:
+            return
+        self._progress = percent
+        self._written_at = now
+        self.runner.heartbeat(self, progress=percent)
+
+    def write_artifact(self, chunks):
+        with open(self.artifact_path, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+
+class JobRunner:
+    """
+    Runs queued jobs on a pool of worker threads started with the app and expires
+    old artifacts on a schedule. Jobs live in the database, so no broker is needed;
+    a job is claimed with a conditional UPDATE, so several processes can share the
+    queue safely.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config.get("JOBS_WORKERS", 2)
+        self.poll_interval = app.config.get("JOBS_POLL_INTERVAL", 2)
+        self.artifact_ttl = timedelta(seconds=app.config.get("JOBS_ARTIFACT_TTL", 24 * 3600))
+        self.sweep_interval = app.config.get("JOBS_SWEEP_INTERVAL", 300)
+        self.stale_after = timedelta(seconds=app.config.get("JOBS_STALE_AFTER", 3600))
+        self.heartbeat_interval = app.config.get("JOBS_HEARTBEAT_INTERVAL", 30)
+        self.blob_grace = timedelta(seconds=app.config.get("BLOB_GC_GRACE", 3600))
+        self.reconcile_interval = app.config.get("STORAGE_RECONCILE_INTERVAL", 3600)
+        self._next_reconcile = time.monotonic() + self.reconcile_interval  # Not at startup
+        self._storage_migrated = False  # Files from before the blob store; checked at startup
+        self.job_folder = get_job_folder(app)
+        self._wake = threading.Event()
+        self._sweep_now = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._running = set()  # Jobs executing in this process; never stale here
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        os.makedirs(self.job_folder, exist_ok=True)
+        for n in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True))
+        self._threads.append(threading.Thread(target=self._sweep_loop, name="job-sweeper", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._sweep_now.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def wake_sweeper(self):
+        """
+        Run the sweep now instead of at the next interval, e.g. after files were tombstoned.
+        """
+        self._sweep_now.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                self.app.logger.error(f"Job worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _sweep_loop(self):
+        try:
+            self.migrate_storage()
+        except Exception as e:
+            self.app.logger.error(f"Storage migration error: {e}")
+        while not self._stop.is_set():
+            self._sweep_now.wait(self.sweep_interval)
+            self._sweep_now.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.sweep()
+            except Exception as e:
+                self.app.logger.error(f"Job sweeper error: {e}")
+
+    def update_job(self, job_id, status_was=None, **values):
+        """
+        Update a job on its own connection, so the handler's transaction is never
+        committed early. With `status_was`, only a job still in that status is updated.
+        Returns the number of rows updated.
+        """
+        values.setdefault("updated_at", datetime.utcnow())
+        statement = update(Job).where(Job.id == job_id)
+        if status_was is not None:
+            statement = statement.where(Job.status == status_was)
+        engine = self.app.config["current_db"].engine
+        with engine.begin() as connection:
+            return connection.execute(statement.values(**values)).rowcount
+
+    def heartbeat(self, context, **values):
+        """
+        Record progress of a running job. SQLite has a single writer: while the
+        handler's own transaction has written, a second connection would wait for it
+        until "database is locked", so the values go into that transaction instead
+        and are seen when it commits (this runner's sweep never fails its own jobs).
+        """
+        if _holds_sqlite_write(context.session):
+            values.setdefault("updated_at", datetime.utcnow())
+            context.session.execute(
+                update(Job).where(Job.id == context.id).values(**values),
+                execution_options={"synchronize_session": False},
+            )
+        else:
+            self.update_job(context.id, **values)
+
+    def _claim(self, session):
+        candidate = (
+            session.query(Job.id)
+            .filter(Job.status == "queued")
+            .order_by(Job.created_at)
+            .first()
+        )
+        session.rollback()  # End the read before claiming on another connection
+        if candidate is None:
+            return None
+        now = datetime.utcnow()
+        engine = self.app.config["current_db"].engine
+        with engine.begin() as connection:
+            claimed = connection.execute(
+                update(Job)
+                .where(Job.id == candidate.id, Job.status == "queued")
+                .values(status="running", started_at=now, updated_at=now)
+            ).rowcount
+        # Another worker may have won the race; report a claim attempt either way
+        return candidate.id if claimed else ""
+
+    def run_next(self):
+        """
+        Claim and run one queued job in this thread. Returns False when the queue is empty.
+        """
+        os.makedirs(self.job_folder, exist_ok=True)
+        with self.app.app_context():
+            session = self.app.config["current_db"].session
+            job_id = self._claim(session)
+            if job_id is None:
+                return False
+            if not job_id:
+                return True
+
+            job = session.get(Job, job_id)
+            context = JobContext(self, job, session)
+            handler = JOB_HANDLERS.get(job.kind)
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                if handler is None:
+                    raise JobError(f"Unknown job kind: {job.kind}")
+                artifact_name = handler(context)
+            except Exception as e:
+                session.rollback()
+                _remove_file(context.artifact_path)
+                message = str(e) if isinstance(e, JobError) else "Job failed"
+                self.app.logger.error(f"Job {job_id} ({job.kind}) failed: {e}")
+                self._finish(job_id, "failed", message=message)
+            else:
+                artifact = context.artifact_path if os.path.exists(context.artifact_path) else None
+                self._finish(job_id, "succeeded", artifact_path=artifact, artifact_name=artifact_name)
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
+                _remove_file(context.params.get("input_path"))
+            return True
+
+    def _finish(self, job_id, status, **values):
+        now = datetime.utcnow()
+        values.update(finished_at=now, expires_at=now + self.artifact_ttl)
+        if status == "succeeded":
+            values["progress"] = 100
+        if not self.update_job(job_id, status_was="running", status=status, **values):
+            # Failed by a sweep meanwhile (e.g. in another process); its result is not kept
+            self.app.logger.warning(f"Job {job_id} was no longer running when it finished")
+            _remove_file(values.get("artifact_path"))
+
+    def sweep(self):
+        """
+        Delete expired artifacts, fail running jobs whose heartbeat stopped, remove
+        tombstoned files, collect unreferenced blobs and, when due, reconcile the
+        upload folder with the database. Returns the number of jobs expired.
+        """
+        now = datetime.utcnow()
+        with self.app.app_context():
+            session = self.app.config["current_db"].session
+            expired = (
+                session.query(Job)
+                .filter(Job.expires_at < now, Job.status.in_(("succeeded", "failed")))
+                .all()
+            )
+            for job in expired:
+                _remove_file(job.artifact_path)
+                _remove_file(json.loads(job.params or "{}").get("input_path"))
+                job.status = "expired"
+                job.artifact_path = None
+            with self._running_lock:
+                running_here = list(self._running)
+            session.query(Job).filter(
+                Job.status == "running", Job.updated_at < now - self.stale_after, Job.id.notin_(running_here)
+            ).update(
+                {"status": "failed", "message": "Job stopped responding", "finished_at": now, "expires_at": now},
+                synchronize_session=False,
+            )
+            session.commit()
+            reap_files(session, logger=self.app.logger)
+            collect_blobs(session, self.blob_grace)
+            if not self._storage_migrated:
+                self.migrate_storage()
+            if self.reconcile_interval and time.monotonic() >= self._next_reconcile:
+                self._next_reconcile = time.monotonic() + self.reconcile_interval
+                self.reconcile(session)
+            return len(expired)
+
+    def migrate_storage(self):
+        """
+        Move images and attachments uploaded before the blob store into it, like
+        `flask migrate-blobs`, so upgraded installs get image thumbnails without a
+        manual step. Runs when the runner starts and at each sweep until one pass
+        completes in this process. Returns (files migrated, bytes freed), or None while
+        another process holds the storage lease.
+        """
+        with self.app.app_context():
+            session = self.app.config["current_db"].session
+            if not take_storage_lease(session):
+                return None
+            try:
+                migrated, freed = migrate_legacy_files(session)
+                backfill_attachment_metadata(session)
+            finally:
+                release_storage_lease(session)
+        self._storage_migrated = True
+        if migrated:
+            self.app.logger.info(f"Moved {migrated} files into the blob store; {freed} bytes were duplicates")
+        return migrated, freed
+
+    def reconcile(self, session):
+        config = self.app.config
+        report = reconcile_storage(
+            session,
+            grace=timedelta(seconds=config.get("STORAGE_ORPHAN_GRACE", 3600)),
+            quarantine_folder=get_quarantine_folder(self.app) if config.get("STORAGE_QUARANTINE") else None,
+            full_interval=timedelta(seconds=config.get("STORAGE_RECONCILE_FULL_INTERVAL", 7 * 24 * 3600)),
+            logger=self.app.logger,
+        )
+        if report is not None and (report.orphans or report.dangling):
+            self.app.logger.warning(
+                f"Storage reconcile: {len(report.orphans)} orphaned files "
+                f"({len(report.quarantined)} quarantined), {len(report.dangling)} rows without a file"
+            )
+        return report
+
+def start_job_runner(app):
+    """
+    Start the background job runner for the app unless JOBS_WORKERS is 0.
+    """
+    if not app.config.get("JOBS_WORKERS"):
+        return None
+    runner = JobRunner(app)
+    runner.start()
+    app.config["job_runner"] = runner
+    return runner
+
+@job_handler("export_tables")
+def export_tables_job(context):
+    engine = current_app.config["current_db"].engine
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    tables = [metadata.tables[name] for name in context.params.get("tables", []) if name in metadata.tables]
+    if not tables:
+        raise JobError("No valid tables found")
+    context.write_artifact(iter_tables_zip(engine, tables, progress=context.set_progress))
+    return f"exported_data_{datetime.now().strftime('%d%b%Y')}.zip"
+
+@job_handler("generate_zip")
+def generate_zip_job(context):
+    if not os.path.isdir(UPLOAD_BASE_FOLDER) or not any(os.scandir(UPLOAD_BASE_FOLDER)):
+        raise JobError("No files found.")
+    workers = current_app.config.get("ARCHIVE_READ_WORKERS", 4)
+    context.write_artifact(iter_directory_zip(UPLOAD_BASE_FOLDER, workers=workers, progress=context.set_progress))
+    return f"All_Files_{datetime.now().strftime('%d%b%Y')}.zip"
+
+@job_handler("export_assets")
+def export_assets_job(context):
+    session = current_app.config["current_db"].session
+    asset = session.query(Asset).filter_by(id=context.params.get("asset_id"), user_id=context.user_id).first()
+    if not asset:
+        raise JobError("Asset not found.")
+    files = list(asset_files(session, asset))
+    if not files:
+        raise JobError("No files for this asset.")
+    workers = current_app.config.get("ARCHIVE_READ_WORKERS", 4)
+    context.write_artifact(iter_files_zip(files, workers=workers, progress=context.set_progress))
+    return f"assets_{asset.id}.zip"
+
+class _ProgressReader:
+    # Byte stream wrapper reporting how much of an input file has been consumed
+    def __init__(self, file, context):
+        self.file = file
+        self.context = context
+        self.total = os.fstat(file.fileno()).st_size
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.file:
+            self.read += len(line)
+            self.context.set_progress(self.read, self.total)
+            yield line
+
+@job_handler("upload_assets")
+def upload_assets_job(context):
+    try:
+        with open(context.params["input_path"], "rb") as file:
+            report = import_assets(context.session, context.user_id, _ProgressReader(file, context))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise JobError(f"Invalid CSV file: {e}")
+    context.write_artifact([json.dumps(report).encode("utf-8")])
+    context.runner.update_job(
+        context.id, message=f"Imported {report['imported']} assets, {len(report['errors'])} rows failed"
+    )
+    return "asset_import_report.json"
@@ -1,18 +1,149 @@
 #src/utils/jwt/jwt_utils.py
 import jwt
 import os
-from flask import current_app, request, jsonify
+import time
+import threading
+import bcrypt
+from collections import OrderedDict
+from flask import current_app, request, jsonify, g, has_app_context, has_request_context
 from functools import wraps
 from models.user import User
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified tokens (token -> user ID) and user roles
+    (user ID -> is_admin, or None for a missing user). Entries expire after `ttl`
+    seconds; every token of a user is indexed so it can be dropped at once.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._tokens = OrderedDict()  # token -> (user_id, expires)
+        self._roles = OrderedDict()  # user_id -> (is_admin, expires)
+        self._user_tokens = {}  # user_id -> set of tokens
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+        self.clear()
+
+    def _get(self, entries, key):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _evict(self, entries):
+        while len(entries) > self.maxsize:
+            key, (value, _) = entries.popitem(last=False)
+            if entries is self._tokens:
+                self._user_tokens.get(value, set()).discard(key)
+
+    def get_user_id(self, token):
+        entry = self._get(self._tokens, token)
+        return entry[0] if entry else None
+
+    def put_user_id(self, token, user_id):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._tokens[token] = (user_id, time.monotonic() + self.ttl)
+            self._tokens.move_to_end(token)
+            self._user_tokens.setdefault(user_id, set()).add(token)
+            self._evict(self._tokens)
+
+    def get_role(self, user_id):
+        """Return (is_admin,) for a cached role so a cached missing user is distinguishable."""
+        entry = self._get(self._roles, user_id)
+        return (entry[0],) if entry else None
+
+    def put_role(self, user_id, is_admin):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._roles[user_id] = (is_admin, time.monotonic() + self.ttl)
+            self._roles.move_to_end(user_id)
+            self._evict(self._roles)
+
+    def invalidate_token(self, token):
+        with self._lock:
+            entry = self._tokens.pop(token, None)
+            if entry:
+                self._user_tokens.get(entry[0], set()).discard(token)
+
+    def invalidate_user(self, user_id):
+        """Drop every cached token and the role of a user (password reset, deletion, admin changes)."""
+        with self._lock:
+            for token in self._user_tokens.pop(user_id, set()):
+                self._tokens.pop(token, None)
+            self._roles.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._roles.clear()
+            self._user_tokens.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"tokens": len(self._tokens), "roles": len(self._roles), "hits": self.hits, "misses": self.misses}
+
+# Shared by every request in the process; sized from AUTH_CACHE_SIZE/AUTH_CACHE_TTL in create_app
+token_cache = TokenCache()
+
+def get_secret_key():
+    if has_app_context() and current_app.config.get("CURRENT_SECRET_KEY"):
+        return current_app.config["CURRENT_SECRET_KEY"]
+    return os.getenv("SECRET_KEY")
+
+def normalize_token(token):
+    """
+    Strip an optional 'Bearer ' prefix and surrounding whitespace.
+    """
+    if isinstance(token, bytes):
+        token = token.decode("utf-8")
+    if not token:
+        return None
+    token = token.strip()
+    if token.startswith("Bearer "):
+        token = token[len("Bearer "):].strip()
+    return token or None
+
+def extract_request_token(allow_cookie=True):
+    """
+    Return the token of the current request from, in order: the JSON body 'jwt',
+    form field 'jwt', Authorization header or 'access_token' cookie. Browsers attach
+    the cookie to cross-site requests too, so allow_cookie=False is for requests
+    that must carry the token explicitly.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and data.get("jwt"):
+        return normalize_token(data["jwt"])
+    if request.form.get("jwt"):
+        return normalize_token(request.form["jwt"])
+    if request.headers.get("Authorization"):
+        return normalize_token(request.headers["Authorization"])
+    if not allow_cookie:
+        return None
+    return normalize_token(request.cookies.get("access_token"))
+
 def decode_jwt(token):
     """
     Decode the provided JWT token and return the decoded data along with any error.
     """
     try:
         decoded_data = jwt.decode(
-            token,
-            key=os.getenv("SECRET_KEY"),
+            normalize_token(token),
+            key=get_secret_key(),
             algorithms=["HS256"]
         )
         return decoded_data, None  # No error if decoding is successful
@@ -21,6 +152,69 @@ def decode_jwt(token):
     except jwt.InvalidTokenError:
         return None, "Invalid token"
 
+def verify_token(token):
+    """
+    Return (user_id, None) for a valid token or (None, error). Verified tokens are
+    cached, and the result is kept on flask.g for the rest of the request.
+    """
+    token = normalize_token(token)
+    if not token:
+        return None, "Token is missing"
+
+    in_request = has_request_context()
+    if in_request and g.get("auth_token") == token:
+        return g.auth_user_id, None
+
+    user_id = token_cache.get_user_id(token)
+    if user_id is None:
+        decoded_data, error = decode_jwt(token)
+        if error:
+            return None, error
+        user_id = decoded_data.get("id")
+        if not user_id:
+            return None, "Invalid token"
+        token_cache.put_user_id(token, user_id)
+
+    if in_request:
+        g.auth_token = token
+        g.auth_user_id = user_id
+    return user_id, None
+
+def get_request_user_id(allow_cookie=True):
+    """
+    Return the user ID of the current request, or None when it carries no valid token.
+    """
+    user_id, _ = verify_token(extract_request_token(allow_cookie))
+    return user_id
+
+def get_user_role(user_id):
+    """
+    Return True/False for the user's admin flag, or None when the user does not exist.
+    """
+    cached = token_cache.get_role(user_id)
+    if cached is not None:
+        return cached[0]
+    row = (
+        current_app.config["current_db"].session.query(User.is_admin)
+        .filter_by(id=user_id)
+        .first()
+    )
+    is_admin = bool(row.is_admin) if row else None
+    token_cache.put_role(user_id, is_admin)
+    return is_admin
+
+def invalidate_user_auth(user_id):
+    token_cache.invalidate_user(user_id)
+
+def invalidate_token(token):
+    token = normalize_token(token)
+    if not token:
+        return
+    token_cache.invalidate_token(token)
+    if has_request_context() and g.get("auth_token") == token:
+        g.pop("auth_token")
+        g.pop("auth_user_id")
+
 def generate_jwt(user_id: str) -> str:
     """Generate a JWT for the given user ID."""
     return jwt.encode(
@@ -30,18 +224,13 @@ def generate_jwt(user_id: str) -> str:
     )
 
 def retrieve_username_jwt(user_jwt):
-    try:
-        decoded_data = jwt.decode(
-            user_jwt.encode("utf-8") if isinstance(user_jwt, str) else user_jwt,
-            key=os.getenv("SECRET_KEY"),
-            algorithms=["HS256"]
-        )
-        return decoded_data.get("id")
-    except jwt.ExpiredSignatureError:
-        print("Token has expired")
-    except jwt.InvalidTokenError:
-        print("Invalid token")
-    return None
+    """
+    Extract the user ID from the provided JWT token.
+    """
+    user_id, error = verify_token(user_jwt)
+    if error and has_app_context():
+        current_app.logger.debug(f"Rejected token: {error}")
+    return user_id
 
 def validate_user(json_data: dict) -> str:
     """Validate user credentials and return JWT if valid."""
@@ -69,33 +258,22 @@ def get_user_by_username(username: str) -> User:
     )
 
 def check_admin(data):
-    token = data.get('jwt')
-    current_app.logger.info(f"Checking admin for token: {token}")
+    """
+    Verify that the provided token belongs to an admin user. Only an explicit token
+    ('jwt' field or Authorization header) is accepted, never the cookie.
+    """
+    token = (data or {}).get('jwt') or extract_request_token(allow_cookie=False)
     if not token:
         return jsonify({'error': 'Token is missing'}), 403
 
-    try:
-        decoded_data = jwt.decode(
-            token,
-            current_app.config["CURRENT_SECRET_KEY"],
-            algorithms=["HS256"]
-        )
-        user_id = decoded_data["id"]
-        user = current_app.config["current_db"].session.query(User).filter_by(id=user_id).first()
-        current_app.logger.info(f"User found: {user}")
-        if not user or not user.is_admin:
-            return jsonify({'error': 'Admin privileges required'}), 403
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token has expired'}), 403
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Invalid token'}), 403
+    user_id, error = verify_token(token)
+    if error:
+        return jsonify({'error': error}), 403
 
-    return None
+    if not get_user_role(user_id):
+        return jsonify({'error': 'Admin privileges required'}), 403
 
-def get_global_setting(setting_name):
-    session = current_app.config["current_db"].session
-    setting = session.query(AppSettings).filter_by(whatfor=setting_name).first()
-    return setting
+    return None
 
 def token_required(f):
     """
@@ -103,60 +281,16 @@ def token_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        token = extract_request_token()
 
         if not token:
             return jsonify({'error': 'Token is missing'}), 403
 
-        # Remove 'Bearer' if present and decode the token
-        token = token.replace('Bearer ', '')
-        decoded_data, error = decode_jwt(token)
+        user_id, error = verify_token(token)
 
         if error:
             return jsonify({'error': error}), 403
 
-        return f(decoded_data, *args, **kwargs)
+        return f({"id": user_id}, *args, **kwargs)
 
     return decorated_function
-
-def retrieve_username_jwt(user_jwt):
-    """
-    Extract the user ID from the provided JWT token.
-    """
-    try:
-        decoded_data = jwt.decode(
-            user_jwt.encode("utf-8") if isinstance(user_jwt, str) else user_jwt,
-            key=os.getenv("SECRET_KEY"),
-            algorithms=["HS256"]
-        )
-        return decoded_data.get("id")
-    except jwt.ExpiredSignatureError:
-        print("Token has expired")
-    except jwt.InvalidTokenError:
-        print("Invalid token")
-    return None
-
-def check_admin(data):
-    """
-    Verify that the provided token belongs to an admin user.
-    """
-    token = data.get('jwt')
-    if not token:
-        return jsonify({'error': 'Token is missing'}), 403
-
-    try:
-        decoded_data = jwt.decode(
-            token,
-            current_app.config["CURRENT_SECRET_KEY"],
-            algorithms=["HS256"]
-        )
-        user_id = decoded_data["id"]
-        user = current_app.config["current_db"].session.query(User).filter_by(id=user_id).first()
-        if not user or not user.is_admin:
-            return jsonify({'error': 'Admin privileges required'}), 403
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token has expired'}), 403
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Invalid token'}), 403
-
-    return None
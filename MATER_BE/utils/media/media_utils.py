@@ -0,0 +1,103 @@
+#src/utils/media/media_utils.py
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+from utils.storage.storage_utils import UPLOAD_BASE_FOLDER, is_private_path
+
+# MEDIA_OFFLOAD picks who streams a stored file:
+#   ""            Flask, with Range and conditional request support (werkzeug)
+#   "x-accel"     nginx; the response carries X-Accel-Redirect to MEDIA_ACCEL_PREFIX,
+#                 an `internal` location aliased to the upload folder
+#   "x-sendfile"  Apache mod_xsendfile / lighttpd; X-Sendfile with the absolute path
+# Authorization, the ETag and 304s are always handled here; Range is then served by the proxy.
+
+def hide_private_static_files(app):
+    """
+    Refuse /static/ requests for uploads and derivatives, which live under the static
+    folder but must only be served by the authorized media routes.
+    """
+    @app.before_request
+    def refuse_private_static_file():
+        if request.endpoint != "static":
+            return
+        path = safe_join(app.static_folder, request.view_args.get("filename", ""))
+        if path is None or is_private_path(path):
+            abort(404)
+
+def guess_mimetype(file_name):
+    return mimetypes.guess_type(file_name or "")[0] or "application/octet-stream"
+
+# Leading bytes of the image formats accepted for asset images
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def sniff_image_mimetype(path):
+    """
+    Return the MIME type of an image file from its signature; blob paths have no extension.
+    """
+    with open(path, "rb") as file:
+        head = file.read(16)
+    for signature, mimetype in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+def content_disposition(file_name, as_attachment=False):
+    kind = "attachment" if as_attachment else "inline"
+    if not file_name:
+        return kind
+    fallback = file_name.encode("ascii", "ignore").decode("ascii").replace('"', "") or "download"
+    return f"{kind}; filename=\"{fallback}\"; filename*=UTF-8''{quote(file_name)}"
+
+def accel_redirect_uri(path):
+    """
+    Map a stored file path to the internal nginx URI serving it.
+    """
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(UPLOAD_BASE_FOLDER))
+    if relative.startswith(".."):
+        raise ValueError(f"{path} is outside the upload folder")
+    prefix = current_app.config.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+    return prefix.rstrip("/") + "/" + quote(relative.replace(os.sep, "/"))
+
+def send_media(path, mimetype, file_name=None, as_attachment=False, etag=None):
+    """
+    Respond with a stored file for an already authorized request. `etag` should be
+    the content hash when known, which saves werkzeug from deriving one from stat().
+    """
+    mode = current_app.config.get("MEDIA_OFFLOAD", "")
+    max_age = current_app.config.get("MEDIA_MAX_AGE", 3600)
+    if mode in ("x-accel", "x-sendfile"):
+        response = current_app.response_class(mimetype=mimetype)
+        if mode == "x-accel":
+            response.headers["X-Accel-Redirect"] = accel_redirect_uri(path)
+        else:
+            response.headers["X-Sendfile"] = os.path.abspath(path)
+        response.headers["Content-Disposition"] = content_disposition(file_name, as_attachment)
+        if etag:
+            response.set_etag(etag)
+        response = response.make_conditional(request)
+    else:
+        response = send_file(
+            os.path.abspath(path),
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=file_name,
+            conditional=True,  # Range, If-Range, If-None-Match and If-Modified-Since
+            etag=etag or True,
+        )
+        if not as_attachment:
+            response.headers["Content-Disposition"] = content_disposition(file_name)
+    # Private: the same URL answers differently per user
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.vary.add("Authorization")
+    response.vary.add("Cookie")
+    return response
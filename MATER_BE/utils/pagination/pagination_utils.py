@@ -0,0 +1,80 @@
+#src/utils/pagination/pagination_utils.py
+import base64
+import binascii
+import json
+from sqlalchemy import and_, or_
+
+# Page size used when a client asks for pagination without a limit, and the cap on `limit`
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last row of a page as an opaque, URL-safe cursor.
+    """
+    payload = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor. Raises ValueError if it was tampered with.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def get_page_params(data):
+    """
+    Read `limit` and `cursor` from a request payload.
+    Returns (paginate, limit, cursor); paginate is False when neither was sent so
+    endpoints can keep returning the full list to older clients.
+    Raises ValueError for an invalid limit.
+    """
+    limit = data.get("limit")
+    cursor = data.get("cursor")
+    if limit is None and cursor is None:
+        return False, None, None
+    if limit is None:
+        limit = DEFAULT_PAGE_LIMIT
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return True, limit, cursor
+
+def _after(sort_columns, values):
+    # (a, b) > (x, y) spelled out as a > x OR (a = x AND b > y), which every dialect
+    # can answer from a composite index on the sort columns
+    clauses = []
+    for position, column in enumerate(sort_columns):
+        equal_prefix = [sort_columns[n] == values[n] for n in range(position)]
+        clauses.append(and_(*equal_prefix, column > values[position]))
+    return or_(*clauses)
+
+def keyset_page(query, sort_columns, cursor=None, limit=DEFAULT_PAGE_LIMIT):
+    """
+    Fetch one page of `query` ordered by `sort_columns` (non-null columns whose
+    combination is unique, ending with the primary key) starting after `cursor`.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = query.order_by(*sort_columns)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(sort_columns):
+            raise ValueError("Invalid cursor")
+        query = query.filter(_after(sort_columns, values))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key) for column in sort_columns)
+    return rows, next_cursor
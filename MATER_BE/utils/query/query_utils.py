@@ -0,0 +1,103 @@
+#src/utils/query/query_utils.py
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import joinedload, selectinload
+from models.asset import Asset
+from models.service import Service
+
+# Shared list queries. Related rows are loaded eagerly so serializing them costs a
+# fixed number of statements: many-to-one relationships are joined into the main
+# SELECT, one-to-many collections are fetched with a single extra IN query.
+
+def user_assets(session, user_id):
+    """
+    Query the assets owned by a user.
+    """
+    return session.query(Asset).filter(Asset.user_id == user_id)
+
+def user_services(session, user_id, asset_id=None):
+    """
+    Query the services of a user, optionally for a single asset, with the asset of
+    each service joined into the same statement.
+    """
+    query = (
+        session.query(Service)
+        .options(joinedload(Service.asset))
+        .filter(Service.user_id == user_id)
+    )
+    if asset_id:
+        query = query.filter(Service.asset_id == asset_id)
+    return query
+
+def user_service_with_attachments(session, user_id, service_id):
+    """
+    Query one service of a user together with its asset and its attachments.
+    """
+    return (
+        user_services(session, user_id)
+        .options(selectinload(Service.serviceattachments))
+        .filter(Service.id == service_id)
+    )
+
+# List endpoints select only the serialized columns and skip entity construction
+SERVICE_ROW_FIELDS = Service.serialize_fields + ("asset_name",)
+
+def user_asset_rows(session, user_id):
+    """
+    Query the serialized columns of a user's assets as row tuples.
+    """
+    return session.query(*Asset.serialize_columns()).filter(Asset.user_id == user_id)
+
+def user_service_rows(session, user_id, asset_id=None):
+    """
+    Query the serialized columns of a user's services as row tuples, ending with
+    the asset name (SERVICE_ROW_FIELDS) from an outer join in the same statement.
+    """
+    query = (
+        session.query(*Service.serialize_columns(), func.coalesce(Asset.name, "Unknown").label("asset_name"))
+        .outerjoin(Asset, Service.asset_id == Asset.id)
+        .filter(Service.user_id == user_id)
+    )
+    if asset_id:
+        query = query.filter(Service.asset_id == asset_id)
+    return query
+
+def upsert_add(connection, model, keys, values, increments):
+    """
+    Add `increments` to the counters of the row identified by `keys` and set `values`,
+    inserting the row with the increments as its counters if it does not exist. One
+    atomic statement on SQLite, PostgreSQL and MySQL.
+    """
+    table = model.__table__
+    row = {**keys, **values, **increments}
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table).values(**row)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                **{name: statement.excluded[name] for name in values},
+                **{name: table.c[name] + statement.excluded[name] for name in increments},
+            },
+        )
+        connection.execute(statement)
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table).values(**row)
+        statement = statement.on_duplicate_key_update(
+            **{name: statement.inserted[name] for name in values},
+            **{name: table.c[name] + statement.inserted[name] for name in increments},
+        )
+        connection.execute(statement)
+    else:
+        where = [table.c[name] == value for name, value in keys.items()]
+        updated = connection.execute(
+            update(table).where(*where).values(
+                **values, **{name: table.c[name] + value for name, value in increments.items()}
+            )
+        ).rowcount
+        if not updated:
+            connection.execute(insert(table).values(**row))
@@ -0,0 +1,64 @@
+#src/utils/reaper/reaper_utils.py
+import os
+import shutil
+from datetime import datetime
+from sqlalchemy import select, insert, delete
+from models.filetombstone import FileTombstone
+
+# Deleting rows must not wait on the upload volume: the paths they leave behind are
+# recorded as tombstones in the same transaction, and the job runner's sweep
+# unlinks them afterwards. A tombstone is only dropped once its path is gone.
+
+def tombstone_paths(connection, paths):
+    """
+    Record files or folders to remove once the current transaction commits.
+    """
+    now = datetime.utcnow()
+    rows = [{"path": path, "created_at": now} for path in dict.fromkeys(paths) if path]
+    if rows:
+        connection.execute(insert(FileTombstone), rows)
+    return len(rows)
+
+def _remove_path(path):
+    # True once nothing is left at `path`
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    return not os.path.lexists(path)
+
+def reap_files(session, batch_size=500, logger=None):
+    """
+    Remove the paths of every tombstone from disk and delete the tombstones. Paths
+    that cannot be removed keep their tombstone for the next run. Returns the
+    number of tombstones reaped.
+    """
+    reaped = 0
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(FileTombstone.id, FileTombstone.path)
+            .where(FileTombstone.id > last_id)
+            .order_by(FileTombstone.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        session.rollback()  # No transaction is held while the disk is busy
+        done = []
+        for tombstone_id, path in rows:
+            try:
+                if _remove_path(path):
+                    done.append(tombstone_id)
+            except OSError as e:
+                if logger is not None:
+                    logger.error(f"Could not remove {path}: {e}")
+        if done:
+            session.execute(delete(FileTombstone).where(FileTombstone.id.in_(done)))
+            session.commit()
+        reaped += len(done)
+        last_id = rows[-1].id
+    return reaped
@@ -0,0 +1,346 @@
+#src/utils/reconcile/reconcile_utils.py
+import os
+import shutil
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, exists
+from sqlalchemy.exc import IntegrityError
+from models.asset import Asset
+from models.blob import Blob
+from models.serviceattachment import ServiceAttachment
+from models.storagemanifest import StorageManifest, StorageCheckpoint
+from utils.blob.blob_utils import blob_path, blob_sha256
+from utils.query.query_utils import upsert_add
+from utils.storage.storage_utils import UPLOAD_BASE_FOLDER
+
+# Compares the upload folder with the rows pointing into it without walking every file:
+# the storage_manifest table remembers each folder's mtime, and only folders whose
+# mtime moved are listed again (adding, removing or renaming an entry changes it).
+# New and changed files are checked against the blob table and the path columns;
+# files gone since the last run, and blobs (de)referenced since the last checkpoint,
+# are checked for rows left pointing at nothing. A full pass lists every folder and
+# checks every row; it runs the first time and then every `full_interval`.
+
+BATCH_SIZE = 500
+# A folder changed this close to the scan may change again within the same mtime tick
+RACY_SECONDS = 2
+# Blob changes are read again with this overlap, for transactions that committed late
+CHECKPOINT_OVERLAP = timedelta(minutes=5)
+# How long a run may hold the lease before another process may take over
+LEASE_SECONDS = 3600
+
+PENDING = "pending"  # Not yet checked, or unreferenced but younger than the grace period
+ORPHAN = "orphan"
+
+def get_quarantine_folder(app):
+    """
+    Return where orphaned uploads are moved when quarantining.
+    """
+    return os.path.join(app.instance_path, "quarantine")
+
+class ReconcileReport:
+    """What one run looked at and found."""
+
+    def __init__(self, full):
+        self.full = full
+        self.scanned_dirs = 0  # Folders stat()ed
+        self.listed_dirs = 0  # Folders whose entries were read
+        self.added = 0
+        self.removed = 0
+        self.orphans = []  # Paths found unreferenced in this run
+        self.quarantined = []
+        self.dangling = []  # {"kind", "id", "path"} of rows whose file is missing
+
+    def to_dict(self):
+        return dict(vars(self))
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_checkpoint(session, name):
+    return session.execute(select(StorageCheckpoint.value).where(StorageCheckpoint.name == name)).scalar()
+
+def set_checkpoint(session, name, value):
+    upsert_add(session.connection(), StorageCheckpoint, {"name": name}, {"value": value}, {})
+
+def take_storage_lease(session):
+    # Several processes run the sweep; a conditional UPDATE lets one of them reconcile
+    # or migrate the storage at a time
+    now = datetime.utcnow()
+    until = (now + timedelta(seconds=LEASE_SECONDS)).isoformat()
+    connection = session.connection()
+    taken = connection.execute(
+        update(StorageCheckpoint)
+        .where(StorageCheckpoint.name == "lease", StorageCheckpoint.value < now.isoformat())
+        .values(value=until)
+    ).rowcount
+    if not taken:
+        if get_checkpoint(session, "lease") is not None:
+            session.rollback()
+            return False
+        try:
+            connection.execute(insert(StorageCheckpoint).values(name="lease", value=until))
+        except IntegrityError:
+            session.rollback()
+            return False
+    session.commit()
+    return True
+
+def release_storage_lease(session):
+    session.rollback()
+    session.execute(update(StorageCheckpoint).where(StorageCheckpoint.name == "lease").values(value=""))
+    session.commit()
+
+class _Scan:
+    # One pass over the folder tree, writing the manifest as it goes
+    def __init__(self, session, root, full, report, started):
+        self.session = session
+        self.root = root
+        self.full = full
+        self.report = report
+        self.racy_after = time.time() - RACY_SECONDS
+        self.started = started
+        self.removed = []
+        self.writes = 0
+
+    def _write(self, statement, rows=None):
+        result = self.session.execute(statement, rows) if rows is not None else self.session.execute(statement)
+        self.writes += len(rows) if rows else 1
+        if self.writes >= BATCH_SIZE:
+            self.session.commit()  # Keeps the write lock short on SQLite
+            self.writes = 0
+        return result
+
+    def _drop_subtree(self, folder):
+        # Manifest rows below a folder that disappeared
+        below = StorageManifest.path.startswith(folder + os.sep, autoescape=True)
+        self.removed.extend(self.session.execute(
+            select(StorageManifest.path).where(below, StorageManifest.is_dir.is_(False))
+        ).scalars())
+        self._write(delete(StorageManifest).where(below | (StorageManifest.path == folder)))
+
+    def _list(self, folder, parent, mtime, known_subdirs):
+        files, subdirs = {}, []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.path] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+        self.report.listed_dirs += 1
+
+        old = {
+            row.path: (row.size, row.mtime)
+            for row in self.session.execute(
+                select(StorageManifest.path, StorageManifest.size, StorageManifest.mtime)
+                .where(StorageManifest.parent == folder, StorageManifest.is_dir.is_(False))
+            )
+        }
+        gone = [path for path in old if path not in files]
+        new = [path for path in files if path not in old]
+        # A full pass checks every file again, changed or not
+        changed = [path for path in files if path in old and (self.full or old[path] != files[path])]
+        for chunk in _chunks(gone):
+            self._write(delete(StorageManifest).where(StorageManifest.path.in_(chunk)))
+        if new:
+            self._write(insert(StorageManifest), [
+                {"path": path, "parent": folder, "is_dir": False, "size": files[path][0], "mtime": files[path][1],
+                 "status": PENDING, "checked_at": self.started}
+                for path in new
+            ])
+        for path in changed:
+            self._write(update(StorageManifest).where(StorageManifest.path == path).values(
+                size=files[path][0], mtime=files[path][1], status=PENDING
+            ))
+        for subdir in set(known_subdirs) - set(subdirs):
+            self._drop_subtree(subdir)
+
+        # A folder modified within the racy window is listed again next time
+        upsert_add(self.session.connection(), StorageManifest, {"path": folder}, {
+            "parent": parent,
+            "is_dir": True,
+            "mtime": None if mtime is None or mtime >= self.racy_after else mtime,
+            "checked_at": self.started,
+        }, {})
+        self.removed.extend(gone)
+        self.report.added += len(new)
+        self.report.removed += len(gone)
+        return subdirs
+
+    def run(self):
+        known, children = {}, defaultdict(list)
+        for path, parent, mtime in self.session.execute(
+            select(StorageManifest.path, StorageManifest.parent, StorageManifest.mtime).where(StorageManifest.is_dir)
+        ):
+            known[path] = mtime
+            if parent is not None:
+                children[parent].append(path)
+
+        stack = [(self.root, None)]
+        while stack:
+            folder, parent = stack.pop()
+            try:
+                mtime = os.stat(folder).st_mtime
+            except FileNotFoundError:
+                if folder != self.root:
+                    self._drop_subtree(folder)  # Went away since its parent was listed
+                    continue
+                mtime = None
+            self.report.scanned_dirs += 1
+            if not self.full and folder in known and known[folder] is not None and known[folder] == mtime:
+                stack.extend((child, folder) for child in children[folder])  # Same entries; only descend
+                continue
+            stack.extend((child, folder) for child in self._list(folder, parent, mtime, children[folder]))
+        self.session.commit()
+        return self.removed
+
+def _referenced(session, paths):
+    """Return the paths a blob row, asset image or attachment refers to."""
+    blobs = {blob_sha256(path): path for path in paths if blob_sha256(path)}
+    legacy = [path for path in paths if not blob_sha256(path)]
+    referenced = set()
+    for chunk in _chunks(blobs):
+        referenced.update(blobs[sha256] for sha256 in session.execute(
+            select(Blob.sha256).where(Blob.sha256.in_(chunk))
+        ).scalars())
+    for chunk in _chunks(legacy):
+        for column in (Asset.image_path, ServiceAttachment.attachment_path):
+            referenced.update(session.execute(select(column).where(column.in_(chunk))).scalars())
+    return referenced
+
+def _quarantine(path, root, quarantine_folder):
+    target = os.path.join(quarantine_folder, os.path.relpath(path, root))
+    if os.path.lexists(target):
+        target = f"{target}.{int(time.time())}"
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)  # The quarantine may be on another filesystem
+
+def _classify(session, report, grace, quarantine_folder, logger):
+    cutoff = time.time() - grace.total_seconds()
+    rows = session.execute(
+        select(StorageManifest.path, StorageManifest.mtime, StorageManifest.status)
+        .where(StorageManifest.status.isnot(None), StorageManifest.is_dir.is_(False))
+    ).all()
+    referenced = _referenced(session, [row.path for row in rows])
+    statuses = defaultdict(list)
+    forgotten = []  # Moved to the quarantine, or already gone
+    for row in rows:
+        if row.path in referenced:
+            statuses[None].append(row.path)
+        elif row.mtime is not None and row.mtime > cutoff:
+            statuses[PENDING].append(row.path)  # Maybe an upload whose row is not committed yet
+        else:
+            if row.status != ORPHAN:
+                report.orphans.append(row.path)
+            if quarantine_folder is None:
+                statuses[ORPHAN].append(row.path)
+                continue
+            try:
+                _quarantine(row.path, UPLOAD_BASE_FOLDER, quarantine_folder)
+                report.quarantined.append(row.path)
+                forgotten.append(row.path)
+            except FileNotFoundError:
+                forgotten.append(row.path)
+            except OSError as e:
+                statuses[ORPHAN].append(row.path)
+                if logger is not None:
+                    logger.error(f"Could not quarantine {row.path}: {e}")
+    now = datetime.utcnow()
+    for status, paths in statuses.items():
+        for chunk in _chunks(paths):
+            session.execute(
+                update(StorageManifest).where(StorageManifest.path.in_(chunk)).values(status=status, checked_at=now)
+            )
+    for chunk in _chunks(forgotten):
+        session.execute(delete(StorageManifest).where(StorageManifest.path.in_(chunk)))
+    session.commit()
+
+def _rows_pointing_at(session, paths):
+    found = []
+    for chunk in _chunks(paths):
+        for kind, model, column in (
+            ("asset", Asset, Asset.image_path),
+            ("attachment", ServiceAttachment, ServiceAttachment.attachment_path),
+        ):
+            found.extend(
+                {"kind": kind, "id": row_id, "path": path}
+                for row_id, path in session.execute(select(model.id, column).where(column.in_(chunk)))
+            )
+    return found
+
+def _find_dangling(session, removed, full, since):
+    """Rows (and blob rows) whose file is gone."""
+    missing = set(removed)
+    # Blobs taken or released since the last run: their file must exist while referenced
+    blobs = select(Blob.sha256).where(Blob.refcount > 0).order_by(Blob.sha256)
+    if not full:
+        blobs = blobs.where(Blob.updated_at > since)
+    last = ""
+    while True:
+        chunk = session.execute(blobs.where(Blob.sha256 > last).limit(BATCH_SIZE)).scalars().all()
+        if not chunk:
+            break
+        missing.update(blob_path(sha256) for sha256 in chunk if not os.path.isfile(blob_path(sha256)))
+        last = chunk[-1]
+
+    dangling = [
+        {"kind": "blob", "id": blob_sha256(path), "path": path}
+        for path in sorted(missing)
+        if blob_sha256(path) and session.execute(
+            select(Blob.refcount).where(Blob.sha256 == blob_sha256(path), Blob.refcount > 0)
+        ).first()
+    ]
+    dangling.extend(_rows_pointing_at(session, sorted(missing)))
+    if full:
+        # Every path column against the freshly listed manifest, as one anti-join each
+        for kind, model, column in (
+            ("asset", Asset, Asset.image_path),
+            ("attachment", ServiceAttachment, ServiceAttachment.attachment_path),
+        ):
+            listed = exists().where(StorageManifest.path == column)
+            dangling.extend(
+                {"kind": kind, "id": row_id, "path": path}
+                for row_id, path in session.execute(
+                    select(model.id, column).where(column.isnot(None), ~listed).order_by(model.id)
+                )
+            )
+    unique = {(entry["kind"], entry["id"]): entry for entry in dangling}
+    return list(unique.values())
+
+def reconcile_storage(session, grace=timedelta(hours=1), quarantine_folder=None, full=False,
+                      full_interval=timedelta(days=7), logger=None):
+    """
+    Bring the storage manifest up to date and report orphaned files (referenced by
+    no row, older than `grace`) and rows whose file is missing. With a
+    `quarantine_folder`, orphans are moved there instead of only being reported;
+    rows are never changed. Returns a ReconcileReport, or None when another
+    process is reconciling.
+    """
+    if not take_storage_lease(session):
+        return None
+    try:
+        started = datetime.utcnow()
+        last_full = get_checkpoint(session, "full_at")
+        since = get_checkpoint(session, "blobs_checked_at")
+        full = full or not last_full or not since or datetime.fromisoformat(last_full) < started - full_interval
+        report = ReconcileReport(full)
+
+        removed = _Scan(session, UPLOAD_BASE_FOLDER, full, report, started).run()
+        _classify(session, report, grace, quarantine_folder, logger)
+        since = None if full else datetime.fromisoformat(since) - CHECKPOINT_OVERLAP
+        report.dangling = _find_dangling(session, removed, full, since)
+
+        set_checkpoint(session, "blobs_checked_at", started.isoformat())
+        if full:
+            set_checkpoint(session, "full_at", started.isoformat())
+        session.commit()
+        return report
+    finally:
+        release_storage_lease(session)
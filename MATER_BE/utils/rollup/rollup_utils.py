@@ -0,0 +1,225 @@
+#src/utils/rollup/rollup_utils.py
+from collections import defaultdict
+from sqlalchemy import event, func, inspect, select, delete, insert
+from sqlalchemy.orm import Session
+from models.asset import Asset
+from models.cost import Cost
+from models.service import Service
+from models.costrollup import AssetCostRollup, MonthlyCostRollup
+from utils.query.query_utils import upsert_add
+
+# Incremental maintenance: before each flush the Cost, Service and Asset changes in
+# the session are turned into (total, count) deltas per asset and per user-month,
+# read against the database as it was before the flush. After the flush the deltas
+# are applied with atomic upserts on the flush's own connection, so they commit or
+# roll back together with the change.
+
+UNDATED = "undated"
+
+def month_of(cost_date):
+    return cost_date.strftime("%Y-%m") if cost_date else UNDATED
+
+def _value(state, key):
+    # Value as last loaded from the database (before any pending change)
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if history.added:  # Nothing was loaded before the change
+        return None
+    return getattr(state.obj(), key)
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    # Registered only for active_history, so the value a change replaces is loaded
+    # even when the attribute had been expired by a commit
+    pass
+
+for _attribute in (Cost.type, Cost.type_id, Cost.cost_date, Cost.cost_data, Service.asset_id):
+    event.listen(_attribute, "set", _load_previous_value, active_history=True)
+
+class _Deltas:
+    def __init__(self, session):
+        self.session = session
+        self.assets = defaultdict(lambda: [0.0, 0])  # (asset_id, user_id) -> [total, count]
+        self.months = defaultdict(lambda: [0.0, 0])  # (user_id, month) -> [total, count]
+        self.deleted_assets = set()
+        self._owners = {}
+
+    def owner(self, cost_type, type_id):
+        """(user_id, asset_id) of the asset or service a cost belongs to, or None."""
+        key = (cost_type, type_id)
+        if key not in self._owners:
+            if cost_type == "asset":
+                query = select(Asset.user_id, Asset.id).where(Asset.id == type_id)
+            elif cost_type == "service":
+                query = select(Service.user_id, Service.asset_id).where(Service.id == type_id)
+            else:
+                query = None
+            self._owners[key] = self.session.execute(query).first() if query is not None else None
+        return self._owners[key]
+
+    def add(self, owner, cost_date, amount, count):
+        if owner is None:
+            return
+        user_id, asset_id = owner
+        for bucket, key in ((self.assets, (asset_id, user_id)), (self.months, (user_id, month_of(cost_date)))):
+            bucket[key][0] += amount
+            bucket[key][1] += count
+
+    def add_cost(self, cost_type, type_id, cost_date, cost_data, sign):
+        self.add(self.owner(cost_type, type_id), cost_date, sign * (cost_data or 0.0), sign)
+
+    def add_grouped(self, owner, rows, sign):
+        # rows of (cost_date, total, count) from the database
+        for cost_date, total, count in rows:
+            self.add(owner, cost_date, sign * (total or 0.0), sign * count)
+
+    def __bool__(self):
+        return bool(self.assets or self.months or self.deleted_assets)
+
+def _grouped_costs(session, cost_type, type_id, skip_ids):
+    query = (
+        select(Cost.cost_date, func.sum(Cost.cost_data), func.count())
+        .where(Cost.type == cost_type, Cost.type_id == type_id)
+        .group_by(Cost.cost_date)
+    )
+    if skip_ids:
+        query = query.where(Cost.id.notin_(skip_ids))
+    return session.execute(query).all()
+
+@event.listens_for(Session, "before_flush")
+def _collect_cost_deltas(session, flush_context, instances):
+    changed = [obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, (Cost, Service, Asset))]
+    if not changed:
+        return
+
+    deltas = _Deltas(session)
+    # Costs handled one by one below are left out of the per-service/asset sums
+    handled = {obj.id for obj in changed if isinstance(obj, Cost) and obj.id is not None}
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Cost):
+                deltas.add_cost(obj.type, obj.type_id, obj.cost_date, obj.cost_data, 1)
+
+        for obj in session.dirty:
+            state = inspect(obj)
+            if isinstance(obj, Cost):
+                keys = ("type", "type_id", "cost_date", "cost_data")
+                if any(state.attrs[key].history.has_changes() for key in keys):
+                    deltas.add_cost(*(_value(state, key) for key in keys), -1)
+                    deltas.add_cost(obj.type, obj.type_id, obj.cost_date, obj.cost_data, 1)
+            elif isinstance(obj, Service) and state.attrs.asset_id.history.has_changes():
+                # The service's costs move to its new asset; months are unaffected
+                rows = _grouped_costs(session, "service", obj.id, handled)
+                old_owner = deltas.owner("service", obj.id)
+                if old_owner is not None:
+                    total = sum(row[1] or 0.0 for row in rows)
+                    count = sum(row[2] for row in rows)
+                    deltas.assets[(old_owner[1], old_owner[0])][0] -= total
+                    deltas.assets[(old_owner[1], old_owner[0])][1] -= count
+                    deltas.assets[(obj.asset_id, old_owner[0])][0] += total
+                    deltas.assets[(obj.asset_id, old_owner[0])][1] += count
+
+        for obj in session.deleted:
+            state = inspect(obj)
+            if isinstance(obj, Cost):
+                deltas.add_cost(*(_value(state, key) for key in ("type", "type_id", "cost_date", "cost_data")), -1)
+            elif isinstance(obj, Service):
+                # Costs left behind by a deleted service no longer count
+                owner = deltas.owner("service", obj.id)
+                deltas.add_grouped(owner, _grouped_costs(session, "service", obj.id, handled), -1)
+            elif isinstance(obj, Asset):
+                owner = deltas.owner("asset", obj.id)
+                deltas.add_grouped(owner, _grouped_costs(session, "asset", obj.id, handled), -1)
+                deltas.deleted_assets.add(obj.id)
+
+    if deltas:
+        session.info.setdefault("cost_rollup_deltas", []).append(deltas)
+
+@event.listens_for(Session, "after_flush")
+def _apply_cost_deltas(session, flush_context):
+    for deltas in session.info.pop("cost_rollup_deltas", ()):
+        connection = session.connection()
+        for (asset_id, user_id), (total, count) in deltas.assets.items():
+            if asset_id not in deltas.deleted_assets and (total or count):
+                upsert_rollup(connection, AssetCostRollup, {"asset_id": asset_id}, {"user_id": user_id}, total, count)
+        for (user_id, month), (total, count) in deltas.months.items():
+            if total or count:
+                upsert_rollup(connection, MonthlyCostRollup, {"user_id": user_id, "month": month}, {}, total, count)
+        if deltas.deleted_assets:
+            connection.execute(delete(AssetCostRollup).where(AssetCostRollup.asset_id.in_(deltas.deleted_assets)))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_cost_deltas(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("cost_rollup_deltas", None)
+
+def upsert_rollup(connection, model, keys, extra, total, count):
+    """
+    Add (total, count) to the rollup row identified by `keys`, creating it if needed.
+    """
+    upsert_add(connection, model, keys, extra, {"total": total, "cost_count": count})
+
+def release_asset_costs(connection, asset_ids):
+    """
+    Take the costs of the given assets and of their services out of the rollups,
+    before a bulk delete removes them without going through the Session events.
+    """
+    months = defaultdict(lambda: [0.0, 0])
+    owners = (
+        (Asset.user_id, (Cost.type == "asset") & (Cost.type_id == Asset.id), Asset, Asset.id),
+        (Service.user_id, (Cost.type == "service") & (Cost.type_id == Service.id), Service, Service.asset_id),
+    )
+    for user_column, onclause, model, asset_column in owners:
+        rows = connection.execute(
+            select(user_column, Cost.cost_date, func.sum(Cost.cost_data), func.count())
+            .select_from(Cost)
+            .join(model, onclause)
+            .where(asset_column.in_(asset_ids))
+            .group_by(user_column, Cost.cost_date)
+        )
+        for user_id, cost_date, total, count in rows:
+            months[(user_id, month_of(cost_date))][0] += total or 0.0
+            months[(user_id, month_of(cost_date))][1] += count
+    for (user_id, month), (total, count) in months.items():
+        upsert_rollup(connection, MonthlyCostRollup, {"user_id": user_id, "month": month}, {}, -total, -count)
+    connection.execute(delete(AssetCostRollup).where(AssetCostRollup.asset_id.in_(asset_ids)))
+
+def rebuild_cost_rollups(session):
+    """
+    Recompute every rollup from the cost table in one transaction. Returns the
+    number of (asset rows, month rows) written.
+    """
+    assets = defaultdict(lambda: [0.0, 0])
+    months = defaultdict(lambda: [0.0, 0])
+    owners = (
+        (Asset.user_id, Asset.id, (Cost.type == "asset") & (Cost.type_id == Asset.id), Asset),
+        (Service.user_id, Service.asset_id, (Cost.type == "service") & (Cost.type_id == Service.id), Service),
+    )
+    for user_column, asset_column, onclause, model in owners:
+        rows = session.execute(
+            select(user_column, asset_column, Cost.cost_date, func.sum(Cost.cost_data), func.count())
+            .select_from(Cost)
+            .join(model, onclause)
+            .group_by(user_column, asset_column, Cost.cost_date)
+        )
+        for user_id, asset_id, cost_date, total, count in rows:
+            for bucket, key in ((assets, (asset_id, user_id)), (months, (user_id, month_of(cost_date)))):
+                bucket[key][0] += total or 0.0
+                bucket[key][1] += count
+
+    session.execute(delete(AssetCostRollup))
+    session.execute(delete(MonthlyCostRollup))
+    if assets:
+        session.execute(insert(AssetCostRollup), [
+            {"asset_id": asset_id, "user_id": user_id, "total": total, "cost_count": count}
+            for (asset_id, user_id), (total, count) in assets.items()
+        ])
+    if months:
+        session.execute(insert(MonthlyCostRollup), [
+            {"user_id": user_id, "month": month, "total": total, "cost_count": count}
+            for (user_id, month), (total, count) in months.items()
+        ])
+    session.commit()
+    return len(assets), len(months)
@@ -0,0 +1,357 @@
+#src/utils/search/search_utils.py
+import re
+from sqlalchemy import (
+    Column, Integer, MetaData, String, Table, Text, Index, bindparam, case, delete, event, func,
+    insert, inspect, literal_column, or_, select, text,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from models.asset import Asset
+from models.note import Note
+from models.service import Service
+
+# One search document per asset, service and note, keyed by doc_id = item_id * 4 + kind
+# code so an entry is replaced or removed through its primary key (the FTS5 rowid).
+# The backend is chosen per engine by create_search_index:
+#   fts5      SQLite FTS5 virtual table ranked with bm25()
+#   tsvector  PostgreSQL generated tsvector column with a GIN index, ranked with ts_rank()
+#   like      plain table scanned with LIKE (MySQL, or SQLite built without FTS5)
+
+KIND_CODES = {"asset": 1, "service": 2, "note": 3}
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_TERMS = 8
+SNIPPET_LENGTH = 160
+REINDEX_BATCH_SIZE = 1000
+DELETE_BATCH_SIZE = 500
+
+FTS_TABLE = "search_index"
+# Title matches weigh more than body matches; the unindexed columns get no weight
+FTS_WEIGHTS = "0, 0, 0, 0, 0, 10.0, 1.0"
+
+metadata = MetaData()
+search_documents = Table(
+    "search_document",
+    metadata,
+    Column("doc_id", Integer, primary_key=True, autoincrement=False),
+    Column("user_id", String(64), nullable=False),
+    Column("kind", String(20), nullable=False),
+    Column("item_id", Integer, nullable=False),
+    Column("parent_kind", String(50)),
+    Column("parent_id", Integer),
+    Column("title", String(255)),
+    Column("body", Text),
+    Index("ix_search_document_user_id", "user_id"),
+)
+
+def doc_id(kind, item_id):
+    return item_id * 4 + KIND_CODES[kind]
+
+def search_terms(query):
+    """
+    Split a user query into at most MAX_SEARCH_TERMS lowercase words. Anything but
+    letters and digits is dropped, so no query syntax reaches the database.
+    """
+    return re.findall(r"[^\W_]+", (query or "").lower())[:MAX_SEARCH_TERMS]
+
+def search_backend(bind):
+    """Return the backend set up on an engine or connection, or None before create_search_index."""
+    engine = getattr(bind, "engine", bind)
+    return getattr(engine, "search_backend", None)
+
+def create_search_index(engine):
+    """
+    Create the search index for the engine's database if missing and record which
+    backend it uses. Returns the backend name.
+    """
+    dialect = engine.dialect.name
+    backend = "like"
+    with engine.begin() as connection:
+        if dialect == "sqlite":
+            try:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "user_id UNINDEXED, kind UNINDEXED, item_id UNINDEXED, "
+                    "parent_kind UNINDEXED, parent_id UNINDEXED, title, body, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                ))
+                backend = "fts5"
+            except OperationalError:
+                pass  # SQLite compiled without FTS5
+        if backend != "fts5":
+            metadata.create_all(bind=connection)
+        if dialect == "postgresql":
+            connection.execute(text(
+                "ALTER TABLE search_document ADD COLUMN IF NOT EXISTS tsv tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_search_document_tsv ON search_document USING GIN (tsv)"
+            ))
+            backend = "tsvector"
+    engine.search_backend = backend
+    return backend
+
+def _documents_table_name(backend):
+    return FTS_TABLE if backend == "fts5" else "search_document"
+
+def delete_documents(connection, doc_ids):
+    doc_ids = list(doc_ids)
+    # Chunked so a large cascade stays below the driver's bound parameter limit
+    for start in range(0, len(doc_ids), DELETE_BATCH_SIZE):
+        chunk = doc_ids[start:start + DELETE_BATCH_SIZE]
+        if search_backend(connection) == "fts5":
+            connection.execute(
+                text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :doc_ids").bindparams(bindparam("doc_ids", expanding=True)),
+                {"doc_ids": chunk},
+            )
+        else:
+            connection.execute(delete(search_documents).where(search_documents.c.doc_id.in_(chunk)))
+
+def delete_asset_documents(connection, asset_ids, service_ids):
+    """
+    Remove the entries of deleted assets, their services and the notes of both, for
+    bulk deletes that bypass the Session events.
+    """
+    if search_backend(connection) is None:
+        return
+    delete_documents(connection, [
+        *(doc_id("asset", asset_id) for asset_id in asset_ids),
+        *(doc_id("service", service_id) for service_id in service_ids),
+        *(doc_id("note", note_id) for note_id in _child_note_ids(connection, "asset", asset_ids)),
+        *(doc_id("note", note_id) for note_id in _child_note_ids(connection, "service", service_ids)),
+    ])
+
+def write_asset_documents(connection, assets):
+    """
+    Index assets inserted by bulk statements, which bypass the Session events.
+    `assets` yields (asset_id, values) with the inserted column values.
+    """
+    if search_backend(connection) is None:
+        return
+    write_documents(connection, [
+        asset_document(asset_id, values["user_id"], values["name"], values["asset_sn"], values["description"])
+        for asset_id, values in assets
+    ])
+
+def write_documents(connection, documents):
+    """
+    Replace the index entries of `documents` (dicts shaped like a search_document row).
+    """
+    if not documents:
+        return
+    delete_documents(connection, (document["doc_id"] for document in documents))
+    connection.execute(_insert_statement(search_backend(connection)), documents)
+
+def _insert_statement(backend):
+    if backend == "fts5":
+        return text(
+            f"INSERT INTO {FTS_TABLE} (rowid, user_id, kind, item_id, parent_kind, parent_id, title, body) "
+            "VALUES (:doc_id, :user_id, :kind, :item_id, :parent_kind, :parent_id, :title, :body)"
+        )
+    return insert(search_documents)
+
+def _document(kind, item_id, user_id, title, body, parent_kind=None, parent_id=None):
+    return {
+        "doc_id": doc_id(kind, item_id), "user_id": user_id, "kind": kind, "item_id": item_id,
+        "parent_kind": parent_kind, "parent_id": parent_id, "title": title or "", "body": body or "",
+    }
+
+def asset_document(asset_id, user_id, name, asset_sn, description):
+    return _document("asset", asset_id, user_id, name, " ".join(filter(None, (asset_sn, description))))
+
+def service_document(service_id, user_id, service_type, service_status, asset_id):
+    return _document("service", service_id, user_id, service_type, service_status, "asset", asset_id)
+
+def note_document(note_id, user_id, note_data, note_type, type_id):
+    return _document("note", note_id, user_id, None, note_data, note_type, type_id)
+
+# Columns whose change means a document must be rewritten
+INDEXED_ATTRIBUTES = {
+    Asset: ("name", "asset_sn", "description", "user_id"),
+    Service: ("service_type", "service_status", "asset_id", "user_id"),
+    Note: ("type", "type_id", "note_data"),
+}
+
+def _note_owner(connection, note_type, type_id, owners):
+    key = (note_type, type_id)
+    if key not in owners:
+        model = {"asset": Asset, "service": Service}.get(note_type)
+        owners[key] = (
+            connection.execute(select(model.user_id).where(model.id == type_id)).scalar()
+            if model is not None else None
+        )
+    return owners[key]
+
+def _child_note_ids(connection, note_type, parent_ids):
+    parent_ids = list(parent_ids)
+    note_ids = []
+    for start in range(0, len(parent_ids), DELETE_BATCH_SIZE):
+        note_ids.extend(connection.execute(
+            select(Note.id).where(Note.type == note_type, Note.type_id.in_(parent_ids[start:start + DELETE_BATCH_SIZE]))
+        ).scalars())
+    return note_ids
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_index(session, flush_context):
+    # Runs on the flush's own connection, so the index commits or rolls back with the change
+    changed = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, (Asset, Service, Note))
+    ]
+    if not changed:
+        return
+    connection = session.connection()
+    if search_backend(connection) is None:
+        return
+
+    documents, removed, owners = [], set(), {}
+    deleted_parents = {"asset": set(), "service": set()}
+    for obj in session.deleted:
+        if isinstance(obj, (Asset, Service, Note)):
+            kind = type(obj).__tablename__
+            removed.add(doc_id(kind, obj.id))
+            if kind in deleted_parents:
+                deleted_parents[kind].add(obj.id)
+
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, (Asset, Service, Note)) or obj in session.deleted:
+            continue
+        if obj not in session.new:
+            state = inspect(obj)
+            if not any(state.attrs[key].history.has_changes() for key in INDEXED_ATTRIBUTES[type(obj)]):
+                continue
+        if isinstance(obj, Asset):
+            documents.append(asset_document(obj.id, obj.user_id, obj.name, obj.asset_sn, obj.description))
+        elif isinstance(obj, Service):
+            documents.append(service_document(obj.id, obj.user_id, obj.service_type, obj.service_status, obj.asset_id))
+        else:
+            user_id = _note_owner(connection, obj.type, obj.type_id, owners)
+            if user_id is None:
+                removed.add(doc_id("note", obj.id))
+            else:
+                documents.append(note_document(obj.id, user_id, obj.note_data, obj.type, obj.type_id))
+
+    # Notes have no foreign key, so drop the entries of notes whose parent went away
+    for note_type, parent_ids in deleted_parents.items():
+        removed.update(doc_id("note", note_id) for note_id in _child_note_ids(connection, note_type, parent_ids))
+
+    delete_documents(connection, removed)
+    write_documents(connection, documents)
+
+def search(session, user_id, query, kinds=None, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+    """
+    Return (results, has_more) for the user's documents matching every word of
+    `query`, best match first. Each result is a dict with kind, id, title, snippet,
+    parent_kind, parent_id and score (higher is better).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    kinds = list(kinds or KIND_CODES)
+    backend = search_backend(session.get_bind())
+    if backend == "fts5":
+        match = " ".join(f'"{term}"*' for term in terms)
+        rows = session.execute(
+            text(
+                f"SELECT kind, item_id, parent_kind, parent_id, title, "
+                f"snippet({FTS_TABLE}, 6, '', '', '…', 24) AS snippet, "
+                f"-bm25({FTS_TABLE}, {FTS_WEIGHTS}) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND user_id = :user_id AND kind IN :kinds "
+                "ORDER BY score DESC, rowid LIMIT :limit OFFSET :offset"
+            ).bindparams(bindparam("kinds", expanding=True)),
+            {"match": match, "user_id": user_id, "kinds": kinds, "limit": limit + 1, "offset": offset},
+        ).all()
+    elif backend == "tsvector":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        tsv = literal_column("tsv")
+        score = func.ts_rank(tsv, tsquery)
+        rows = session.execute(
+            _document_query(score)
+            .where(search_documents.c.user_id == user_id, search_documents.c.kind.in_(kinds), tsv.op("@@")(tsquery))
+            .limit(limit + 1).offset(offset)
+        ).all()
+    elif backend == "like":
+        title, body = search_documents.c.title, search_documents.c.body
+        score = sum(
+            case((title.like(f"%{term}%"), 2), else_=0) + case((body.like(f"%{term}%"), 1), else_=0)
+            for term in terms
+        )
+        rows = session.execute(
+            _document_query(score)
+            .where(
+                search_documents.c.user_id == user_id, search_documents.c.kind.in_(kinds),
+                *(or_(title.like(f"%{term}%"), body.like(f"%{term}%")) for term in terms),
+            )
+            .limit(limit + 1).offset(offset)
+        ).all()
+    else:
+        raise RuntimeError("Search index has not been created")
+
+    results = [{
+        "kind": row.kind,
+        "id": row.item_id,
+        "title": row.title,
+        "snippet": row.snippet if len(row.snippet) <= SNIPPET_LENGTH else row.snippet[:SNIPPET_LENGTH] + "…",
+        "parent_kind": row.parent_kind,
+        "parent_id": row.parent_id,
+        "score": round(float(row.score), 6),
+    } for row in rows[:limit]]
+    return results, len(rows) > limit
+
+def _document_query(score):
+    columns = search_documents.c
+    return (
+        select(
+            columns.kind, columns.item_id, columns.parent_kind, columns.parent_id, columns.title,
+            columns.body.label("snippet"), score.label("score"),
+        )
+        .order_by(score.desc(), columns.doc_id)
+    )
+
+def reindex_search(session):
+    """
+    Rebuild the whole search index from the asset, service and note tables in one
+    transaction. Returns the number of documents written.
+    """
+    connection = session.connection()
+    backend = search_backend(connection)
+    if backend is None:
+        raise RuntimeError("Search index has not been created")
+    connection.execute(text(f"DELETE FROM {_documents_table_name(backend)}"))
+
+    sources = [
+        (Asset.id, select(Asset.id, Asset.user_id, Asset.name, Asset.asset_sn, Asset.description), asset_document),
+        (Service.id, select(Service.id, Service.user_id, Service.service_type, Service.service_status, Service.asset_id),
+         service_document),
+    ]
+    for parent in (Asset, Service):
+        sources.append((
+            Note.id,
+            select(Note.id, parent.user_id, Note.note_data, Note.type, Note.type_id)
+            .join(parent, (Note.type == parent.__tablename__) & (Note.type_id == parent.id)),
+            note_document,
+        ))
+
+    # Keyset batches rather than a streamed cursor, since MySQL cannot write on a
+    # connection while an unbuffered result is open
+    written = 0
+    insert_statement = _insert_statement(backend)
+    for id_column, query, build in sources:
+        last_id = None
+        while True:
+            batch = query.order_by(id_column).limit(REINDEX_BATCH_SIZE)
+            if last_id is not None:
+                batch = batch.where(id_column > last_id)
+            rows = connection.execute(batch).all()
+            if not rows:
+                break
+            connection.execute(insert_statement, [build(*row) for row in rows])
+            written += len(rows)
+            last_id = rows[-1][0]
+    if backend == "fts5":
+        # Merge the index segments left by the bulk insert
+        connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+    session.commit()
+    return written
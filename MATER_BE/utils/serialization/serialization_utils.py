@@ -0,0 +1,64 @@
+#src/utils/serialization/serialization_utils.py
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+def _default(value):
+    # Types neither encoder handles natively; dates are ISO 8601 with both providers
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class ISODateJSONProvider(DefaultJSONProvider):
+    """
+    Flask's stdlib provider, except dates are ISO 8601 like the orjson provider
+    instead of HTTP dates.
+    """
+
+    default = staticmethod(_default)
+
+class ORJSONProvider(JSONProvider):
+    """
+    JSON provider encoding with orjson. Keys are not sorted, and with the app in
+    debug mode responses are indented like the default provider's.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent") or kwargs.get("sort_keys"):
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=option) + b"\n",
+            mimetype="application/json",
+        )
+
+def init_json_provider(app):
+    """
+    Install the orjson provider when orjson is installed, otherwise the stdlib one
+    with ISO dates. Returns the provider.
+    """
+    provider_class = ORJSONProvider if orjson is not None else ISODateJSONProvider
+    app.json = provider_class(app)
+    return app.json
@@ -5,7 +5,11 @@ from werkzeug.utils import secure_filename
 
 # Constants for file upload and allowed extensions
 UPLOAD_BASE_FOLDER = "static/assets/"
+# Resized copies of asset images; reproducible from the originals, so kept out of backups
+DERIVATIVE_BASE_FOLDER = "static/derivatives/"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+# Folders only served through the authorized routes in blueprints/media.py
+PRIVATE_FOLDERS = (UPLOAD_BASE_FOLDER, DERIVATIVE_BASE_FOLDER)
 
 def allowed_file(filename):
     """
@@ -13,6 +17,17 @@ def allowed_file(filename):
     """
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def is_private_path(path):
+    """
+    Check if a path lies inside one of the PRIVATE_FOLDERS.
+    """
+    path = os.path.abspath(path)
+    for folder in PRIVATE_FOLDERS:
+        folder = os.path.abspath(folder)
+        if os.path.commonpath([path, folder]) == folder:
+            return True
+    return False
+
 def get_asset_upload_folder(asset_id):
     """
     Return the upload folder path for assets based on asset ID.
@@ -31,6 +46,12 @@ def get_attachment_upload_folder(asset_id, service_id):
     """
     return os.path.join(get_asset_upload_folder(asset_id), "service_attachments", str(service_id))
 
+def get_derivative_folder(sha256):
+    """
+    Return the folder holding the resized copies of the image blob `sha256`.
+    """
+    return os.path.join(DERIVATIVE_BASE_FOLDER, sha256[:2], sha256)
+
 def save_file(file, upload_folder):
     """
     Save an uploaded file to the specified folder.
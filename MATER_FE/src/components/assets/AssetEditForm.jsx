@@ -34,9 +34,9 @@ const AssetEditForm = ({ asset, onSubmit, onClose }) => {
         image: null,
       });
 
-      if (asset.image_path) {
+      if (asset.image_urls) {
         const baseUrl = import.meta.env.VITE_BASE_URL;
-        setImagePreview(`${baseUrl}/static/assets/${asset.id}/image/${asset.image_path.split('/').pop()}`);
+        setImagePreview(`${baseUrl}${asset.image_urls.medium_webp}`);
       }
     }
   }, [asset]);
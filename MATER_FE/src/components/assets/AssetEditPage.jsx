@@ -36,7 +36,12 @@ const AssetEditPage = ({ onSubmit, onClose }) => {
       try {
         const baseUrl = import.meta.env.VITE_BASE_URL;
         const assetUrl = `${baseUrl}/assets/asset_edit/${asset_id}`;
-        const response = await fetch(assetUrl);
+        const jwtToken = localStorage.getItem('jwt'); // Retrieve JWT from local storage
+        const response = await fetch(assetUrl, {
+          headers: {
+            'Authorization': `Bearer ${jwtToken}`,
+          },
+        });
 
         if (response.ok) {
           const asset = await response.json();
@@ -49,8 +54,8 @@ const AssetEditPage = ({ onSubmit, onClose }) => {
             image: null,
           });
 
-          if (asset.image_path) {
-            setImagePreview(`${baseUrl}/static/assets/${asset_id}/image/${asset.image_path.split('/').pop()}`);
+          if (asset.image_urls) {
+            setImagePreview(`${baseUrl}${asset.image_urls.medium_webp}`);
           } else {
             setImagePreview(`${baseUrl}/static/images/default.png`);
           }
@@ -119,8 +119,8 @@ const AssetTable = ({ assets, openEditModal, fetchAssets }) => {
     () => [
       {
         Header: 'Image',
-        accessor: 'image_path',
-        Cell: ({ cell: { value }, row }) => (value ? <img src={`${baseUrl}/static/assets/${row.original.id}/image/${value.split('/').pop()}`} alt="Asset" style={{ width: '50px' }} /> : <img src={`${baseUrl}/static/images/default.png`} alt="Asset" style={{ width: '50px' }} />),
+        accessor: 'image_urls',
+        Cell: ({ cell: { value } }) => (value ? <img src={`${baseUrl}${value.thumb_webp}`} alt="Asset" style={{ width: '50px' }} /> : <img src={`${baseUrl}/static/images/default.png`} alt="Asset" style={{ width: '50px' }} />),
         disableFilters: true,
         disableSortBy: true,        
       },